@@ -23,6 +23,10 @@ setup(
     install_requires=[
         "click>=8.0",
     ],
+    extras_require={
+        # Faster XML backend, used automatically when installed
+        "lxml": [ "lxml>=4.5" ],
+    },
     entry_points={
         "console_scripts": [
             "salesforce-metadata-parser=salesforce_metadata_parser.cli.main:cli",
@@ -0,0 +1,98 @@
+# Standard Library imports
+import json
+import logging
+from typing import Any, Callable, Tuple
+
+# Dependency imports
+import click
+
+# Project imports
+from ..parser.directory import default_source_dir, find_metadata_files, process_files
+from ..parser.manifest import Manifest, git_changed_files
+from ..parser.shards import load_timings, parse_shard, select_shard
+
+logger = logging.getLogger(__name__)
+
+
+def _parse_shard(ctx, param, value):
+    if value is None:
+        return None
+    try:
+        return parse_shard(value)
+    except ValueError as e:
+        raise click.BadParameter(str(e))
+
+
+def directory_options(func):
+    """Adds the options shared by every command that processes a whole directory"""
+    options = [
+        click.option('--source-dir', 'source_dir', type=click.Path(exists=True, file_okay=False), default=default_source_dir),
+        click.option('--jobs', 'jobs', type=click.IntRange(min=1), default=None, help="Number of worker threads"),
+        click.option('--changed-since', 'changed_since', type=click.STRING, help="Only process files changed since this git ref"),
+        click.option('--manifest', 'manifest_file', type=click.Path(dir_okay=False), help="Reuse and record results per file content hash"),
+        click.option('--output', 'output_file', type=click.Path(dir_okay=False, writable=True), help="Write the results as JSON ('-' for stdout)"),
+        click.option('--shard', 'shard', type=click.STRING, callback=_parse_shard, help="Only process the files of shard INDEX/COUNT, such as 2/4"),
+        click.option('--shard-timings', 'shard_timings', type=click.Path(exists=True, dir_okay=False), help="Manifest or merged results of a previous run, to balance shards by processing time"),
+    ]
+    for option in reversed(options):
+        func = option(func)
+    return func
+
+
+def run_directory_task(
+    task: Callable[[str], Any],
+    task_name: str,
+    source_dir: str,
+    suffix: str = None,
+    jobs: int = None,
+    changed_since: str = None,
+    manifest_file: str = None,
+    output_file: str = None,
+    shard: Tuple[int, int] = None,
+    shard_timings: str = None,
+) -> dict:
+    """Runs task on the metadata files of source_dir, honoring the directory_options.
+
+    task_name identifies the results of task in manifests, see manifest.task_key. Files whose task
+    failed are listed once every file was processed; commands call raise_for_errors when they are done.
+    """
+    file_paths = find_metadata_files(source_dir, suffix)
+    if shard:
+        timings = load_timings(shard_timings, task_name) if shard_timings else None
+        file_paths = select_shard(file_paths, *shard, timings=timings)
+    changed_files = git_changed_files(changed_since, source_dir) if changed_since else None
+    manifest = Manifest.load(manifest_file, task_name) if manifest_file else None
+
+    document = process_files(file_paths, task, max_workers=jobs, manifest=manifest, changed_files=changed_files)
+
+    metrics = document["metrics"]
+    shard_label = ""
+    if shard:
+        metrics["shard"] = f"{shard[0]}/{shard[1]}"
+        shard_label = f" in shard {metrics['shard']}"
+    click.echo(
+        f"{metrics['files']} files{shard_label}: {metrics['processed']} processed, {metrics['reused']} reused, "
+        f"{metrics['failed']} failed in {metrics['elapsed']:.3f} s",
+        err=True,
+    )
+
+    if output_file:
+        write_results(document, output_file)
+
+    for path, error in document["errors"].items():
+        click.echo(f"{path}: {error}", err=True)
+
+    return document
+
+
+def raise_for_errors(document: dict):
+    """Fails the command when the task failed on some files, after it used the results of the others"""
+    errors = document["errors"]
+    if errors:
+        raise click.ClickException(f"{len(errors)} of {document['metrics']['files']} files failed")
+
+
+def write_results(document: dict, output_file: str):
+    with click.open_file(output_file, "w", encoding="utf-8") as results_file:
+        json.dump(document, results_file, indent=2)
+        results_file.write("\n")
@@ -1,25 +1,41 @@
 # Standard Library imports
+from concurrent.futures import ThreadPoolExecutor
 import copy
+import difflib
+import json
 import logging
 import os
 import re
+import shlex
+import time
+from typing import Tuple
 
 # Dependency imports
 import click
 
 # Project imports
 from ..metadata.base import get_list, get_value
-from ..metadata.base import XmlNode
+from ..metadata.base import XmlNode, XmlRoot, copy_node
 from ..metadata.genaiprompttemplate import GenAiPromptTemplate, GenAiPromptTemplateVersion, GenAiPromptTemplateStatus
-from ..parser.metadata_parser import XmlParser
+from ..parser.cache import ParseCache
+from ..parser.diff import Change, diff
+from ..parser.export import TableWriter, formats, prompt_template_rows
+from ..parser.manifest import Manifest, relative_path, task_key
+from ..parser.memory import MemoryLimitExceeded, MemoryRecord, default_tracker, parse_size
+from ..parser.metadata_parser import XmlParser, lazy_text_modes
+from ..parser.streaming import split_xml_file
+from ..parser.versions import VersionColumns
+from ..parser.watch import DirectoryWatcher
+from .directory import directory_options, raise_for_errors, run_directory_task
 
 logger = logging.getLogger(__name__)
 
+versionIdentifierPattern = re.compile(r"(?P<versionId>.*)=_(?P<versionNumber>\d+)")
+
 class PromptTemplateHelper:
 
-    classes = {
-        "genAiPromptTemplate": GenAiPromptTemplate
-    }
+    cache = ParseCache()
+    """Process-level cache of parsed templates, enabled by batch and watch. Loaders return independent copies."""
 
 
     @staticmethod
@@ -36,7 +52,7 @@ class PromptTemplateHelper:
 
     @staticmethod
     def _get_version_identifier(version_id: str) -> tuple:
-        m = re.match(r"(?P<versionId>.*)=_(?P<versionNumber>\d+)", version_id)
+        m = versionIdentifierPattern.match(version_id)
         if m:
             id = m.group("versionId")
             num = int(m.group("versionNumber"))
@@ -81,16 +97,19 @@ class PromptTemplateHelper:
         count = len(metadata.templateVersions)
         if count == 0:
             logger.warning(f"No Template Versions found")
-            return
+            return metadata
 
         lastVersion = metadata.templateVersions[-1]
-        newVersion = copy.deepcopy(lastVersion)
-        newVersion.status = GenAiPromptTemplateStatus.DRAFT
+        newVersion = copy_node(lastVersion)
+        # Parsed values are text, the serializer writes strings only
+        newVersion.status = GenAiPromptTemplateStatus.DRAFT.value
         if lastVersion.versionIdentifier:
             newVersion.versionIdentifier = PromptTemplateHelper._increment_version_identifier(lastVersion.versionIdentifier)
 
         logger.info(f"Creating new Version: {newVersion.versionIdentifier}")
-        metadata.templateVersions.append(new_version)
+        metadata.templateVersions.append(newVersion)
+
+        return metadata
 
 
     @staticmethod
@@ -124,15 +143,17 @@ class PromptTemplateHelper:
         version_count = len(metadata.templateVersions)
         if version_count == 0:
             logger.warning(f"No Template Versions found")
-            return
+            return metadata
         elif version_count <= count:
             logger.info(f"Only {version_count} Template Versions found. No action taken")
-            return
+            return metadata
 
         lastVersions = metadata.templateVersions[ -count : ]
         logger.info(f"Selecting Last {count} Versions:")
         metadata.templateVersions = lastVersions
 
+        return metadata
+
 
     @staticmethod
     def filter_last_version(metadata: GenAiPromptTemplate) -> GenAiPromptTemplate:
@@ -154,6 +175,68 @@ class PromptTemplateHelper:
         return metadata
 
 
+    @staticmethod
+    def update_active_version(metadata: GenAiPromptTemplate) -> GenAiPromptTemplate:
+        """Points activeVersionIdentifier to the last published version when its version was removed, clears it when there is none"""
+        active = get_value(metadata, "activeVersionIdentifier")
+        versions = get_list(metadata, "templateVersions")
+        if active is None or any(get_value(version, "versionIdentifier") == active for version in versions):
+            return metadata
+
+        published = GenAiPromptTemplateStatus.PUBLISHED.value
+        candidates = [ version for version in versions if getattr(version.status, "value", version.status) == published ]
+        metadata.activeVersionIdentifier = get_value(candidates[-1], "versionIdentifier") if candidates else None
+        logger.info(f"Active version {active} removed, active version: {metadata.activeVersionIdentifier}")
+
+        return metadata
+
+
+    @staticmethod
+    def _find_version(metadata: GenAiPromptTemplate, version_id: str) -> GenAiPromptTemplateVersion:
+        for version in metadata.templateVersions:
+            if version.versionIdentifier == version_id:
+                return version
+
+        raise click.ClickException(f"Version not found: {version_id}")
+
+
+    @staticmethod
+    def diff_versions(metadata: GenAiPromptTemplate, from_version: str = None, to_version: str = None) -> list:
+        """Compares two Template Versions. Defaults to the last two versions"""
+
+        versions = metadata.templateVersions
+        if len(versions) < 2 and not (from_version and to_version):
+            raise click.ClickException("At least two Template Versions are required")
+
+        old = PromptTemplateHelper._find_version(metadata, from_version) if from_version else versions[-2]
+        new = PromptTemplateHelper._find_version(metadata, to_version) if to_version else versions[-1]
+
+        logger.info(f"Comparing versions: {old.versionIdentifier} -> {new.versionIdentifier}")
+        return diff(old, new)
+
+
+    @staticmethod
+    def _format_change(change: Change) -> list:
+        symbol = { "added": "+", "removed": "-", "changed": "~" }[change.kind]
+
+        def describe(value):
+            if isinstance(value, XmlNode):
+                return f"<{type(value).__name__} {value._fingerprint()[ : 12]}>"
+            if isinstance(value, list):
+                return f"[{len(value)} items]"
+            return repr(getattr(value, "value", value))
+
+        if change.kind != "changed":
+            value = change.new if change.kind == "added" else change.old
+            return [ f"{symbol} {change.path}: {describe(value)}" ]
+
+        if isinstance(change.old, str) and isinstance(change.new, str) and "\n" in change.old + change.new:
+            lines = difflib.unified_diff(change.old.splitlines(), change.new.splitlines(), lineterm="", n=1)
+            return [ f"{symbol} {change.path}:" ] + [ f"    {line}" for line in list(lines)[2 : ] ]
+
+        return [ f"{symbol} {change.path}: {describe(change.old)} -> {describe(change.new)}" ]
+
+
     @staticmethod
     def _set_status(metadata: GenAiPromptTemplate, status: str) -> GenAiPromptTemplate:
         """Set the status of the last Version"""
@@ -164,24 +247,34 @@ class PromptTemplateHelper:
 
 
     @staticmethod
-    def load_prompt_from_file(source_file: str) -> GenAiPromptTemplate:
+    def load_prompt_from_file(source_file: str, compact_history: bool = False) -> GenAiPromptTemplate:
+        """compact_history keeps older template versions as deltas of the newest one, see history.VersionHistory"""
         if source_file is None:
             logger.error("source file or api name not provided")
             raise ValueError()
 
-        click.echo(f"Parsing metadata file: {source_file}")
-        metadata = XmlParser.from_xml_file(source_file, classes=PromptTemplateHelper.classes)
+        def parse(file_path: str) -> GenAiPromptTemplate:
+            click.echo(f"Parsing metadata file: {file_path}", err=True)
+            return XmlParser(compact_history=compact_history).parse_file(file_path)
+
+        metadata = PromptTemplateHelper.cache.load(source_file, parse, options=(compact_history,))
         return metadata
     
     @staticmethod
-    def load_prompt_from_api_name(api_name: str, variant: str = None) -> GenAiPromptTemplate:
+    def load_prompt_from_api_name(api_name: str, variant: str = None, compact_history: bool = False) -> GenAiPromptTemplate:
         source_file = PromptTemplateHelper._generate_default_prompt_template_path(api_name, variant)
 
-        return PromptTemplateHelper.load_prompt_from_file(source_file)
+        return PromptTemplateHelper.load_prompt_from_file(source_file, compact_history)
 
     @staticmethod
     def save_prompt_to_file(metadata: GenAiPromptTemplate, target_file: str):
-        click.echo(f"Saving metadata file: {target_file}")
+        if target_file == "-":
+            click.echo("Writing metadata to stdout", err=True)
+            with click.open_file("-", "wb") as stdout:
+                XmlParser.to_xml_stream(metadata, stdout)
+            return
+
+        click.echo(f"Saving metadata file: {target_file}", err=True)
         XmlParser.to_xml_file(metadata, target_file)
     
 
@@ -194,26 +287,111 @@ class PromptTemplateHelper:
         XmlParser.to_xml_file(metadata, target_file)
 
     @staticmethod
-    def save_split_prompts(metadata: GenAiPromptTemplate, api_name: str):
+    def _split_prompt_path(metadata: GenAiPromptTemplate, target_dir: str = None) -> str:
+        versionId, versionNum = PromptTemplateHelper._get_version_identifier(metadata.templateVersions[0].versionIdentifier)
+        fakeApiName = f"{metadata.developerName}-v{versionNum}"
+        newMetadataFileName = PromptTemplateHelper._generate_default_prompt_template_path(fakeApiName)
+
+        if target_dir:
+            return os.path.join(target_dir, os.path.basename(newMetadataFileName))
+        return newMetadataFileName
+
+    @staticmethod
+    def save_split_prompts(metadata: GenAiPromptTemplate, api_name: str = None):
         for templateVersion in metadata.templateVersions:
             newMetadata = copy.deepcopy(metadata)
             newMetadata.templateVersions = [ templateVersion ]
             newMetadata.activeVersionIdentifier = templateVersion.versionIdentifier
 
-            versionId, versionNum = PromptTemplateHelper._get_version_identifier(templateVersion.versionIdentifier)
-            fakeApiName = f"{newMetadata.developerName}-v{versionNum}"
-            newMetadataFileName = PromptTemplateHelper._generate_default_prompt_template_path(fakeApiName)
+            newMetadataFileName = PromptTemplateHelper._split_prompt_path(newMetadata)
 
             PromptTemplateHelper.save_prompt_to_file(newMetadata, newMetadataFileName)
 
+    @staticmethod
+    def stream_split_prompts(source_file: str, target_dir: str = None) -> list:
+        """Same output as save_split_prompts, written in one pass without loading the whole template"""
+
+        def prepare(newMetadata: GenAiPromptTemplate) -> str:
+            newMetadata.activeVersionIdentifier = newMetadata.templateVersions[0].versionIdentifier
+            return PromptTemplateHelper._split_prompt_path(newMetadata, target_dir)
+
+        if target_dir:
+            os.makedirs(target_dir, exist_ok=True)
+
+        click.echo(f"Splitting metadata file: {source_file}", err=True)
+        parser = XmlParser()
+        return split_xml_file(source_file, "templateVersions", prepare, parser)
+
+
+def _memory_roots(obj: dict):
+    """The trees a chain keeps between commands"""
+    if isinstance(obj.get("metadata", None), XmlRoot):
+        yield "metadata", obj["metadata"]
+    for path, document in (obj.get("documents", None) or {}).items():
+        yield path, document
+
+
+def _echo_memory_record(record: MemoryRecord):
+    click.echo(
+        f"Memory [{record.label}]: peak {record.peak_bytes / 1024 ** 2:.1f} MiB, "
+        f"{(record.end_bytes - record.start_bytes) / 1024 ** 2:+.1f} MiB retained in {record.elapsed:.3f} s",
+        err=True,
+    )
+    if record.objects:
+        click.echo("  objects: " + ", ".join(f"{name} +{count}" for name, count in record.objects.items()), err=True)
+    for tree in record.trees[ : 3]:
+        click.echo(f"  tree {tree['name']}: {tree['nodes']} nodes, {tree['bytes'] / 1024:.1f} KiB", err=True)
+
+
+class MeasuredCommand(click.Command):
+    """Chained command whose memory use is recorded when the group enables memory accounting"""
+
+    def invoke(self, ctx: click.Context):
+        obj = ctx.obj or {}
+        if not obj.get("memory_report", False) and not obj.get("max_memory", None):
+            return super().invoke(ctx)
+
+        try:
+            with default_tracker.measure(ctx.info_name, roots=lambda: _memory_roots(obj)) as record:
+                result = super().invoke(ctx)
+        except MemoryLimitExceeded as e:
+            raise click.ClickException(f"Memory limit exceeded, aborting. {e}")
+
+        if obj.get("memory_report", False):
+            _echo_memory_record(record)
+        return result
+
+
+def _parse_max_memory(ctx, param, value):
+    if value is None:
+        return None
+    try:
+        return parse_size(value)
+    except ValueError as e:
+        raise click.BadParameter(str(e))
+
 
 @click.group(chain=True)
+@click.option('--memory-report', 'memory_report', is_flag=True, help="Print the memory used by each command (slower)")
+@click.option('--max-memory', 'max_memory', type=click.STRING, callback=_parse_max_memory, help="Abort when Python allocations exceed this size, such as 512M")
+@click.option('--compact-history', 'compact_history', is_flag=True, help="Keep older template versions as deltas of the newest one")
 @click.pass_context
-def prompt_template(ctx):
+def prompt_template(ctx, memory_report: bool = False, max_memory: int = None, compact_history: bool = False):
     logger.debug("Group: Prompt Template")
     if ctx.obj is None:
         ctx.obj = dict()
-    pass
+
+    # Chains run by batch and watch inherit the setting of the outer command
+    ctx.obj["compact_history"] = compact_history or ctx.obj.get("compact_history", False)
+
+    if memory_report or max_memory:
+        ctx.obj["memory_report"] = memory_report
+        ctx.obj["max_memory"] = max_memory
+        default_tracker.configure(max_memory=max_memory)
+        default_tracker.start()
+        ctx.call_on_close(default_tracker.stop)
+
+prompt_template.command_class = MeasuredCommand
 
 
 @prompt_template.command()
@@ -225,9 +403,9 @@ def load_prompt(obj: dict, source_file: str = None, api_name: str = None, varian
     """Parse a Salesforce metadata file."""
 
     if source_file:
-        metadata = PromptTemplateHelper.load_prompt_from_file(source_file)
+        metadata = PromptTemplateHelper.load_prompt_from_file(source_file, obj["compact_history"])
     else:
-        metadata = PromptTemplateHelper.load_prompt_from_api_name(api_name, variant)
+        metadata = PromptTemplateHelper.load_prompt_from_api_name(api_name, variant, obj["compact_history"])
 
     assert metadata is not None
     obj["metadata"] = metadata
@@ -280,7 +458,7 @@ def new_version(obj: dict):
 
 
 @prompt_template.command()
-@click.option("--target-file", "target_file", type=click.Path(exists=False, writable=True))
+@click.option("--target-file", "target_file", type=click.Path(exists=False, writable=True, allow_dash=True), help="Use - to write to stdout")
 @click.option('--api-name', 'api_name', type=click.STRING)
 @click.option('--variant', 'variant', type=click.STRING)
 @click.pass_obj
@@ -303,14 +481,85 @@ def save_split_prompts(obj: dict):
     PromptTemplateHelper.save_split_prompts(metadata)
 
 
+@prompt_template.command()
+@click.option('--source-file', 'source_file', type=click.Path(exists=True))
+@click.option('--api-name', 'api_name', type=click.STRING)
+@click.option('--variant', 'variant', type=click.STRING)
+@click.option('--target-dir', 'target_dir', type=click.Path(file_okay=False, writable=True))
+def stream_split_prompts(source_file: str = None, api_name: str = None, variant: str = None, target_dir: str = None):
+    """Split a template file into one file per version, without loading it in memory"""
+    if not source_file:
+        source_file = PromptTemplateHelper._generate_default_prompt_template_path(api_name, variant)
+
+    try:
+        PromptTemplateHelper.stream_split_prompts(source_file, target_dir)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+
+
+@prompt_template.command()
+@directory_options
+@click.option('--target-dir', 'target_dir', type=click.Path(file_okay=False, writable=True), required=True)
+def split_dir(target_dir: str, **options):
+    """Split every template of a directory into one file per version"""
+
+    def split_file(file_path: str) -> dict:
+        return { "files": PromptTemplateHelper.stream_split_prompts(file_path, target_dir) }
+
+    task_name = task_key("prompt-template.split-dir", target_dir=target_dir)
+    document = run_directory_task(split_file, task_name, suffix="genAiPromptTemplate", **options)
+    raise_for_errors(document)
+
+
+@prompt_template.command()
+@directory_options
+@click.option('--target-dir', 'target_dir', type=click.Path(file_okay=False, writable=True), required=True)
+@click.option('--format', 'format', type=click.Choice(formats), default="jsonl")
+def export(target_dir: str, format: str, **options):
+    """Export templates, versions, inputs and providers of every template of a directory as tables"""
+    writer = TableWriter(target_dir, format=format)
+    task_name = task_key("prompt-template.export", target_dir=target_dir, format=format)
+
+    # Unchanged files are copied from the previous export, without it every file must be parsed again
+    if not writer.has_previous() and (options["manifest_file"] or options["changed_since"]):
+        logger.info(f"No previous export in {target_dir}, processing every file")
+        options["changed_since"] = None
+        if options["manifest_file"]:
+            manifest = Manifest.load(options["manifest_file"], task_name)
+            manifest.clear()
+            manifest.save()
+
+    parser = XmlParser()
+
+    def export_file(file_path: str) -> dict:
+        metadata = parser.parse_file(file_path)
+        return writer.write_rows(prompt_template_rows(metadata, relative_path(file_path)))
+
+    writer.open()
+    try:
+        document = run_directory_task(export_file, task_name, suffix="genAiPromptTemplate", **options)
+        # Files reused from the manifest, and the files --changed-since left out
+        writer.copy_previous(set(document["results"]) - set(document["metrics"]["timings"]) | set(document["skipped"]))
+    except Exception:
+        writer.abort()
+        raise
+    writer.close()
+
+    click.echo(
+        ", ".join(f"{count} {table}" for table, count in writer.rows.items()) + f" exported to {target_dir}",
+        err=True,
+    )
+    raise_for_errors(document)
+
+
 @prompt_template.command()
 @click.option('--source-file', 'source_file', type=click.Path(exists=True))
 @click.option("--target-file", "target_file", type=click.Path(exists=False, writable=True))
 @click.pass_obj
 def copy_prompt(obj: dict, source_file: str, target_file: str):
-    metadata = PromptTemplateHelper.load_prompt_from_file(source_file)
+    metadata = PromptTemplateHelper.load_prompt_from_file(source_file, obj["compact_history"])
 
-    PromptTemplateHelper.save_prompt(metadata, target_file)
+    PromptTemplateHelper.save_prompt_to_file(metadata, target_file)
 
 
 @prompt_template.command()
@@ -326,6 +575,28 @@ def clone_prompt(obj: dict, api_suffix: str, label_suffix: str):
     obj["metadata"] = metadata
 
 
+@prompt_template.command()
+@click.option('--from-version', 'from_version', type=click.STRING, help="versionIdentifier to compare from. Defaults to the previous version")
+@click.option('--to-version', 'to_version', type=click.STRING, help="versionIdentifier to compare to. Defaults to the last version")
+@click.option('--other-file', 'other_file', type=click.Path(exists=True), help="Compare the whole template against this file instead")
+@click.pass_obj
+def diff_versions(obj: dict, from_version: str, to_version: str, other_file: str):
+    """Show the field level differences between two versions, or two templates"""
+    metadata: GenAiPromptTemplate = obj["metadata"]
+    assert metadata is not None, "Metadata not provided in the context"
+
+    if other_file:
+        other = PromptTemplateHelper.load_prompt_from_file(other_file, obj["compact_history"])
+        changes = diff(metadata, other)
+    else:
+        changes = PromptTemplateHelper.diff_versions(metadata, from_version, to_version)
+
+    for change in changes:
+        for line in PromptTemplateHelper._format_change(change):
+            click.echo(line)
+    click.echo(f"{len(changes)} changes")
+
+
 @prompt_template.command()
 @click.option('--status', 'status', type=click.STRING)
 @click.pass_obj
@@ -337,3 +608,263 @@ def set_status(obj: dict, status: str):
 
     assert metadata is not None
     obj["metadata"] = metadata
+
+
+def _echo_cache_stats(report: dict = None):
+    report = report or PromptTemplateHelper.cache.report()
+    click.echo(
+        f"Template cache: {report['hits']} hits, {report['misses']} misses, {report['evictions']} evictions, "
+        f"{report['entries']} entries ({report['bytes'] / 1024:.1f} KiB)",
+        err=True,
+    )
+
+
+def _version_identifiers(metadata: GenAiPromptTemplate) -> tuple:
+    """versionIdentifier of every version, and activeVersionIdentifier, see VersionColumns.from_templates"""
+    versions = [ get_value(version, "versionIdentifier") for version in get_list(metadata, "templateVersions") ]
+    return versions, get_value(metadata, "activeVersionIdentifier")
+
+
+def _version_columns(parser: XmlParser, options: dict) -> Tuple[VersionColumns, dict]:
+    """Reads the version identifiers of every template of a directory into columns. Also returns the results document."""
+
+    def read_versions(file_path: str) -> dict:
+        versions, active = _version_identifiers(parser.parse_file(file_path))
+        return { "versions": versions, "active": active }
+
+    document = run_directory_task(read_versions, "prompt-template.versions", suffix="genAiPromptTemplate", **options)
+    columns = VersionColumns.from_templates({
+        path: (result["versions"], result["active"]) for path, result in document["results"].items() if result
+    })
+    return columns, document
+
+
+@prompt_template.command()
+@directory_options
+def check_versions(**options):
+    """Report gaps and duplicates in the =_N version identifiers of every template of a directory"""
+    columns, document = _version_columns(XmlParser(), options)
+
+    gaps = columns.gaps()
+    duplicates = columns.duplicates()
+    for path in sorted(set(gaps) | set(duplicates)):
+        if path in gaps:
+            click.echo(f"{path}: missing versions {', '.join(str(number) for number in gaps[path])}")
+        if path in duplicates:
+            click.echo(f"{path}: duplicate identifiers {', '.join(duplicates[path])}")
+
+    click.echo(f"{len(columns)} versions in {len(columns.templates)} templates: {len(gaps)} with gaps, {len(duplicates)} with duplicates")
+    if duplicates:
+        raise click.ClickException(f"{len(duplicates)} templates have duplicate version identifiers")
+    raise_for_errors(document)
+
+
+@prompt_template.command()
+@directory_options
+@click.option("--count", "count", type=click.IntRange(min=1), required=True, help="Number of versions to keep")
+@click.option('--keep-active/--no-keep-active', 'keep_active', default=True, help="Also keep the active version")
+@click.option('--dry-run', 'dry_run', is_flag=True, help="Only list the templates that would change")
+@click.option('--lazy-text', 'lazy_text', type=click.Choice(lazy_text_modes[1:]), help="Copy the kept text values as they are, without decoding them")
+def prune_dir(count: int, keep_active: bool, dry_run: bool, lazy_text: str, **options):
+    """Keep the last versions of every template of a directory, parsing and writing each changed file once"""
+    parser = XmlParser(lazy_text=lazy_text)
+
+    def prune_file(file_path: str) -> dict:
+        metadata = parser.parse_file(file_path)
+        versions = get_list(metadata, "templateVersions")
+        keep = VersionColumns.from_templates({ file_path: _version_identifiers(metadata) }).last_n(count, keep_active).get(file_path, None)
+        if keep is not None and not dry_run:
+            metadata.templateVersions = [ versions[position] for position in keep ]
+            # Without --keep-active, the active version may be pruned
+            PromptTemplateHelper.update_active_version(metadata)
+            parser.dump_file(metadata, file_path)
+        return { "versions": len(versions), "kept": keep }
+
+    task_name = task_key("prompt-template.prune-dir", count=count, keep_active=keep_active, dry_run=dry_run)
+    document = run_directory_task(prune_file, task_name, suffix="genAiPromptTemplate", **options)
+
+    pruned = { path: result["kept"] for path, result in document["results"].items() if result and result["kept"] is not None }
+    for path, positions in sorted(pruned.items()):
+        click.echo(f"{path}: keeping {len(positions)} versions")
+
+    click.echo(f"{'Would prune' if dry_run else 'Pruned'} {len(pruned)} of {len(document['results'])} templates")
+    raise_for_errors(document)
+
+
+@prompt_template.command()
+@directory_options
+@click.option('--sort', 'sort', is_flag=True, help="Order the versions by their number before renumbering them")
+@click.option('--dry-run', 'dry_run', is_flag=True, help="Only list the identifiers that would change")
+@click.option('--lazy-text', 'lazy_text', type=click.Choice(lazy_text_modes[1:]), help="Copy the text values as they are, without decoding them")
+def renumber_dir(sort: bool, dry_run: bool, lazy_text: str, **options):
+    """Renumber the versions of every template of a directory as =_1..=_N, parsing and writing each changed file once"""
+    parser = XmlParser(lazy_text=lazy_text)
+
+    def renumber_file(file_path: str) -> dict:
+        metadata = parser.parse_file(file_path)
+        columns = VersionColumns.from_templates({ file_path: _version_identifiers(metadata) })
+        renames = columns.renumbered(columns.sort_order() if sort else None).get(file_path, None)
+        if renames is None or dry_run:
+            return { "renames": renames }
+
+        versions = get_list(metadata, "templateVersions")
+        active = get_value(metadata, "activeVersionIdentifier")
+        renumbered = []
+        for position, identifier, new_identifier in renames:
+            version = versions[position]
+            if identifier == active:
+                # The first version of duplicate identifiers stays the active one
+                metadata.activeVersionIdentifier = new_identifier
+                active = None
+            if new_identifier != identifier:
+                version.versionIdentifier = new_identifier
+            renumbered.append(version)
+        metadata.templateVersions = renumbered
+        parser.dump_file(metadata, file_path)
+        return { "renames": renames }
+
+    task_name = task_key("prompt-template.renumber-dir", sort=sort, dry_run=dry_run)
+    document = run_directory_task(renumber_file, task_name, suffix="genAiPromptTemplate", **options)
+
+    renamed = { path: result["renames"] for path, result in document["results"].items() if result and result["renames"] is not None }
+    for path, versions in sorted(renamed.items()):
+        changes = [ f"{identifier} -> {new_identifier}" for _, identifier, new_identifier in versions if identifier != new_identifier ]
+        click.echo(f"{path}: {', '.join(changes) or 'reordered'}")
+
+    click.echo(f"{'Would renumber' if dry_run else 'Renumbered'} {len(renamed)} of {len(document['results'])} templates")
+    raise_for_errors(document)
+
+
+@prompt_template.command()
+def cache_stats():
+    """Show the hit, miss and eviction counters of the template cache"""
+    _echo_cache_stats()
+
+
+def _read_batch_script(script_file: str) -> list:
+    """Reads one command chain per line, as a JSON list of arguments, a JSON object with "args"
+    (and an optional "name") or a shell-like command line. Blank lines and # comments are skipped."""
+    chains = []
+    with open(script_file, "r", encoding="utf-8") as script:
+        for line_number, line in enumerate(script, start=1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+
+            name = f"line {line_number}"
+            if line[0] in "[{":
+                chain = json.loads(line)
+                if isinstance(chain, dict):
+                    name = chain.get("name", name)
+                    chain = chain["args"]
+                if isinstance(chain, str):
+                    chain = shlex.split(chain)
+            else:
+                chain = shlex.split(line)
+
+            chains.append((name, [ str(arg) for arg in chain ]))
+
+    return chains
+
+
+def _run_chain(name: str, args: list, compact_history: bool = False) -> tuple:
+    start = time.perf_counter()
+    try:
+        # Every chain gets its own context object, settings are never shared between threads
+        obj = dict(compact_history=compact_history)
+        prompt_template.main(args=args, prog_name="prompt-template", standalone_mode=False, obj=obj)
+        error = None
+    except Exception as e:
+        logger.error(f"Chain {name} failed: {e}")
+        error = str(e) or type(e).__name__
+
+    return name, args, error, time.perf_counter() - start
+
+
+@prompt_template.command()
+@click.option('--script', 'script_file', type=click.Path(exists=True, dir_okay=False), required=True)
+@click.option('--jobs', 'jobs', type=click.IntRange(min=1), default=1, help="Run independent chains on this many threads")
+@click.option('--cache-entries', 'cache_entries', type=click.IntRange(min=0), help="Maximum number of parsed templates to keep, 0 disables the cache. Default: 64")
+@click.option('--cache-bytes', 'cache_bytes', type=click.IntRange(min=0), help="Maximum size of the parsed templates to keep. Default: 64 MiB")
+@click.pass_obj
+def batch(obj: dict, script_file: str, jobs: int, cache_entries: int = None, cache_bytes: int = None):
+    """Run many prompt-template command chains in one process, sharing parsed templates"""
+    chains = _read_batch_script(script_file)
+    click.echo(f"Running {len(chains)} command chains from: {script_file}", err=True)
+
+    with PromptTemplateHelper.cache.enable(cache_entries, cache_bytes), ThreadPoolExecutor(max_workers=jobs) as executor:
+        results = list(executor.map(lambda chain: _run_chain(*chain, obj["compact_history"]), chains))
+        cache_report = PromptTemplateHelper.cache.report()
+
+    failed = 0
+    for name, args, error, elapsed in results:
+        status = "ok" if error is None else f"failed: {error}"
+        failed += error is not None
+        click.echo(f"[{name}] {status} ({elapsed:.3f} s): {shlex.join(args)}", err=True)
+
+    click.echo(f"{len(results)} chains: {len(results) - failed} ok, {failed} failed", err=True)
+    _echo_cache_stats(cache_report)
+    if failed:
+        raise click.ClickException(f"{failed} command chains failed")
+
+
+def _chain_args(chain: str, file_path: str) -> list:
+    name = os.path.basename(file_path).split(".")[0]
+    # Plain replacements, template expressions such as {!$Input:Account} may appear in arguments
+    return [ arg.replace("{file}", file_path).replace("{name}", name) for arg in shlex.split(chain) ]
+
+
+@prompt_template.command()
+@click.option('--source-dir', 'source_dir', type=click.Path(exists=True, file_okay=False), default="force-app/main/default/genAiPromptTemplates")
+@click.option('--run', 'chains', type=click.STRING, multiple=True, required=True, help="Command chain to run for every changed file, {file} and {name} are replaced")
+@click.option('--interval', 'interval', type=click.FloatRange(min=0.01), default=0.1, help="Seconds between two scans")
+@click.option('--debounce', 'debounce', type=click.FloatRange(min=0), default=0.15, help="Seconds without changes that end a burst of changes")
+@click.option('--jobs', 'jobs', type=click.IntRange(min=1), default=1, help="Run the chains of different files on this many threads")
+@click.option('--max-updates', 'max_updates', type=click.IntRange(min=1), help="Stop after this many updates")
+@click.pass_obj
+def watch(obj: dict, source_dir: str, chains: tuple, interval: float, debounce: float, jobs: int, max_updates: int = None):
+    """Re-run command chains on the templates that change, until interrupted.
+
+    Chains should write outside the watched directory, otherwise their own outputs trigger new updates.
+    """
+    watcher = DirectoryWatcher(source_dir, "genAiPromptTemplate", interval, debounce)
+    click.echo(f"Watching {source_dir}, press Ctrl+C to stop", err=True)
+
+    updates = 0
+    with PromptTemplateHelper.cache.enable():
+        try:
+            while max_updates is None or updates < max_updates:
+                update = watcher.next_update()
+                start = time.time()
+
+                for file_path in sorted(update.removed):
+                    click.echo(f"Removed: {file_path}", err=True)
+
+                runs = [
+                    (f"{relative_path(file_path)} {index}", _chain_args(chain, file_path))
+                    for file_path in sorted(update.changed)
+                    for index, chain in enumerate(chains, start=1)
+                ]
+                with ThreadPoolExecutor(max_workers=jobs) as executor:
+                    results = list(executor.map(lambda run: _run_chain(*run, obj["compact_history"]), runs))
+
+                for name, args, error, elapsed in results:
+                    if error is not None:
+                        click.echo(f"[{name}] failed: {error}: {shlex.join(args)}", err=True)
+
+                end = time.time()
+                failed = sum(error is not None for _, _, error, _ in results)
+                latency = end - update.modified if update.modified else end - update.detected
+                message = (
+                    f"Update: {len(update.changed)} changed, {len(update.removed)} removed, {failed} failed | "
+                    f"detected in {(update.detected - update.modified) * 1000 if update.modified else 0:.0f} ms, "
+                    f"processed in {(end - start) * 1000:.0f} ms, {latency * 1000:.0f} ms after the last edit"
+                )
+                logger.info(message)
+                click.echo(message, err=True)
+                updates += 1
+        except KeyboardInterrupt:
+            click.echo("Stopped watching", err=True)
+        cache_report = PromptTemplateHelper.cache.report()
+
+    _echo_cache_stats(cache_report)
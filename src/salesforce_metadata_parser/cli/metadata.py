@@ -1,7 +1,17 @@
 import click
+import dataclasses
+import json
 import logging
+import sys
+import time
 
-from ..parser.metadata_parser import XmlParser
+from .directory import directory_options, raise_for_errors, run_directory_task, write_results
+from ..parser.backends import backends
+from ..metadata.validation import validate as validate_metadata
+from ..parser.directory import default_source_dir, find_metadata_files, merge_results as merge_results_documents
+from ..parser.interning import StringPool
+from ..parser.manifest import relative_path
+from ..parser.metadata_parser import XmlParser, lazy_text_modes
 
 logger = logging.getLogger(__name__)
 
@@ -17,6 +27,176 @@ def parse(ctx, source_file):
     # Implementation will go here
     logger.debug(f"source_file: {source_file}")
 
-    click.echo(f"Parsing metadata file: {source_file}")
+    click.echo(f"Parsing metadata file: {source_file}", err=True)
     metadata = XmlParser.from_xml_file(source_file)
     ctx.obj["metadata"] = metadata
+
+
+@metadata.command()
+@directory_options
+@click.option('--intern/--no-intern', 'intern', default=True, help="Deduplicate repeated strings while parsing")
+@click.option('--lazy-text', 'lazy_text', type=click.Choice(lazy_text_modes[1:]), help="Leave large text values in the file contents until they are read")
+@click.option('--compact-history', 'compact_history', is_flag=True, help="Keep older template versions as deltas of the newest one")
+@click.pass_context
+def parse_dir(ctx, intern: bool, lazy_text: str, compact_history: bool, **options):
+    """Parse every Salesforce metadata file of a directory."""
+    click.echo(f"Parsing metadata files from: {options['source_dir']}", err=True)
+
+    # One pool per run: it holds the large values it has seen until the documents are released
+    string_pool = StringPool() if intern else None
+    parser = XmlParser(string_pool=string_pool, lazy_text=lazy_text, compact_history=compact_history)
+    documents = {}
+
+    def parse_file(file_path: str) -> dict:
+        metadata = parser.parse_file(file_path)
+        documents[relative_path(file_path)] = metadata
+        return { "type": metadata._TypeName, "fingerprint": metadata._fingerprint() }
+
+    document = run_directory_task(parse_file, "metadata.parse-dir", **options)
+    ctx.obj["documents"] = documents
+
+    if intern:
+        report = string_pool.report()
+        click.echo(
+            f"Interning: {report['duplicates']} of {report['lookups']} strings were duplicates, "
+            f"{report['bytes_saved'] / 1024:.1f} KiB saved "
+            f"(pool holds {report['held_values']} distinct large values, {report['held_bytes'] / 1024:.1f} KiB)",
+            err=True,
+        )
+
+    raise_for_errors(document)
+
+
+@metadata.command()
+@directory_options
+def validate(**options):
+    """Check required fields, enum values and references of every metadata file of a directory."""
+    parser = XmlParser()
+
+    def validate_file(file_path: str) -> dict:
+        try:
+            metadata = parser.parse_file(file_path)
+        except Exception as e:
+            return { "type": None, "valid": False, "issues": [ { "path": "", "rule": "parse", "message": str(e) } ] }
+
+        # Types missing from the registry are parsed as plain Metadata, without rules to check
+        cls = parser.registry.resolve(metadata._TypeName)
+        issues = validate_metadata(metadata, cls) if cls else []
+        return {
+            "type": metadata._TypeName,
+            "valid": not issues,
+            "issues": [ dataclasses.asdict(issue) for issue in issues ],
+        }
+
+    document = run_directory_task(validate_file, "metadata.validate", **options)
+    raise_for_errors(document)
+
+    invalid = { path: result for path, result in document["results"].items() if result and not result["valid"] }
+    if options["output_file"] != "-":
+        for path, result in invalid.items():
+            for issue in result["issues"]:
+                click.echo(f"{path}: {issue['path']}: {issue['message']}")
+
+    if invalid:
+        raise click.ClickException(f"{len(invalid)} of {len(document['results'])} files are not valid")
+    click.echo(f"{len(document['results'])} files are valid", err=options["output_file"] == "-")
+
+
+@metadata.command()
+@click.argument('result_files', nargs=-1, required=True, type=click.Path(exists=True, dir_okay=False))
+@click.option('--output', 'output_file', type=click.Path(dir_okay=False, writable=True), default="-", help="Write the merged results as JSON ('-' for stdout)")
+def merge_results(result_files: tuple, output_file: str):
+    """Merge the JSON results written with --output by the shards of a directory command."""
+    documents = []
+    for result_file in result_files:
+        with open(result_file, "r", encoding="utf-8") as results:
+            documents.append(json.load(results))
+
+    document = merge_results_documents(documents)
+    write_results(document, output_file)
+
+    metrics = document["metrics"]
+    click.echo(
+        f"{metrics['files']} files from {metrics['shards']} documents: {metrics['processed']} processed, "
+        f"{metrics['reused']} reused in {metrics['elapsed']:.3f} s (longest shard)",
+        err=output_file == "-",
+    )
+
+
+@metadata.command()
+@click.option('--source-dir', 'source_dir', type=click.Path(exists=True, file_okay=False), default=default_source_dir)
+@click.option('--threads', 'threads', type=click.STRING, default="1,2,4,8,16", help="Comma separated thread counts to measure")
+@click.option('--repeat', 'repeat', type=click.IntRange(min=1), default=3, help="Runs per thread count, the fastest one is reported")
+def benchmark(source_dir: str, threads: str, repeat: int):
+    """Measures how parsing every file of a directory scales with the number of threads."""
+    file_paths = find_metadata_files(source_dir)
+    if not file_paths:
+        raise click.ClickException(f"No metadata files found in {source_dir}")
+
+    thread_counts = [ int(count) for count in threads.split(",") ]
+
+    # Free-threaded builds (3.13t) report whether the GIL was re-enabled at runtime
+    gil_enabled = getattr(sys, "_is_gil_enabled", lambda: True)()
+    click.echo(f"Python {sys.version.split()[0]} | GIL enabled: {gil_enabled} | {len(file_paths)} files")
+    click.echo(f"{'threads':>8} {'seconds':>10} {'files/s':>10} {'speedup':>8}")
+
+    # One parser shared by every thread
+    parser = XmlParser()
+    baseline = None
+    for thread_count in thread_counts:
+        elapsed = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in parser.parse_files(file_paths, max_workers=thread_count):
+                pass
+            run_elapsed = time.perf_counter() - start
+            elapsed = run_elapsed if elapsed is None else min(elapsed, run_elapsed)
+
+        baseline = baseline or elapsed
+        click.echo(f"{thread_count:>8} {elapsed:>10.3f} {len(file_paths) / elapsed:>10.1f} {baseline / elapsed:>7.2f}x")
+
+
+@metadata.command()
+@click.option('--source-dir', 'source_dir', type=click.Path(exists=True, file_okay=False), default=default_source_dir)
+@click.option('--repeat', 'repeat', type=click.IntRange(min=1), default=3, help="Runs per backend, the fastest one is reported")
+def benchmark_backends(source_dir: str, repeat: int):
+    """Compares the XML backends parsing and writing every file of a directory.
+
+    Backends write through their element tree (dump_tree_string), "plan" is the default writer of dump_string.
+    """
+    file_paths = find_metadata_files(source_dir)
+    if not file_paths:
+        raise click.ClickException(f"No metadata files found in {source_dir}")
+
+    click.echo(f"{len(file_paths)} files")
+    click.echo(f"{'backend':>8} {'parse s':>10} {'write s':>10} {'files/s':>10}")
+
+    for name, backend in backends.items():
+        if not backend.available():
+            click.echo(f"{name:>8} not installed")
+            continue
+
+        parser = XmlParser(backend=name)
+        writers = [ (name, parser.dump_tree_string) ]
+        if name == parser.backend.name and name == XmlParser().backend.name:
+            writers.append(("plan", parser.dump_string))
+
+        parse_elapsed = None
+        write_elapsed = { writer_name: None for writer_name, _ in writers }
+        for _ in range(repeat):
+            start = time.perf_counter()
+            documents = [ parser.parse_file(file_path) for file_path in file_paths ]
+            run_elapsed = time.perf_counter() - start
+            parse_elapsed = run_elapsed if parse_elapsed is None else min(parse_elapsed, run_elapsed)
+
+            for writer_name, write in writers:
+                start = time.perf_counter()
+                for document in documents:
+                    write(document)
+                run_elapsed = time.perf_counter() - start
+                elapsed = write_elapsed[writer_name]
+                write_elapsed[writer_name] = run_elapsed if elapsed is None else min(elapsed, run_elapsed)
+
+        for writer_name, elapsed in write_elapsed.items():
+            total = parse_elapsed + elapsed
+            click.echo(f"{writer_name:>8} {parse_elapsed:>10.3f} {elapsed:>10.3f} {len(file_paths) / total:>10.1f}")
@@ -20,7 +20,7 @@ default_config = {
             "class": "logging.StreamHandler",
             "formatter": "simpleFormatter",
             "level": "INFO",
-            "stream": "ext://sys.stdout"
+            "stream": "ext://sys.stderr"
         },
         "fileHandler": {
             "class": "logging.handlers.TimedRotatingFileHandler",
@@ -1,6 +1,15 @@
 # Standard Library imports
+from collections.abc import MutableSequence
+import dataclasses
 from dataclasses import dataclass, field
-from typing import Any, Optional, List
+from enum import Enum
+import functools
+import hashlib
+from typing import Any, Optional, List, Tuple
+import weakref
+
+# Project imports
+from .lazy import LazyText
 
 @dataclass(kw_only=True)
 class XmlNode():
@@ -13,11 +22,26 @@ class XmlNode():
         return { key: value for key, value in self.__dict__ if not key.startswith("_") }
     
     def _get_value(self, key: str) -> str:
-        return self.__dict__.get(key, None)
+        return get_value(self, key)
     
     def _get_list(self, key: str) -> List:
         return self.__dict__.get(key, List())
 
+    def _fingerprint(self) -> str:
+        return fingerprint(self)
+
+    def __setattr__(self, name: str, value: Any):
+        # About 0.5 µs per assignment on top of a plain attribute. Parsers and copy_node fill
+        # __dict__ directly, see new_node, so only code that edits or builds nodes pays for it.
+        _set_field(self, name, value)
+
+    def __delattr__(self, name: str):
+        object.__delattr__(self, name)
+        invalidate(self)
+
+    def __getstate__(self) -> dict:
+        return _state(self)
+
 
 @dataclass
 class XmlRoot:
@@ -32,19 +56,344 @@ class XmlRoot:
     _Directory: Optional[str] = field(repr=False, default=None)
     _TypeName: Optional[str] = field(repr=False, default=None)
 
+    def _fingerprint(self) -> str:
+        return fingerprint(self)
+
+    def __setattr__(self, name: str, value: Any):
+        _set_field(self, name, value)
+
+    def __delattr__(self, name: str):
+        object.__delattr__(self, name)
+        invalidate(self)
+
+    def __getstate__(self) -> dict:
+        return _state(self)
+
+
+cache_keys = frozenset(("_fingerprint_cache", "_parent"))
+"""Entries of a node __dict__ that belong to the fingerprint cache, never copied nor pickled"""
+
+
+def invalidate(node: Any):
+    """Clears the cached fingerprint of a node and of every ancestor it was computed for.
+
+    A node without a cached fingerprint has none cached above it either, so the walk stops there.
+    """
+    stack = [ node ]
+    while stack:
+        node = stack.pop()
+        node_dict = node.__dict__
+        if node_dict.pop("_fingerprint_cache", None) is None:
+            continue
+        parent = node_dict.get("_parent", None)
+        if parent is None:
+            continue
+        for reference in parent if type(parent) is tuple else (parent, ):
+            parent_node = reference()
+            if parent_node is not None:
+                stack.append(parent_node)
+
+
+def _set_field(node: Any, name: str, value: Any):
+    if name[0] != "_":
+        if type(value) is list:
+            # Tracked, so changes made to the list in place reach the node
+            value = NodeList(value)
+        object.__setattr__(node, name, value)
+        if "_fingerprint_cache" in node.__dict__:
+            invalidate(node)
+    else:
+        object.__setattr__(node, name, value)
+
+
+def _state(node: Any) -> dict:
+    state = node.__dict__
+    if "_fingerprint_cache" in state or "_parent" in state:
+        # Parent links are weak references, copies compute their own fingerprints
+        state = { key: value for key, value in state.items() if key not in cache_keys }
+    return state
+
+
+class NodeList(list):
+    """List field of a node. Changes made in place clear the cached fingerprint of the node.
+
+    Nodes convert the lists assigned to their fields, and the parser and copy_node create these,
+    so the cache only has to trust values that report their changes.
+    """
+
+    __slots__ = ("_owner", )
+
+    def __init__(self, items: Any = ()):
+        super().__init__(items)
+        self._owner = None
+        """Weak reference to the node holding the list, set when its fingerprint is computed"""
+
+    def _changed(self):
+        owner = self._owner
+        if owner is not None:
+            node = owner()
+            if node is not None:
+                invalidate(node)
+
+    def __reduce__(self):
+        return (NodeList, (list(self), ))
+
+    def __setitem__(self, index: Any, value: Any):
+        super().__setitem__(index, value)
+        self._changed()
+
+    def __delitem__(self, index: Any):
+        super().__delitem__(index)
+        self._changed()
+
+    def __iadd__(self, items: Any) -> "NodeList":
+        super().__iadd__(items)
+        self._changed()
+        return self
+
+    def __imul__(self, count: int) -> "NodeList":
+        super().__imul__(count)
+        self._changed()
+        return self
+
+    def append(self, item: Any):
+        super().append(item)
+        self._changed()
+
+    def extend(self, items: Any):
+        super().extend(items)
+        self._changed()
+
+    def insert(self, index: int, item: Any):
+        super().insert(index, item)
+        self._changed()
+
+    def pop(self, index: int = -1) -> Any:
+        item = super().pop(index)
+        self._changed()
+        return item
+
+    def remove(self, item: Any):
+        super().remove(item)
+        self._changed()
+
+    def clear(self):
+        super().clear()
+        self._changed()
+
+    def sort(self, *args, **kwargs):
+        super().sort(*args, **kwargs)
+        self._changed()
+
+    def reverse(self):
+        super().reverse()
+        self._changed()
+
+
+@functools.lru_cache(maxsize=None)
+def _field_defaults(cls: type) -> Tuple[Tuple[str, Any, Any], ...]:
+    return tuple(
+        (field.name, field.default, field.default_factory)
+        for field in (dataclasses.fields(cls) if dataclasses.is_dataclass(cls) else ())
+    )
+
+
+def new_node(cls: type) -> Any:
+    """Same as cls() for the node classes, without the __setattr__ call of every field. Used by parsers."""
+    node = cls.__new__(cls)
+    node_dict = node.__dict__
+    for name, default, default_factory in _field_defaults(cls):
+        if default is dataclasses.MISSING:
+            default = default_factory()
+            if type(default) is list:
+                default = NodeList(default)
+        node_dict[name] = default
+    return node
+
 
 def get_value(metadata: XmlNode, key: str) -> Any:
-    return metadata.__dict__.get(key, None)
+    value = metadata.__dict__.get(key, None)
+    if type(value) is LazyText:
+        value = metadata.__dict__[key] = str(value)
+    return value
 
 def get_list(metadata: XmlNode, key: str) -> Any:
     if key not in metadata.__dict__.keys():
-        metadata.__dict__[key] = List()
+        setattr(metadata, key, NodeList())
     return metadata.__dict__[key]
 
 def set_value(metadata: XmlNode, key: str, value: Any):
-    metadata.__dict__[key] = value
+    setattr(metadata, key, value)
 
 def append_list(metadata: XmlNode, key: str, value: Any):
-    if key not in metadata.__dict__.keys():
-        metadata.__dict__[key] = List()
-    metadata.__dict__[key].append(value)
+    get_list(metadata, key).append(value)
+
+
+def copy_node(value: Any) -> Any:
+    """Copies the nodes and lists of a tree, sharing the immutable values. Faster than copy.deepcopy."""
+    if isinstance(value, (XmlNode, XmlRoot)):
+        node = value.__class__.__new__(value.__class__)
+        node.__dict__.update(
+            (key, item if key[0] == "_" else copy_node(item))
+            for key, item in value.__dict__.items() if key not in cache_keys
+        )
+        return node
+    if isinstance(value, list):
+        return NodeList([ copy_node(item) for item in value ])
+    if isinstance(value, MutableSequence):
+        # Sequences that store their items in another form, see history.VersionHistory
+        return value.copy()
+    return value
+
+
+def _link(node: Any, parent: weakref.ref):
+    """Records the node whose fingerprint was computed from the fingerprint of this one"""
+    node_dict = node.__dict__
+    current = node_dict.get("_parent", None)
+    # Plain weak references to an object are shared, so identity tells the same parent
+    if current is parent:
+        return
+    if current is None or (type(current) is not tuple and current() is None):
+        node_dict["_parent"] = parent
+    elif type(current) is tuple:
+        # Shared by several trees: every one of them is invalidated
+        if all(reference is not parent for reference in current):
+            node_dict["_parent"] = tuple(reference for reference in current if reference() is not None) + (parent, )
+    else:
+        node_dict["_parent"] = (current, parent)
+
+
+class ItemLink(weakref.ref):
+    """Parent link of a node held by a sequence that stores its items in another form, such as a
+    history.VersionHistory. Tells the sequence which item changed, see invalidate, and leads on
+    to the node holding the sequence, through its _owner weak reference."""
+
+    __slots__ = ("node", "key")
+
+    def __new__(cls, sequence: Any, node: Any, key: Any):
+        return super().__new__(cls, sequence)
+
+    def __init__(self, sequence: Any, node: Any, key: Any):
+        super().__init__(sequence)
+        self.node = weakref.ref(node)
+        self.key = key
+
+    def __call__(self) -> Any:
+        sequence = super().__call__()
+        node = self.node()
+        if sequence is None or node is None:
+            return None
+        sequence._item_changed(self.key, node)
+        owner = sequence._owner
+        return None if owner is None else owner()
+
+
+def item_link(node: Any) -> Optional[ItemLink]:
+    """The ItemLink of a node, also when other trees were linked to it since"""
+    parent = node.__dict__.get("_parent", None)
+    for reference in parent if type(parent) is tuple else (parent, ):
+        if type(reference) is ItemLink:
+            return reference
+    return None
+
+
+def unlink_item(node: Any):
+    """Removes the ItemLink of a node, later changes stay on the node"""
+    link = item_link(node)
+    if link is None:
+        return
+    parent = node.__dict__["_parent"]
+    if type(parent) is not tuple:
+        del node.__dict__["_parent"]
+    elif len(parent) > 2:
+        node.__dict__["_parent"] = tuple(reference for reference in parent if reference is not link)
+    else:
+        node.__dict__["_parent"] = parent[0] if parent[1] is link else parent[1]
+
+
+def watch(node: Any):
+    """Links the nodes and lists of a tree to their parents as computing its fingerprint does,
+    without computing it, so changes made anywhere in the tree reach the parent link of the node.
+    Nodes are marked with a False fingerprint, which invalidate clears as it does a digest."""
+    stack = [ node ]
+    while stack:
+        node = stack.pop()
+        node_dict = node.__dict__
+        if "_fingerprint_cache" in node_dict:
+            # Linked when its digest was computed
+            continue
+        node_dict["_fingerprint_cache"] = False
+        parent = weakref.ref(node)
+        values = [ value for name, value in node_dict.items() if name[0] != "_" ]
+        while values:
+            value = values.pop()
+            if isinstance(value, (XmlNode, XmlRoot)):
+                _link(value, parent)
+                stack.append(value)
+            elif type(value) is NodeList:
+                value._owner = parent
+                values.extend(value)
+
+
+def _value_token(value: Any, parent: weakref.ref) -> Tuple[Any, bool]:
+    """Part of a node's digest that stands for the value of one of its fields,
+    and whether changes to the value would be reported to the node"""
+    if isinstance(value, (XmlNode, XmlRoot)):
+        digest, tracked = _digest(value)
+        _link(value, parent)
+        return digest, tracked
+    if isinstance(value, MutableSequence):
+        tokens = getattr(value, "_fingerprint_tokens", None)
+        if tokens is not None:
+            # Sequences that track their own changes, such as a VersionHistory
+            return tokens(parent)
+        tracked = type(value) is NodeList
+        if tracked:
+            value._owner = parent
+        items = []
+        for item in value:
+            token, item_tracked = _value_token(item, parent)
+            items.append(token)
+            tracked = tracked and item_tracked
+        return tuple(items), tracked
+    if isinstance(value, Enum):
+        return value.value, True
+    if isinstance(value, LazyText):
+        # Same digest as the str value, without materializing it on the node
+        return str(value), True
+    return value, True
+
+
+def _digest(metadata: Any) -> Tuple[str, bool]:
+    cached = metadata.__dict__.get("_fingerprint_cache", None)
+    if cached:
+        return cached, True
+
+    parent = weakref.ref(metadata)
+    tracked = True
+    key = []
+    for name, value in metadata.__dict__.items():
+        if name[0] != "_" and value is not None:
+            token, value_tracked = _value_token(value, parent)
+            key.append((name, token))
+            tracked = tracked and value_tracked
+    key = tuple(key)
+    if isinstance(metadata, XmlRoot):
+        key = (metadata._TypeName, key)
+
+    digest = hashlib.blake2b(repr(key).encode("utf-8"), digest_size=16).hexdigest()
+    if tracked:
+        metadata.__dict__["_fingerprint_cache"] = digest
+    return digest, tracked
+
+
+def fingerprint(metadata: Any) -> str:
+    """Returns a stable content hash of a node and all its visible descendants.
+
+    Digests are cached on every node and trusted until the node changes. Assigning a field, or
+    changing a NodeList field in place, clears the cache of the node and of its ancestors, found
+    through the weak parent links recorded when their digests were computed. Unchanged subtrees
+    are never visited again. Nodes holding values that do not report their changes, such as
+    plain lists written directly into __dict__, are hashed again on every call.
+    """
+    return _digest(metadata)[0]
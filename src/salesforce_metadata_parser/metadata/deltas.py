@@ -0,0 +1,133 @@
+# Standard Library imports
+import difflib
+from typing import Any, Dict, Tuple
+
+# Project imports
+from .base import XmlNode, XmlRoot, cache_keys, copy_node, fingerprint
+from .lazy import LazyText
+
+
+class Missing:
+    """Change of a field the older version does not have"""
+
+
+class TextDelta:
+    """Line changes that turn the text of the newer version into the text of the older one"""
+
+    __slots__ = ("changes",)
+
+    def __init__(self, changes: Tuple[Tuple[int, int, str], ...]):
+        self.changes = changes
+        """(start, end, text): lines start to end of the newer text are replaced by text"""
+
+
+    @staticmethod
+    def between(newer: str, older: str) -> "TextDelta":
+        """The delta from newer to older, or None when it would not be much smaller than older"""
+        newer_lines = newer.splitlines(keepends=True)
+        older_lines = older.splitlines(keepends=True)
+
+        # Lines shared at both ends are left out of the matcher, which is quadratic at worst
+        head = 0
+        limit = min(len(newer_lines), len(older_lines))
+        while head < limit and newer_lines[head] == older_lines[head]:
+            head += 1
+        tail = 0
+        while tail < limit - head and newer_lines[-1 - tail] == older_lines[-1 - tail]:
+            tail += 1
+
+        matcher = difflib.SequenceMatcher(
+            None, newer_lines[head : len(newer_lines) - tail], older_lines[head : len(older_lines) - tail], autojunk=False
+        )
+        changes = tuple(
+            (head + start, head + end, "".join(older_lines[head + older_start : head + older_end]))
+            for tag, start, end, older_start, older_end in matcher.get_opcodes()
+            if tag != "equal"
+        )
+        if sum(len(text) for _, _, text in changes) * 2 > len(older):
+            return None
+        return TextDelta(changes)
+
+
+    def apply(self, newer: str) -> str:
+        lines = newer.splitlines(keepends=True)
+        parts = []
+        position = 0
+        for start, end, text in self.changes:
+            parts.extend(lines[position : start])
+            parts.append(text)
+            position = end
+        parts.extend(lines[position : ])
+        return "".join(parts)
+
+
+def _token(value: Any) -> Any:
+    if isinstance(value, (XmlNode, XmlRoot)):
+        return fingerprint(value)
+    if isinstance(value, list):
+        return tuple(_token(item) for item in value)
+    if isinstance(value, LazyText):
+        return str(value)
+    return value
+
+
+def _values(node: Any) -> Dict[str, Any]:
+    """Fields of a node, without its cached fingerprint"""
+    return { name: value for name, value in node.__dict__.items() if name not in cache_keys }
+
+
+def _snapshot(node: Any) -> Dict[str, Any]:
+    """Fields of a node copied, so later changes to the node do not reach the history"""
+    return { name: value if name[0] == "_" else copy_node(value) for name, value in _values(node).items() }
+
+
+class VersionDelta:
+    """Changes that turn the fields of the newer version into the fields of the older one"""
+
+    __slots__ = ("cls", "changes", "order")
+
+    def __init__(self, cls: type, changes: Dict[str, Any], order: Tuple[str, ...] = None):
+        self.cls = cls
+        self.changes = changes
+        """Field name to its older value, a TextDelta of its newer value, or Missing"""
+
+        self.order = order
+        """Field order of the older version, when applying the changes gives another one"""
+
+
+    @staticmethod
+    def between(cls: type, newer: Dict[str, Any], older_values: Dict[str, Any]) -> "VersionDelta":
+        """The delta that turns the newer fields into older_values, the fields of a version of class cls"""
+        changes = {}
+        for name, value in older_values.items():
+            if name in newer and (newer[name] is value or _token(newer[name]) == _token(value)):
+                continue
+            newer_value = newer.get(name, None)
+            if type(value) is str and type(newer_value) is str and "\n" in value:
+                text_delta = TextDelta.between(newer_value, value)
+                if text_delta is not None:
+                    changes[name] = text_delta
+                    continue
+            changes[name] = value if name[0] == "_" else copy_node(value)
+
+        for name in newer:
+            if name not in older_values:
+                changes[name] = Missing
+
+        order = tuple(older_values)
+        applied = tuple(name for name in newer if name in older_values) + tuple(name for name in older_values if name not in newer)
+        return VersionDelta(cls, changes, order if applied != order else None)
+
+
+    def apply(self, newer: Dict[str, Any]) -> Dict[str, Any]:
+        values = dict(newer)
+        for name, change in self.changes.items():
+            if change is Missing:
+                del values[name]
+            elif type(change) is TextDelta:
+                values[name] = change.apply(newer[name])
+            else:
+                values[name] = change
+        if self.order is not None:
+            values = { name: values[name] for name in self.order }
+        return values
@@ -5,6 +5,7 @@ from enum import Enum
 from typing import List, Optional
 
 from .base import XmlNode
+from .lazy import LazyTextField
 from .metadata import Metadata
 
 # Documentation: https://developer.salesforce.com/docs/atlas.en-us.api_meta.meta/api_meta/meta_genaiprompttemplate.htm
@@ -47,13 +48,13 @@ class GenAiPromptTemplateVisibilityType(Enum):
 class GenAiPromptTemplateDataProviderParam(XmlNode):
     # Documentation: https://developer.salesforce.com/docs/atlas.en-us.api_meta.meta/api_meta/meta_genaiprompttemplate.htm#genaiprompttemplatedataproviderparam
 
-    definition: Optional[str] = None
+    definition: Optional[str] = field(default=None, metadata={"required": True})
     """Required. URI definition of the parameter. For example,  SOBJECT://User</definition>."""
 
-    isRequired: Optional[bool] = None
+    isRequired: Optional[bool] = field(default=None, metadata={"required": True})
     """Required. Specifies whether the parameter is required (true) or optional (false)."""
 
-    parameterName: Optional[str] = None
+    parameterName: Optional[str] = field(default=None, metadata={"required": True})
     """Required. Name of the parameter."""
 
     valueExpression: Optional[str] = None
@@ -64,16 +65,16 @@ class GenAiPromptTemplateDataProviderParam(XmlNode):
 class GenAiPromptTemplateDataProvider(XmlNode):
     # Documentation: https://developer.salesforce.com/docs/atlas.en-us.api_meta.meta/api_meta/meta_genaiprompttemplate.htm#genaiprompttemplatedataprovider
 
-    definition: Optional[str] = None
+    definition: Optional[str] = field(default=None, metadata={"required": True})
     """Required. The URI definition of the data provider, such as flow://ns__CallToActionFlow."""
 
     parameters: List[GenAiPromptTemplateDataProviderParam] = field(default_factory=list)
     """An array of parameters associated with the data provider."""
 
-    referenceName: Optional[str] = None
+    referenceName: Optional[str] = field(default=None, metadata={"required": True})
     """Required. Name of the data provider to use in expressions."""
 
-    sub_classes: Optional[dict] = field(repr=False, default=lambda: {
+    _sub_classes: Optional[dict] = field(repr=False, default_factory=lambda: {
         "parameters": GenAiPromptTemplateDataProviderParam
     })
 
@@ -81,10 +82,10 @@ class GenAiPromptTemplateDataProvider(XmlNode):
 class GenAiPromptTemplateInput(XmlNode):
     # Documentation: https://developer.salesforce.com/docs/atlas.en-us.api_meta.meta/api_meta/meta_genaiprompttemplate.htm#genaiprompttemplateinput
 
-    apiName: Optional[str] = None
+    apiName: Optional[str] = field(default=None, metadata={"required": True})
     """Required. Name of the prompt template input parameter."""
 
-    definition: Optional[str] = None
+    definition: Optional[str] = field(default=None, metadata={"required": True})
     """Required. The URI definition of the input parameter. For example, SOBJECT://Account and SOBJECT://Account/Description."""
 
     description: Optional[str] = None
@@ -93,10 +94,10 @@ class GenAiPromptTemplateInput(XmlNode):
     masterLabel: Optional[str] = None
     """A user-friendly name for GenAiPromptTemplateInput, which is defined when the GenAiPromptTemplateInput is created."""
 
-    referenceName: Optional[str] = None
+    referenceName: Optional[str] = field(default=None, metadata={"required": True})
     """Required. Name of the prompt template input to use in expressions. For example, Input:Recipient and Input:Sender</referenceName>."""
 
-    required: Optional[bool] = None
+    required: Optional[bool] = field(default=None, metadata={"required": True})
     """Required. Specifies whether this input parameter is required (True) or optional (False)."""
 
 
@@ -111,10 +112,10 @@ class GenAiGenerationTemplateConfig(XmlNode):
 class GenAiPromptTemplateVersion(XmlNode):
     # Documentation: https://developer.salesforce.com/docs/atlas.en-us.api_meta.meta/api_meta/meta_genaiprompttemplate.htm#genaiprompttemplateversion
 
-    content: Optional[str] = None
+    content: Optional[str] = field(default=LazyTextField(), metadata={"required": True})
     """Required. Text of the prompt template version."""
 
-    description: Optional[str] = None
+    description: Optional[str] = LazyTextField()
     """Description of the prompt template version."""
 
     generationTemplateConfigs: List = field(default_factory=list)
@@ -126,7 +127,7 @@ class GenAiPromptTemplateVersion(XmlNode):
     primaryModel: Optional[str] = None
     """The model associated with the prompt template version."""
 
-    status: Optional[GenAiPromptTemplateStatus] = None
+    status: Optional[GenAiPromptTemplateStatus] = field(default=None, metadata={"required": True})
     """
     Required. Indicates the status of the prompt template in Prompt Builder. Valid values are:
         
@@ -145,17 +146,17 @@ class GenAiPromptTemplateVersion(XmlNode):
     # This tag will be deprecated in 63.0 and will not work in 64.0 and later. Use versionIdentifier instead.
     # """
 
-    versionIdentifier: Optional[str] = None
+    versionIdentifier: Optional[str] = field(default=None, metadata={"required": True})
     """Required. Identifier for the version."""
 
-    sub_classes: Optional[dict] = field(repr=False, default=lambda: {
+    _sub_classes: Optional[dict] = field(repr=False, default_factory=lambda: {
         "generationTemplateConfigs": GenAiGenerationTemplateConfig,
         "inputs": GenAiPromptTemplateInput,
         "status": GenAiPromptTemplateStatus,
         "templateDataProviders": GenAiPromptTemplateDataProvider,
     })
 
-    tag_name: Optional[str] = field(repr=False, default="templateVersions")
+    _tag_name: Optional[str] = field(repr=False, default="templateVersions")
 
 
 @dataclass
@@ -164,7 +165,7 @@ class GenAiPromptTemplate(Metadata):
     # activeVersion: int
     # """This tag will be deprecated in 63.0 and will not work in 64.0 and later. Use activeVersionIdentifier instead."""
 
-    activeVersionIdentifier: Optional[str] = None
+    activeVersionIdentifier: Optional[str] = field(default=None, metadata={"references": "templateVersions.versionIdentifier"})
     """Specifies the version identifier of the active prompt template version. This tag will use versionIdentifier as the value for the active version."""
 
     description: Optional[str] = None
@@ -173,7 +174,7 @@ class GenAiPromptTemplate(Metadata):
     developerName: Optional[str] = None
     """Developer name of the prompt template, derived from the XML filename."""
 
-    masterLabel: Optional[str] = None
+    masterLabel: Optional[str] = field(default=None, metadata={"required": True})
     """Required. A user-friendly name for GenAiPromptTemplate, which is defined when the GenAiPromptTemplate is created."""
 
     overrideSource: Optional[str] = None
@@ -185,10 +186,10 @@ class GenAiPromptTemplate(Metadata):
     relatedField: Optional[str] = None
     """The Salesforce field that the prompt template is associated with."""
 
-    templateVersions: List[GenAiPromptTemplateVersion] = field(default_factory=list)
-    """Required. An array of prompt template versions."""
+    templateVersions: List[GenAiPromptTemplateVersion] = field(default_factory=list, metadata={"history": True, "required": True})
+    """Required. An array of prompt template versions, oldest first. Parsers with compact_history store it as a history.VersionHistory."""
 
-    type: Optional[GenAiPromptTemplateType] = None
+    type: Optional[GenAiPromptTemplateType] = field(default=None, metadata={"required": True})
     """
     Required. Represents the template type that the prompt template is based on. Valid values are:
         einstein_gpt__fieldCompletion
@@ -209,7 +210,7 @@ class GenAiPromptTemplate(Metadata):
     _Directory: Optional[str] = field(repr=False, default="genAiPromptTemplates")
     _TypeName: Optional[str] = field(repr=False, default="GenAiPromptTemplate")
 
-    sub_classes: Optional[dict] = field(repr=False, default=lambda: {
+    _sub_classes: Optional[dict] = field(repr=False, default_factory=lambda: {
         "templateVersions": GenAiPromptTemplateVersion,
         "type": GenAiPromptTemplateType,
         "visibility": GenAiPromptTemplateVisibilityType,
@@ -0,0 +1,419 @@
+# Standard Library imports
+from collections.abc import MutableSequence
+import copy
+import dataclasses
+import functools
+import math
+from typing import Any, Dict, FrozenSet, Iterable, Iterator, List, Tuple
+import weakref
+
+# Project imports
+from .base import ItemLink, _digest, _link, copy_node, fingerprint, invalidate, item_link, unlink_item, watch
+from .deltas import Missing, TextDelta, VersionDelta, _snapshot, _values
+
+
+class VersionHistory(MutableSequence):
+    """A list of versions that stores the newest one in full and every older one as a delta.
+
+    Consecutive versions of a template usually differ by a few lines of content and a field or
+    two, so the delta of a version only holds the fields that differ from the next newer
+    version, and the changed lines of multi-line text. The newest (last) version is kept as the
+    node it was given; older versions are rebuilt from the newest one when accessed.
+
+    A rebuilt version stays the version at its index while it is referenced: reading the index
+    again returns the same node, and changes made to it or to the nodes and lists it holds are
+    encoded into the deltas before the history is next read. Iterating rebuilds each version
+    once, in order; reading older versions by index walks back from the newest one.
+    """
+
+    def __init__(self, versions: Iterable[Any] = ()):
+        self._owner = None
+        """Weak reference to the node holding the history, whose fingerprint is cleared on changes"""
+
+        self._reset(list(versions))
+
+
+    def _reset(self, versions: List[Any]):
+        self._newest = versions[-1] if versions else None
+        """Newest version, as given"""
+
+        self._base: Dict[str, Any] = _snapshot(self._newest) if versions else {}
+        """Fields of the newest version when the deltas were computed"""
+
+        self._deltas: List[VersionDelta] = []
+        """Delta of every older version, from the version after it"""
+
+        newer = self._base
+        for version in reversed(versions[ : -1]):
+            older = _values(version)
+            self._deltas.append(VersionDelta.between(type(version), newer, older))
+            newer = older
+        self._deltas.reverse()
+
+        self._cache: Tuple[int, Dict[str, Any]] = None
+        """Index and fields of the version rebuilt last, reading further back starts from there"""
+
+        self._digests: List[str] = None
+        """Fingerprints of the older versions, which only change through the methods of the history"""
+
+        for node in getattr(self, "_live", {}).values():
+            unlink_item(node)
+
+        self._live: Dict[int, Any] = weakref.WeakValueDictionary()
+        """Rebuilt older versions still referenced, by index"""
+
+        self._edits: Dict[int, Any] = {}
+        """Rebuilt older versions changed since the deltas were computed, by index"""
+
+        self._read = None
+        """Older version read last by index"""
+
+
+    def _changed(self, older: bool = True):
+        self._cache = None
+        if older:
+            self._digests = None
+        owner = self._owner
+        if owner is not None:
+            node = owner()
+            if node is not None:
+                invalidate(node)
+
+
+    def _attach(self, index: int, node: Any) -> Any:
+        """Makes a rebuilt version the live node of an older index. Every change made to it then
+        reaches the history through _item_changed."""
+        watch(node)
+        node.__dict__["_parent"] = ItemLink(self, node, index)
+        self._live[index] = node
+        return node
+
+
+    def _item_changed(self, index: int, node: Any):
+        """Called through the ItemLink of a live version when a change cleared its fingerprint"""
+        if "_fingerprint_cache" not in node.__dict__ and self._live.get(index, None) is node:
+            self._edits[index] = node
+            self._cache = None
+
+
+    def _encode_edits(self):
+        """Encodes the changes made to the live versions into the deltas around them"""
+        while self._edits:
+            index, node = self._edits.popitem()
+            self._encode(index, type(node), _values(node))
+            self._cache = None
+            # Computed again, so the next change is reported too
+            digest = fingerprint(node)
+            if self._digests is not None:
+                self._digests[index] = digest
+
+
+    def _encode(self, index: int, cls: type, values: Dict[str, Any]):
+        """Stores values as the fields of the older version at index"""
+        older = self._values_at(index - 1) if index > 0 else None
+        self._deltas[index] = VersionDelta.between(cls, self._values_at(index + 1), values)
+        if older is not None:
+            self._deltas[index - 1] = VersionDelta.between(self._deltas[index - 1].cls, values, older)
+
+
+    def _shift(self, index: int, offset: int):
+        """Moves the live versions from index on by offset, after a version is inserted or deleted"""
+        moved = [ (position, node) for position, node in self._live.items() if position >= index ]
+        for position, _ in moved:
+            del self._live[position]
+        for position, node in moved:
+            item_link(node).key = position + offset
+            self._live[position + offset] = node
+
+
+    def _release(self, index: int):
+        """Detaches the live version of an index that no longer holds it"""
+        node = self._live.pop(index, None)
+        if node is not None:
+            unlink_item(node)
+
+
+    def _older_digests(self) -> List[str]:
+        self._encode_edits()
+        if self._digests is None:
+            versions = iter(self)
+            self._digests = [ fingerprint(next(versions)) for _ in self._deltas ]
+        return self._digests
+
+
+    def _fingerprint_tokens(self, parent: Any) -> Tuple[Tuple[str, ...], bool]:
+        """Fingerprints of the versions, see base.fingerprint. Older versions are rebuilt only the first time."""
+        self._owner = parent
+        if self._newest is None:
+            return (), True
+        digests = self._older_digests()
+        digest, tracked = _digest(self._newest)
+        _link(self._newest, parent)
+        return (*digests, digest), tracked
+
+
+    def fingerprints(self) -> List[str]:
+        """Fingerprints of the versions, oldest first. Known once the history was fingerprinted,
+        so comparing two histories only rebuilds the versions that differ."""
+        if self._newest is None:
+            return []
+        return [ *self._older_digests(), fingerprint(self._newest) ]
+
+
+    def __len__(self) -> int:
+        return 0 if self._newest is None else len(self._deltas) + 1
+
+
+    def _index(self, index: int) -> int:
+        length = len(self)
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError("version index out of range")
+        return index
+
+
+    def _values_at(self, index: int) -> Dict[str, Any]:
+        """Fields of an older version, or of the newest version as recorded in the base"""
+        if index == len(self._deltas):
+            return self._base
+
+        position, values = len(self._deltas), self._base
+        if self._cache is not None and self._cache[0] >= index:
+            position, values = self._cache
+
+        for position in range(position - 1, index - 1, -1):
+            values = self._deltas[position].apply(values)
+
+        self._cache = (index, values)
+        return values
+
+
+    def _version(self, index: int, values: Dict[str, Any]) -> Any:
+        """The live node of an older version, rebuilt from its fields when there is none"""
+        node = self._live.get(index, None)
+        if node is not None:
+            return node
+        cls = self._deltas[index].cls
+        node = cls.__new__(cls)
+        node.__dict__.update((name, value if name[0] == "_" else copy_node(value)) for name, value in values.items())
+        return self._attach(index, node)
+
+
+    def __getitem__(self, index: Any) -> Any:
+        if isinstance(index, slice):
+            return VersionHistory(self[position] for position in range(*index.indices(len(self))))
+
+        self._encode_edits()
+        index = self._index(index)
+        if index == len(self._deltas):
+            return self._newest
+        node = self._live.get(index, None)
+        if node is None:
+            node = self._version(index, self._values_at(index))
+        # Also held by the history, so a change made through its fields in the same statement is kept
+        self._read = node
+        return node
+
+
+    def __setitem__(self, index: Any, version: Any):
+        if isinstance(index, slice):
+            versions = list(self)
+            versions[index] = version
+            self._reset(versions)
+            self._changed()
+            return
+
+        self._encode_edits()
+        index = self._index(index)
+        if index < len(self._deltas):
+            self._encode(index, type(version), _values(version))
+            self._release(index)
+            self._changed()
+            return
+
+        older = self._values_at(index - 1) if index > 0 else None
+        self._newest = version
+        self._base = _snapshot(version)
+        if older is not None:
+            self._deltas[index - 1] = VersionDelta.between(self._deltas[index - 1].cls, self._base, older)
+        self._changed(older=False)
+
+
+    def __delitem__(self, index: Any):
+        if isinstance(index, slice):
+            versions = list(self)
+            del versions[index]
+            self._reset(versions)
+            self._changed()
+            return
+
+        self._encode_edits()
+        index = self._index(index)
+        if len(self) == 1:
+            self._reset([])
+            self._changed()
+            return
+
+        if index == len(self._deltas):
+            # The previous version becomes the newest one
+            self._newest = self[index - 1]
+            self._base = self._values_at(index - 1)
+            self._release(index - 1)
+            del self._deltas[index - 1]
+        else:
+            older = self._values_at(index - 1) if index > 0 else None
+            newer = self._values_at(index + 1)
+            del self._deltas[index]
+            if older is not None:
+                self._deltas[index - 1] = VersionDelta.between(self._deltas[index - 1].cls, newer, older)
+            self._release(index)
+            self._shift(index + 1, -1)
+        self._changed()
+
+
+    def insert(self, index: int, version: Any):
+        self._encode_edits()
+        length = len(self)
+        if length == 0:
+            self._reset([ version ])
+            self._changed()
+            return
+
+        index = max(0, min(index + length if index < 0 else index, length))
+
+        if index == length:
+            # The newest version, as it is now, becomes a delta from the new one. It may have been
+            # changed since the deltas were computed, so the version before it is encoded again.
+            previous = self._values_at(index - 2) if index > 1 else None
+            newest = self._newest
+            current = _values(newest)
+            digests = self._digests
+            if digests is not None:
+                digests = digests + [ fingerprint(newest) ]
+            self._newest = version
+            self._base = _snapshot(version)
+            self._deltas.append(VersionDelta.between(type(newest), self._base, current))
+            if previous is not None:
+                self._deltas[index - 2] = VersionDelta.between(self._deltas[index - 2].cls, current, previous)
+            self._changed()
+            self._digests = digests
+            # Changes made to it from now on are encoded as for the other older versions
+            self._attach(index - 1, newest)
+            return
+        else:
+            older = self._values_at(index - 1) if index > 0 else None
+            self._deltas.insert(index, VersionDelta.between(type(version), self._values_at(index), _values(version)))
+            if older is not None:
+                self._deltas[index - 1] = VersionDelta.between(self._deltas[index - 1].cls, _values(version), older)
+            self._shift(index, 1)
+        self._changed()
+
+
+    def __iter__(self) -> Iterator[Any]:
+        """Rebuilds the versions oldest first, holding about the square root of their number at a time"""
+        self._encode_edits()
+        count = len(self._deltas)
+        if self._newest is None:
+            return
+
+        # Walk back once keeping checkpoints, then rebuild each block forward from the checkpoint after it
+        step = max(1, math.isqrt(count))
+        checkpoints = { count: self._base }
+        values = self._base
+        for index in range(count - 1, -1, -1):
+            values = self._deltas[index].apply(values)
+            if index % step == 0:
+                checkpoints[index] = values
+
+        for start in range(0, count, step):
+            end = min(start + step, count)
+            values = checkpoints.pop(end)
+            block = []
+            for index in range(end - 1, start - 1, -1):
+                values = self._deltas[index].apply(values)
+                block.append(self._version(index, values))
+            yield from reversed(block)
+
+        yield self._newest
+
+
+    def __reversed__(self) -> Iterator[Any]:
+        self._encode_edits()
+        if self._newest is None:
+            return
+        yield self._newest
+        values = self._base
+        for index in range(len(self._deltas) - 1, -1, -1):
+            values = self._deltas[index].apply(values)
+            yield self._version(index, values)
+
+
+    def index(self, value: Any, start: int = 0, stop: int = None) -> int:
+        for index, version in enumerate(self):
+            if index >= start and (stop is None or index < stop) and (version is value or version == value):
+                return index
+        raise ValueError(f"{value!r} is not in the history")
+
+
+    def copy(self) -> "VersionHistory":
+        """A history with its own newest version. Deltas are never changed in place, so they are shared."""
+        history = VersionHistory.__new__(VersionHistory)
+        state = self.__getstate__()
+        history.__setstate__({ **state, "_newest": copy_node(self._newest), "_deltas": list(self._deltas) })
+        return history
+
+
+    def __deepcopy__(self, memo: dict) -> "VersionHistory":
+        history = self.copy()
+        history._newest = copy.deepcopy(self._newest, memo)
+        return history
+
+
+    def __getstate__(self) -> dict:
+        self._encode_edits()
+        state = { **self.__dict__, "_cache": None, "_owner": None }
+        del state["_live"], state["_edits"], state["_read"]
+        return state
+
+
+    def __setstate__(self, state: dict):
+        digests = state["_digests"]
+        self.__dict__.update(
+            state, _digests=None if digests is None else list(digests), _live=weakref.WeakValueDictionary(), _edits={}, _read=None
+        )
+
+
+    def stored_values(self) -> List[Any]:
+        """The nodes, lists and strings the history keeps, each once, to measure its size"""
+        self._encode_edits()
+        if self._newest is None:
+            return []
+        newest = self._newest.__dict__
+        values = [ self._newest ]
+        values.extend(value for name, value in self._base.items() if newest.get(name, None) is not value)
+        for delta in self._deltas:
+            for change in delta.changes.values():
+                if type(change) is TextDelta:
+                    values.extend(text for _, _, text in change.changes)
+                elif change is not Missing:
+                    values.append(change)
+        return values
+
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, (list, VersionHistory)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+
+    def __repr__(self) -> str:
+        return f"VersionHistory({len(self)} versions, {len(self._deltas)} as deltas)"
+
+
+@functools.lru_cache(maxsize=None)
+def history_fields(cls: type) -> FrozenSet[str]:
+    """List fields of a dataclass declared with field(metadata={"history": True})"""
+    if not dataclasses.is_dataclass(cls):
+        return frozenset()
+    return frozenset(field.name for field in dataclasses.fields(cls) if field.metadata.get("history", False))
@@ -0,0 +1,164 @@
+# Standard Library imports
+import functools
+import re
+from typing import Any, FrozenSet, Set
+
+# Markup that may appear inside a text value: CDATA sections, comments and processing instructions
+markupPattern = re.compile(r"<!\[CDATA\[(?P<cdata>.*?)\]\]>|<!--.*?-->|<\?.*?\?>", re.DOTALL)
+
+referencePattern = re.compile(r"&(?:#x(?P<hex>[0-9a-fA-F]+)|#(?P<decimal>[0-9]+)|(?P<name>amp|lt|gt|quot|apos));")
+
+# Raw text is written back as is only when escaping its value gives the same bytes
+nonCanonicalBytes = (b"<", b">", b"\"", b"'", b"\r")
+otherReferencePattern = re.compile(rb"&(?!(?:amp|lt|gt|quot|apos);)")
+
+entities = { "amp": "&", "lt": "<", "gt": ">", "quot": "\"", "apos": "'" }
+
+
+def _unescape_references(text: str) -> str:
+    if "&" not in text:
+        return text
+
+    def replace(m):
+        if m.group("name"):
+            return entities[m.group("name")]
+        if m.group("hex"):
+            return chr(int(m.group("hex"), 16))
+        return chr(int(m.group("decimal")))
+
+    return referencePattern.sub(replace, text)
+
+
+def unescape_raw(raw: bytes) -> str:
+    """Decodes the raw bytes of a text value like an XML parser: line endings normalized,
+    references replaced, CDATA sections kept verbatim, comments and processing instructions dropped"""
+    text = str(raw, "utf-8")
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    if "<" not in text:
+        return _unescape_references(text)
+
+    parts = []
+    position = 0
+    for m in markupPattern.finditer(text):
+        parts.append(_unescape_references(text[position : m.start()]))
+        if m.group("cdata") is not None:
+            parts.append(m.group("cdata"))
+        position = m.end()
+    parts.append(_unescape_references(text[position : ]))
+    return "".join(parts)
+
+
+class LazyText:
+    """A text value left in the source buffer until it is read.
+
+    Nodes replace it by its str value on first attribute access, see LazyTextField.
+    Serializers that find it untouched write the source text back instead of escaping the value.
+    """
+
+    __slots__ = ("buffer", "start", "end", "canonical")
+
+    def __init__(self, buffer: Any, start: int, end: int):
+        self.buffer = buffer
+        """bytes, or an mmap of the source file"""
+
+        self.start = start
+        self.end = end
+
+        self.canonical = None
+        """Whether the source text is written like escape would write the value, checked on first use"""
+
+
+    def raw(self) -> bytes:
+        return self.buffer[self.start : self.end]
+
+
+    def __str__(self) -> str:
+        return unescape_raw(self.raw())
+
+
+    def escaped(self, escape) -> str:
+        """The value as escaped XML text: the source text when it is already written like escape would"""
+        raw = self.raw()
+        if self.canonical is None:
+            self.canonical = not (
+                any(special in raw for special in nonCanonicalBytes)
+                or (not raw.isascii() and b"\xc2\xa0" in raw)
+                or otherReferencePattern.search(raw)
+            )
+        if self.canonical:
+            return str(raw, "utf-8")
+        return escape(unescape_raw(raw))
+
+
+    def __len__(self) -> int:
+        return self.end - self.start
+
+    def __bool__(self) -> bool:
+        return self.end > self.start
+
+    def isspace(self) -> bool:
+        # Whitespace-only values are never left lazy
+        return False
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, LazyText):
+            return str(self) == str(other)
+        if isinstance(other, str):
+            return str(self) == other
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash(str(self))
+
+    def __repr__(self) -> str:
+        return f"LazyText({self.end - self.start} bytes)"
+
+    def __copy__(self) -> "LazyText":
+        return self
+
+    def __deepcopy__(self, memo: dict) -> "LazyText":
+        return self
+
+    def __reduce__(self):
+        # Pickles keep only the bytes of the value, not the whole buffer or the mapping
+        return (LazyText, (bytes(self.raw()), 0, self.end - self.start))
+
+
+lazy_field_names: Set[str] = set()
+"""Names of every LazyTextField declared so far, the tags parsers may leave lazy"""
+
+
+class LazyTextField:
+    """Default of a dataclass field that may hold a LazyText, such as the content of a template version.
+
+    The value is stored in the instance __dict__ like any other field, so parsers and serializers
+    still see the LazyText. Attribute access replaces it by its str value first.
+    """
+
+    def __init__(self, default: Any = None):
+        self.default = default
+
+    def __set_name__(self, owner: type, name: str):
+        self.name = name
+        lazy_field_names.add(name)
+
+    def __get__(self, node: Any, owner: type = None) -> Any:
+        if node is None:
+            # Read by dataclass as the field default
+            return self.default
+        value = node.__dict__.get(self.name, self.default)
+        if type(value) is LazyText:
+            value = node.__dict__[self.name] = str(value)
+        return value
+
+    def __set__(self, node: Any, value: Any):
+        node.__dict__[self.name] = value
+
+
+@functools.lru_cache(maxsize=None)
+def lazy_fields(cls: type) -> FrozenSet[str]:
+    """Fields of a class declared with a LazyTextField"""
+    return frozenset(
+        name for klass in cls.__mro__ for name, value in vars(klass).items() if isinstance(value, LazyTextField)
+    )
@@ -0,0 +1,87 @@
+# Standard Library imports
+from dataclasses import dataclass
+import importlib
+import logging
+import threading
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class TypeEntry:
+    """Where the dataclass of one metadata type lives"""
+
+    type_name: str
+    """Root tag of the documents, such as GenAiPromptTemplate"""
+
+    suffix: str
+    """File suffix, such as genAiPromptTemplate for *.genAiPromptTemplate-meta.xml"""
+
+    class_path: str
+    """"module:Class". Relative modules are resolved from this package."""
+
+
+class TypeRegistry:
+    """Maps metadata types to their dataclasses without importing them upfront.
+
+    Registering a type only records the module path. The module is imported the first time a
+    document of that type is parsed, so startup time does not grow with the number of types.
+    """
+
+    def __init__(self):
+        self._by_type: Dict[str, TypeEntry] = {}
+        self._by_suffix: Dict[str, TypeEntry] = {}
+        self._classes: Dict[str, type] = {}
+        self._lock = threading.Lock()
+
+
+    def register(self, type_name: str, suffix: str, class_path: str):
+        entry = TypeEntry(type_name, suffix, class_path)
+        with self._lock:
+            self._by_type[type_name] = entry
+            self._by_suffix[suffix] = entry
+            self._classes.pop(type_name, None)
+
+
+    def _load(self, entry: TypeEntry) -> type:
+        cls = self._classes.get(entry.type_name, None)
+        if cls is not None:
+            return cls
+
+        module_name, _, class_name = entry.class_path.partition(":")
+        with self._lock:
+            cls = self._classes.get(entry.type_name, None)
+            if cls is None:
+                logger.debug(f"Importing {entry.class_path} for {entry.type_name}")
+                module = importlib.import_module(module_name, package=__package__)
+                cls = getattr(module, class_name)
+                self._classes[entry.type_name] = cls
+        return cls
+
+
+    def resolve(self, type_name: str) -> Optional[type]:
+        """Returns the class registered for a root tag, or None"""
+        entry = self._by_type.get(type_name, None)
+        return self._load(entry) if entry else None
+
+
+    def resolve_suffix(self, suffix: str) -> Optional[type]:
+        """Returns the class registered for a file suffix, or None"""
+        entry = self._by_suffix.get(suffix, None)
+        return self._load(entry) if entry else None
+
+
+    def entries(self) -> List[TypeEntry]:
+        return sorted(self._by_type.values(), key=lambda entry: entry.type_name)
+
+
+    def loaded(self) -> List[str]:
+        """Type names whose module has been imported"""
+        return sorted(self._classes)
+
+
+default_registry = TypeRegistry()
+"""Registry used by XmlParser unless another one is given"""
+
+default_registry.register("GenAiPromptTemplate", "genAiPromptTemplate", ".genaiprompttemplate:GenAiPromptTemplate")
@@ -0,0 +1,150 @@
+# Standard Library imports
+from collections.abc import MutableSequence
+from dataclasses import dataclass, fields, is_dataclass
+from enum import Enum
+import functools
+import logging
+import typing
+from typing import Any, List, Optional
+
+# Project imports
+from .base import XmlNode, XmlRoot
+
+logger = logging.getLogger(__name__)
+
+boolean_values = ("true", "false")
+
+
+@dataclass(frozen=True)
+class FieldRule:
+    """Checks compiled for one field of a metadata dataclass"""
+
+    name: str
+    required: bool = False
+    """Declared with field(metadata={"required": True})"""
+    enum: Optional[type] = None
+    boolean: bool = False
+    is_list: bool = False
+    node_class: Optional[type] = None
+    references: Optional[str] = None
+    """"listField.keyField" the value must match, declared with field(metadata={"references": ...})"""
+
+
+@dataclass
+class Issue:
+    path: str
+    rule: str
+    message: str
+
+
+def _unwrap_optional(hint: Any) -> Any:
+    if typing.get_origin(hint) is typing.Union:
+        args = [ arg for arg in typing.get_args(hint) if arg is not type(None) ]
+        if len(args) == 1:
+            return args[0]
+    return hint
+
+
+@functools.lru_cache(maxsize=None)
+def compile_rules(cls: type) -> tuple:
+    """Builds the FieldRules of a metadata dataclass once, from its type hints and field metadata.
+
+    Fields declared with field(metadata={"required": True}) must be present, Enum fields must hold one of the enum values,
+    bool fields must be true or false and List[dataclass] items are validated recursively.
+    """
+    hints = typing.get_type_hints(cls)
+
+    rules = []
+    for class_field in fields(cls):
+        name = class_field.name
+        if name.startswith("_"):
+            continue
+
+        hint = _unwrap_optional(hints.get(name, Any))
+
+        rule = dict(
+            name=name,
+            required=class_field.metadata.get("required", False),
+            references=class_field.metadata.get("references", None),
+        )
+        if typing.get_origin(hint) in (list, List):
+            item_types = typing.get_args(hint)
+            item_type = item_types[0] if item_types else None
+            rule.update(is_list=True, node_class=item_type if is_dataclass(item_type) else None)
+        elif isinstance(hint, type) and issubclass(hint, Enum):
+            rule.update(enum=hint)
+        elif hint is bool:
+            rule.update(boolean=True)
+        elif hint is not str:
+            # Internal attributes, such as the sub_classes tables
+            continue
+
+        rules.append(FieldRule(**rule))
+
+    logger.debug(f"Compiled {len(rules)} rules for {cls.__name__}")
+    return tuple(rules)
+
+
+def _is_empty(value: Any) -> bool:
+    if value is None or value == []:
+        return True
+    if isinstance(value, str):
+        return not value.strip()
+    # Empty elements are parsed as a list with a single empty node
+    if isinstance(value, MutableSequence) and all(isinstance(item, XmlNode) and not _has_values(item) for item in value):
+        return True
+    return False
+
+
+def _has_values(node: XmlNode) -> bool:
+    return any(key[0] != "_" and not _is_empty(value) for key, value in node.__dict__.items())
+
+
+def _lookup(metadata: Any, reference: str) -> set:
+    list_field, _, key_field = reference.partition(".")
+    values = set()
+    for item in metadata.__dict__.get(list_field, None) or []:
+        value = getattr(item, "__dict__", {}).get(key_field, None)
+        if value is not None:
+            values.add(value)
+    return values
+
+
+def _validate_node(metadata: Any, cls: type, path: str, issues: List[Issue]):
+    values = metadata.__dict__
+
+    for rule in compile_rules(cls):
+        field_path = f"{path}.{rule.name}" if path else rule.name
+        value = values.get(rule.name, None)
+
+        if _is_empty(value):
+            if rule.required:
+                issues.append(Issue(field_path, "required", f"{rule.name} is required"))
+            continue
+
+        if rule.is_list:
+            if rule.node_class is not None:
+                for index, item in enumerate(value if isinstance(value, MutableSequence) else [ value ]):
+                    if isinstance(item, (XmlNode, XmlRoot)):
+                        _validate_node(item, rule.node_class, f"{field_path}[{index}]", issues)
+            continue
+
+        raw = value.value if isinstance(value, Enum) else value
+        if rule.enum is not None:
+            allowed = [ member.value for member in rule.enum ]
+            if raw not in allowed:
+                issues.append(Issue(field_path, "enum", f"{raw!r} is not one of: {', '.join(allowed)}"))
+        elif rule.boolean:
+            if str(raw).lower() not in boolean_values:
+                issues.append(Issue(field_path, "boolean", f"{raw!r} is not true or false"))
+
+        if rule.references is not None and raw not in _lookup(metadata, rule.references):
+            issues.append(Issue(field_path, "reference", f"{raw!r} does not match any {rule.references}"))
+
+
+def validate(metadata: Any, cls: type = None) -> List[Issue]:
+    """Validates a parsed document against the rules of cls, by default the class of the document"""
+    cls = cls or type(metadata)
+    issues = []
+    _validate_node(metadata, cls, "", issues)
+    return issues
@@ -0,0 +1,246 @@
+# Standard Library imports
+from abc import ABC, abstractmethod
+import functools
+import logging
+import threading
+from typing import Any, Iterator, Tuple
+import xml.dom.minidom
+import xml.etree.ElementTree as ET
+
+logger = logging.getLogger(__name__)
+
+
+def xml_declaration_line(xml_declaration: dict = None) -> str:
+    """The XML declaration written by minidom's toprettyxml for the given declaration options"""
+    xml_declaration = xml_declaration or {}
+    declarations = []
+    if xml_declaration.get("encoding", None):
+        declarations.append(f'encoding="{xml_declaration["encoding"]}"')
+    if xml_declaration.get("standalone", None) is not None:
+        declarations.append(f'standalone="{"yes" if xml_declaration["standalone"] else "no"}"')
+    return f'<?xml version="1.0" {" ".join(declarations)}?>'
+
+
+class XmlBackend(ABC):
+    """XML library used by XmlParser to read documents and to pretty-print the trees it builds.
+
+    Every backend must produce the same elements when parsing and the same bytes when writing,
+    so documents do not change when another backend is installed.
+    """
+
+    name = None
+
+    @staticmethod
+    def available() -> bool:
+        return True
+
+    @abstractmethod
+    def fromstring(self, xml_string: str) -> Any:
+        pass
+
+    @abstractmethod
+    def iterparse(self, source: str, events: Tuple[str, ...]) -> Iterator[Tuple[str, Any]]:
+        pass
+
+    @abstractmethod
+    def Element(self, tag: str, namespace: str = None) -> Any:
+        """Root element of a document to serialize, with namespace as its default namespace"""
+
+    @abstractmethod
+    def SubElement(self, parent: Any, tag: str) -> Any:
+        """Child element, in the namespace of its parent"""
+
+    @abstractmethod
+    def empty_copy(self, element: Any) -> Any:
+        """Element with the tag and attributes of a parsed element, without its children"""
+
+    @abstractmethod
+    def to_pretty_string(self, root: Any, xml_declaration: dict = None, indent: str = "    ") -> str:
+        pass
+
+
+class EtreeBackend(XmlBackend):
+    """Standard library: xml.etree.ElementTree, pretty-printed with xml.dom.minidom"""
+
+    name = "etree"
+
+    def fromstring(self, xml_string: str) -> ET.Element:
+        return ET.fromstring(xml_string)
+
+    def iterparse(self, source: str, events: Tuple[str, ...]) -> Iterator[Tuple[str, ET.Element]]:
+        return ET.iterparse(source, events=events)
+
+    def Element(self, tag: str, namespace: str = None) -> ET.Element:
+        root = ET.Element(tag)
+        if namespace:
+            root.set("xmlns", namespace)
+        return root
+
+    def SubElement(self, parent: ET.Element, tag: str) -> ET.Element:
+        return ET.SubElement(parent, tag)
+
+    def empty_copy(self, element: ET.Element) -> ET.Element:
+        return ET.Element(element.tag, element.attrib)
+
+    @staticmethod
+    def _encode_string(pretty_string: bytes, xml_declaration: dict = None):
+        logger.debug(f"Converting from Bytes to UTF-8 String")
+        if xml_declaration and xml_declaration.get("encoding", None):
+            return str(pretty_string, encoding=xml_declaration["encoding"])
+        return str(pretty_string, encoding="utf-8")
+
+    def to_pretty_string(self, root: ET.Element, xml_declaration: dict = None, indent: str = "    ") -> str:
+        logger.debug(f"root: {root.tag}")
+        xml_declaration = xml_declaration or {}
+
+        rough_string = ET.tostring(
+            element=root,
+            encoding="unicode",
+            method="xml",
+            xml_declaration=True,
+            # default_namespace=root.namespace,
+            short_empty_elements=True,
+            # pretty_print=True
+        )
+
+        # Pretty print the XML
+        logger.debug(f"begin: {rough_string[ : 200]}")
+        logger.debug(f"end: {rough_string[-200 : ]}")
+        reparsed = xml.dom.minidom.parseString(rough_string)
+
+        pretty_string = reparsed.toprettyxml(
+            indent=indent,
+            encoding=xml_declaration.get("encoding", None),
+            standalone=xml_declaration.get("standalone", None)
+        )
+
+        if isinstance(pretty_string, bytes):
+            pretty_string = EtreeBackend._encode_string(pretty_string, xml_declaration)
+
+        return pretty_string
+
+
+class LxmlBackend(XmlBackend):
+    """lxml: libxml2 parser and native indentation, without the minidom re-parse"""
+
+    name = "lxml"
+
+    def __init__(self, huge_tree: bool = False):
+        from lxml import etree
+        self.etree = etree
+
+        self.huge_tree = huge_tree
+        """Lifts the libxml2 limits on text size and tree depth. Only for trusted documents."""
+
+        # The standard library parser drops comments and processing instructions too. Entities are
+        # never resolved: lxml before 5.0 reads external entities by default.
+        self.parser_options = dict(
+            remove_comments=True, remove_pis=True, resolve_entities=False, no_network=True, huge_tree=huge_tree
+        )
+        """Options of the XMLParser and iterparse calls"""
+
+        # XMLParser instances must not be used by several threads at once, each thread builds its own
+        self._local = threading.local()
+
+    @property
+    def parser(self) -> Any:
+        parser = getattr(self._local, "parser", None)
+        if parser is None:
+            parser = self._local.parser = self.etree.XMLParser(**self.parser_options)
+        return parser
+
+    @staticmethod
+    def available() -> bool:
+        try:
+            import lxml.etree
+        except ImportError:
+            return False
+        return True
+
+    def fromstring(self, xml_string: str) -> Any:
+        # lxml rejects str documents that declare an encoding
+        if isinstance(xml_string, str):
+            xml_string = xml_string.encode("utf-8")
+        root = self.etree.fromstring(xml_string, self.parser)
+        self._reject_entities(root)
+        return root
+
+    def iterparse(self, source: str, events: Tuple[str, ...]) -> Iterator[Tuple[str, Any]]:
+        checked = False
+        for event, element in self.etree.iterparse(source, events=events, **self.parser_options):
+            if not checked:
+                self._reject_entities(element)
+                checked = True
+            yield event, element
+
+    @staticmethod
+    def _reject_entities(element: Any):
+        """Unresolved entities would be dropped from the text, documents that declare them are refused"""
+        dtd = element.getroottree().docinfo.internalDTD
+        if dtd is not None and any(True for _ in dtd.iterentities()):
+            raise ValueError("The document declares entities, which the lxml backend does not resolve")
+
+    def Element(self, tag: str, namespace: str = None) -> Any:
+        if namespace:
+            return self.etree.Element(f"{{{namespace}}}{tag}", nsmap={ None: namespace })
+        return self.etree.Element(tag)
+
+    def SubElement(self, parent: Any, tag: str) -> Any:
+        namespace = self.etree.QName(parent).namespace
+        return self.etree.SubElement(parent, f"{{{namespace}}}{tag}" if namespace else tag)
+
+    def empty_copy(self, element: Any) -> Any:
+        return self.etree.Element(element.tag, element.attrib, nsmap=element.nsmap)
+
+    def to_pretty_string(self, root: Any, xml_declaration: dict = None, indent: str = "    ") -> str:
+        logger.debug(f"root: {root.tag}")
+
+        # Match the minidom output: line endings normalized by its parser, empty text written as <tag/>
+        for element in root.iter():
+            if element.text is not None:
+                if not element.text:
+                    element.text = None
+                elif "\r" in element.text:
+                    element.text = element.text.replace("\r\n", "\n").replace("\r", "\n")
+
+        self.etree.indent(root, space=indent)
+        body = self.etree.tostring(root, encoding="unicode")
+
+        return f"{xml_declaration_line(xml_declaration)}\n{body}\n"
+
+
+backends = {
+    EtreeBackend.name: EtreeBackend,
+    LxmlBackend.name: LxmlBackend,
+}
+
+default_backend = "auto"
+"""Name of the backend used when none is given: auto picks lxml when installed, etree otherwise"""
+
+
+def get_backend(backend: Any = None) -> XmlBackend:
+    """Returns a backend instance from a name ("auto", "etree", "lxml") or an XmlBackend.
+    Named backends are created once.
+
+    Named backends keep the parser safety limits, pass LxmlBackend(huge_tree=True) to read larger trusted documents.
+    """
+    if isinstance(backend, XmlBackend):
+        return backend
+
+    name = backend or default_backend
+    if name == "auto":
+        name = LxmlBackend.name if LxmlBackend.available() else EtreeBackend.name
+        logger.debug(f"Using XML backend: {name}")
+
+    if name not in backends:
+        raise ValueError(f"Unknown XML backend: {name}. Valid values are: auto, {', '.join(backends)}")
+    if not backends[name].available():
+        raise ValueError(f"XML backend not installed: {name}")
+
+    return _named_backend(name)
+
+
+@functools.lru_cache(maxsize=None)
+def _named_backend(name: str) -> XmlBackend:
+    """One instance per backend name, shared by every parser. Backends are safe to use from several threads."""
+    return backends[name]()
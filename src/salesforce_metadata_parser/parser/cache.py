@@ -0,0 +1,147 @@
+# Standard Library imports
+from collections import OrderedDict
+from contextlib import contextmanager
+import logging
+import os
+import pickle
+import threading
+from typing import Callable, Iterator
+
+# Project imports
+from ..metadata.metadata import Metadata
+
+logger = logging.getLogger(__name__)
+
+default_max_entries = 64
+"""Number of documents kept by an enabled cache, unless given"""
+
+default_max_bytes = 64 * 1024 * 1024
+"""Size of the snapshots kept by an enabled cache, unless given"""
+
+
+class ParseCache:
+    """Bounded LRU cache of parsed documents.
+
+    Entries are keyed by resolved path and loader options, and validated against the file mtime and
+    size, so an edited file is parsed again. Documents are stored as pickled snapshots: every lookup returns a new,
+    independent tree, callers can modify it without corrupting the cache, and the snapshot size
+    is the exact memory an entry holds.
+
+    Pickling a document costs about as much as parsing it, so the cache only pays off when the
+    same files are loaded again, as in batch and watch. It keeps nothing until it is enabled.
+    """
+
+    def __init__(self, max_entries: int = 0, max_bytes: int = 0):
+        self.max_entries = max_entries
+        """Number of documents kept, 0 disables the cache"""
+
+        self.max_bytes = max_bytes
+        """Size of the snapshots kept, 0 disables the cache"""
+
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+
+    def configure(self, max_entries: int = None, max_bytes: int = None):
+        with self._lock:
+            if max_entries is not None:
+                self.max_entries = max_entries
+            if max_bytes is not None:
+                self.max_bytes = max_bytes
+            self._evict()
+
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.max_bytes > 0
+
+
+    @contextmanager
+    def enable(self, max_entries: int = None, max_bytes: int = None) -> Iterator["ParseCache"]:
+        """Keeps documents while the block runs, within the given or the default limits. The entries
+        are dropped and the previous limits restored at the end."""
+        previous = (self.max_entries, self.max_bytes)
+        self.configure(
+            default_max_entries if max_entries is None else max_entries,
+            default_max_bytes if max_bytes is None else max_bytes,
+        )
+        try:
+            yield self
+        finally:
+            self.configure(*previous)
+            self.clear()
+
+
+    def _evict(self):
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            (path, _), (_, snapshot) = self._entries.popitem(last=False)
+            self._bytes -= len(snapshot)
+            self.evictions += 1
+            logger.debug(f"Evicted from cache: {path}")
+
+
+    def load(self, file_path: str, loader: Callable[[str], Metadata], options: tuple = ()) -> Metadata:
+        """Returns a copy of the cached document, calling loader(file_path) on a miss.
+
+        options are the loader settings the document depends on, such as compact_history. Documents
+        of the same file loaded with other options are separate entries. A disabled cache only
+        calls the loader.
+        """
+        if not self.enabled:
+            return loader(file_path)
+
+        path = os.path.realpath(file_path)
+        key = (path, options)
+        stat = os.stat(path)
+        version = (stat.st_mtime_ns, stat.st_size)
+
+        with self._lock:
+            entry = self._entries.get(key, None)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                snapshot = entry[1]
+            else:
+                self.misses += 1
+                snapshot = None
+
+        if snapshot is not None:
+            logger.debug(f"Cache hit: {file_path}")
+            return pickle.loads(snapshot)
+
+        metadata = loader(file_path)
+        snapshot = pickle.dumps(metadata, protocol=pickle.HIGHEST_PROTOCOL)
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous[1])
+
+            if len(snapshot) <= self.max_bytes:
+                self._entries[key] = (version, snapshot)
+                self._bytes += len(snapshot)
+                self._evict()
+
+        return metadata
+
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+    def report(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,175 @@
+# Standard Library imports
+from collections.abc import MutableSequence
+from dataclasses import dataclass
+from enum import Enum
+import logging
+from typing import Any, List
+
+# Project imports
+from ..metadata.base import XmlNode, XmlRoot, fingerprint
+from ..metadata.lazy import LazyText
+
+logger = logging.getLogger(__name__)
+
+# Fields that identify an item inside a list, tried in this order
+identity_fields = (
+    "versionIdentifier",
+    "apiName",
+    "referenceName",
+    "parameterName",
+    "generationConfigDeveloperName",
+)
+
+
+@dataclass
+class Change:
+    """A field level difference between two metadata trees"""
+
+    path: str
+    """Dotted path to the field, list items are addressed by index: templateVersions[2].content"""
+
+    kind: str
+    """One of: added, removed, changed"""
+
+    old: Any = None
+    new: Any = None
+
+
+def _is_node(value: Any) -> bool:
+    return isinstance(value, (XmlNode, XmlRoot))
+
+
+def _scalar(value: Any) -> Any:
+    if isinstance(value, Enum):
+        return value.value
+    return value
+
+
+def _visible_items(metadata: Any) -> dict:
+    return {
+        key: str(value) if isinstance(value, LazyText) else value
+        for key, value in metadata.__dict__.items() if key[0] != "_" and value is not None
+    }
+
+
+def _reported(value: Any) -> Any:
+    """Value of an added or removed field, sequences that store their items in another form as a list"""
+    if isinstance(value, MutableSequence) and not isinstance(value, list):
+        return list(value)
+    return value
+
+
+def _fingerprints(items: Any) -> list:
+    """Fingerprint of every node item, None for other values. A VersionHistory knows the
+    fingerprints of its versions without rebuilding them."""
+    fingerprints = getattr(items, "fingerprints", None)
+    if fingerprints is not None:
+        return fingerprints()
+    return [ fingerprint(item) if _is_node(item) else None for item in items ]
+
+
+def _items(items: Any, indices: List[int]) -> dict:
+    """Items at the given indices. Read from the last one, a VersionHistory rebuilds each from the one after it."""
+    return { index: items[index] for index in sorted(indices, reverse=True) }
+
+
+def _identity(item: Any) -> Any:
+    if not _is_node(item):
+        return None
+    for name in identity_fields:
+        value = item.__dict__.get(name, None)
+        if value is not None:
+            return (name, _scalar(value))
+    return None
+
+
+def _join(path: str, key: str) -> str:
+    return f"{path}.{key}" if path else key
+
+
+def _diff_lists(path: str, old: Any, new: Any, changes: List[Change]):
+    # Identical items are paired first, wherever they moved to, and never read again
+    new_by_fingerprint = {}
+    for index, digest in enumerate(_fingerprints(new)):
+        if digest is not None:
+            new_by_fingerprint.setdefault(digest, []).append(index)
+
+    old_left = []
+    new_matched = set()
+    for old_index, digest in enumerate(_fingerprints(old)):
+        candidates = new_by_fingerprint.get(digest, []) if digest is not None else []
+        if candidates:
+            new_matched.add(candidates.pop(0))
+        else:
+            old_left.append(old_index)
+    new_left = [ index for index in range(len(new)) if index not in new_matched ]
+    old_items = _items(old, old_left)
+    new_items = _items(new, new_left)
+
+    # The remaining items are paired by identity field when they have one, otherwise by position
+    new_by_identity = {}
+    for index in new_left:
+        identity = _identity(new_items[index])
+        if identity is not None:
+            new_by_identity.setdefault(identity, index)
+
+    pairs = []
+    unpaired_old = []
+    for old_index in old_left:
+        identity = _identity(old_items[old_index])
+        new_index = new_by_identity.pop(identity, None) if identity is not None else None
+        if new_index is None:
+            unpaired_old.append(old_index)
+        else:
+            pairs.append((old_index, new_index))
+
+    paired_new = { new_index for _, new_index in pairs }
+    unpaired_new = [ index for index in new_left if index not in paired_new ]
+    pairs.extend(zip(unpaired_old, unpaired_new))
+
+    for old_index, new_index in sorted(pairs, key=lambda pair: pair[1]):
+        _diff_values(f"{path}[{new_index}]", old_items[old_index], new_items[new_index], changes)
+
+    for old_index in unpaired_old[len(unpaired_new):]:
+        changes.append(Change(f"{path}[{old_index}]", "removed", old=old_items[old_index]))
+
+    for new_index in unpaired_new[len(unpaired_old):]:
+        changes.append(Change(f"{path}[{new_index}]", "added", new=new_items[new_index]))
+
+
+def _diff_values(path: str, old: Any, new: Any, changes: List[Change]):
+    if _is_node(old) and _is_node(new):
+        if fingerprint(old) == fingerprint(new):
+            return
+        _diff_nodes(path, old, new, changes)
+    elif isinstance(old, MutableSequence) and isinstance(new, MutableSequence):
+        _diff_lists(path, old, new, changes)
+    elif _scalar(old) != _scalar(new):
+        changes.append(Change(path, "changed", old=old, new=new))
+
+
+def _diff_nodes(path: str, old: Any, new: Any, changes: List[Change]):
+    old_items = _visible_items(old)
+    new_items = _visible_items(new)
+
+    for key, old_value in old_items.items():
+        if key in new_items:
+            _diff_values(_join(path, key), old_value, new_items[key], changes)
+        elif old_value != []:
+            changes.append(Change(_join(path, key), "removed", old=_reported(old_value)))
+
+    for key, new_value in new_items.items():
+        if key not in old_items and new_value != []:
+            changes.append(Change(_join(path, key), "added", new=_reported(new_value)))
+
+
+def diff(old: Any, new: Any) -> List[Change]:
+    """Lists the field level changes needed to turn one metadata tree into another.
+
+    Subtrees with the same fingerprint are skipped, so the work done depends on the size of
+    the changes rather than on the size of the documents.
+    """
+    changes = []
+    _diff_values("", old, new, changes)
+    logger.debug(f"Found {len(changes)} changes")
+    return changes
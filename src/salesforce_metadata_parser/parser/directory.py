@@ -0,0 +1,158 @@
+# Standard Library imports
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import os
+import time
+from typing import Any, Callable, List, Set
+
+# Project imports
+from .manifest import Manifest, file_digest, relative_path
+
+logger = logging.getLogger(__name__)
+
+default_source_dir = "force-app/main/default"
+
+
+def find_metadata_files(source_dir: str, suffix: str = None) -> List[str]:
+    """Lists the *-meta.xml files below source_dir, sorted so every run sees the same order"""
+    file_ending = f".{suffix}-meta.xml" if suffix else "-meta.xml"
+
+    file_paths = []
+    for dir_path, dir_names, file_names in os.walk(source_dir):
+        dir_names.sort()
+        for file_name in sorted(file_names):
+            if file_name.endswith(file_ending):
+                file_paths.append(os.path.join(dir_path, file_name))
+
+    logger.debug(f"Found {len(file_paths)} files ending with {file_ending} in {source_dir}")
+    return file_paths
+
+
+def process_files(
+    file_paths: List[str],
+    task: Callable[[str], Any],
+    max_workers: int = None,
+    manifest: Manifest = None,
+    changed_files: Set[str] = None,
+) -> dict:
+    """Runs task(file_path) on a thread pool and collects its JSON serializable results.
+
+    With changed_files (see manifest.git_changed_files) only those files are processed; the
+    others reuse their manifest result when there is one, and are listed in skipped otherwise.
+    With a manifest, files whose content digest did not change reuse the previous result.
+    A file whose task raises gets a None result and an entry in errors; the other files are
+    still processed and recorded, and the failed one is processed again on the next run.
+    Returns a results document: { "results": { path: result }, "errors": { path: message }, "skipped": [ path ], "metrics": { ... } }
+    """
+    start = time.perf_counter()
+
+    results = {}
+    pending = []
+    skipped = []
+    for file_path in file_paths:
+        path = relative_path(file_path)
+
+        if changed_files is not None and path not in changed_files:
+            entry = manifest.get(path) if manifest else None
+            if entry is not None:
+                results[path] = entry["result"]
+            else:
+                skipped.append(path)
+            continue
+
+        digest = file_digest(file_path) if manifest else None
+        entry = manifest.get(path, digest) if manifest else None
+        if entry is not None:
+            results[path] = entry["result"]
+        else:
+            results[path] = None
+            pending.append((path, file_path, digest))
+
+    logger.info(f"Processing {len(pending)} of {len(file_paths)} files, {len(results) - len(pending)} reused")
+
+    def run(item):
+        path, file_path, digest = item
+        task_start = time.perf_counter()
+        try:
+            result, error = task(file_path), None
+        except Exception as e:
+            logger.debug(f"Task failed on {path}", exc_info=True)
+            result, error = None, f"{type(e).__name__}: {e}"
+        return path, digest, result, error, time.perf_counter() - task_start
+
+    timings = {}
+    errors = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for path, digest, result, error, elapsed in executor.map(run, pending):
+            results[path] = result
+            timings[path] = elapsed
+            if error is not None:
+                errors[path] = error
+            elif manifest is not None:
+                manifest.put(path, digest, result, elapsed)
+
+    if manifest is not None and manifest.file_path:
+        manifest.save()
+
+    return {
+        "results": results,
+        "errors": errors,
+        "skipped": skipped,
+        "metrics": {
+            "files": len(results),
+            "processed": len(pending),
+            "reused": len(results) - len(pending),
+            "failed": len(errors),
+            "elapsed": time.perf_counter() - start,
+            "timings": timings,
+        },
+    }
+
+
+def merge_results(documents: List[dict]) -> dict:
+    """Combines the results documents of several shards into the document of a single run.
+
+    Metrics are added up, except elapsed which is the longest shard: the wall time when the
+    shards run in parallel. Files found in several documents keep the result of the last one.
+    """
+    results = {}
+    errors = {}
+    skipped = set()
+    timings = {}
+    metrics = { "processed": 0, "reused": 0, "failed": 0, "elapsed": 0.0 }
+    shards = set()
+    counts = set()
+
+    for document in documents:
+        overlap = results.keys() & document["results"].keys()
+        if overlap:
+            logger.warning(f"{len(overlap)} files are in several documents, such as {min(overlap)}")
+        results.update(document["results"])
+        errors.update(document.get("errors", {}))
+        skipped.update(document.get("skipped", []))
+
+        document_metrics = document["metrics"]
+        timings.update(document_metrics.get("timings", {}))
+        for key in ("processed", "reused", "failed"):
+            metrics[key] += document_metrics.get(key, 0)
+        metrics["elapsed"] = max(metrics["elapsed"], document_metrics.get("elapsed", 0.0))
+
+        shard = document_metrics.get("shard", None)
+        if shard is not None:
+            index, _, count = shard.partition("/")
+            shards.add(int(index))
+            counts.add(int(count))
+
+    if len(counts) > 1:
+        logger.warning(f"Documents come from different shard counts: {sorted(counts)}")
+    elif counts:
+        missing = set(range(1, max(counts) + 1)) - shards
+        if missing:
+            logger.warning(f"Missing shards: {', '.join(str(index) for index in sorted(missing))}")
+
+    return {
+        "results": dict(sorted(results.items())),
+        "errors": dict(sorted(errors.items())),
+        "skipped": sorted(skipped - results.keys()),
+        "metrics": { "files": len(results), **metrics, "shards": len(documents), "timings": timings },
+    }
@@ -0,0 +1,222 @@
+# Standard Library imports
+import csv
+from enum import Enum
+import json
+import logging
+import os
+import re
+import threading
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, Iterator, Set, Tuple
+
+# Project imports
+from ..metadata.base import XmlNode
+from ..metadata.lazy import LazyText
+from ..metadata.metadata import Metadata
+
+logger = logging.getLogger(__name__)
+
+formats = ("jsonl", "csv")
+
+# Columns of every exported table. Each row starts with the file it comes from,
+# which is how an incremental export finds the rows of the unchanged files.
+prompt_template_tables = MappingProxyType({
+    "templates": (
+        "file", "developerName", "masterLabel", "type", "visibility", "relatedEntity", "relatedField",
+        "activeVersionIdentifier", "versionCount",
+    ),
+    "versions": (
+        "file", "developerName", "versionIdentifier", "versionNumber", "status", "primaryModel", "active",
+        "contentLength", "inputCount", "providerCount",
+    ),
+    "inputs": (
+        "file", "developerName", "versionIdentifier", "apiName", "referenceName", "definition", "required",
+    ),
+    "providers": (
+        "file", "developerName", "versionIdentifier", "referenceName", "definition", "parameterCount",
+    ),
+})
+
+versionNumberPattern = re.compile(r".*=_(?P<versionNumber>\d+)$")
+
+
+def _value(node: Any, key: str) -> Any:
+    value = node.__dict__.get(key, None)
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, str):
+        return value
+    if isinstance(value, LazyText):
+        return str(value)
+    return None
+
+
+def _nodes(node: Any, key: str) -> list:
+    return [ item for item in node.__dict__.get(key, None) or [] if isinstance(item, XmlNode) ]
+
+
+def prompt_template_rows(metadata: Metadata, path: str) -> Iterator[Tuple[str, dict]]:
+    """Flattens a GenAiPromptTemplate into (table, row) pairs, see prompt_template_tables"""
+    developer_name = _value(metadata, "developerName")
+    active_version = _value(metadata, "activeVersionIdentifier")
+    versions = _nodes(metadata, "templateVersions")
+
+    yield "templates", {
+        "file": path,
+        "developerName": developer_name,
+        "masterLabel": _value(metadata, "masterLabel"),
+        "type": _value(metadata, "type"),
+        "visibility": _value(metadata, "visibility"),
+        "relatedEntity": _value(metadata, "relatedEntity"),
+        "relatedField": _value(metadata, "relatedField"),
+        "activeVersionIdentifier": active_version,
+        "versionCount": len(versions),
+    }
+
+    for version in versions:
+        version_id = _value(version, "versionIdentifier")
+        m = versionNumberPattern.match(version_id or "")
+        inputs = _nodes(version, "inputs")
+        providers = _nodes(version, "templateDataProviders")
+
+        yield "versions", {
+            "file": path,
+            "developerName": developer_name,
+            "versionIdentifier": version_id,
+            "versionNumber": int(m.group("versionNumber")) if m else None,
+            "status": _value(version, "status"),
+            "primaryModel": _value(version, "primaryModel"),
+            "active": version_id is not None and version_id == active_version,
+            "contentLength": len(_value(version, "content") or ""),
+            "inputCount": len(inputs),
+            "providerCount": len(providers),
+        }
+
+        for input in inputs:
+            yield "inputs", {
+                "file": path,
+                "developerName": developer_name,
+                "versionIdentifier": version_id,
+                "apiName": _value(input, "apiName"),
+                "referenceName": _value(input, "referenceName"),
+                "definition": _value(input, "definition"),
+                "required": _value(input, "required"),
+            }
+
+        for provider in providers:
+            yield "providers", {
+                "file": path,
+                "developerName": developer_name,
+                "versionIdentifier": version_id,
+                "referenceName": _value(provider, "referenceName"),
+                "definition": _value(provider, "definition"),
+                "parameterCount": len(_nodes(provider, "parameters")),
+            }
+
+
+class TableWriter:
+    """Streams rows to one JSON Lines or CSV file per table.
+
+    Rows are written as they are produced, through the buffered file objects, so memory does not
+    grow with the number of rows. The files are written next to the target files and only replace
+    them on close, which lets copy_previous read the previous export while the new one is written.
+    Writes are serialized, rows given to one write_rows call stay together.
+    """
+
+    def __init__(self, target_dir: str, tables: Dict[str, tuple] = prompt_template_tables, format: str = "jsonl"):
+        assert format in formats, f"Unsupported format: {format}"
+
+        self.target_dir = target_dir
+        self.tables = tables
+        self.format = format
+        self.rows = { table: 0 for table in tables }
+
+        self._files = {}
+        self._writers = {}
+        self._lock = threading.Lock()
+
+
+    def table_path(self, table: str) -> str:
+        return os.path.join(self.target_dir, f"{table}.{self.format}")
+
+
+    def has_previous(self) -> bool:
+        """Tells whether every table of a previous export exists"""
+        return all(os.path.isfile(self.table_path(table)) for table in self.tables)
+
+
+    def open(self) -> "TableWriter":
+        os.makedirs(self.target_dir, exist_ok=True)
+        for table, columns in self.tables.items():
+            table_file = open(f"{self.table_path(table)}.tmp", "w", encoding="utf-8", newline="")
+            self._files[table] = table_file
+            if self.format == "csv":
+                writer = csv.DictWriter(table_file, fieldnames=columns, extrasaction="ignore")
+                writer.writeheader()
+                self._writers[table] = writer
+        return self
+
+
+    def _write(self, table: str, row: dict):
+        if self.format == "csv":
+            self._writers[table].writerow(row)
+        else:
+            self._files[table].write(json.dumps(row, ensure_ascii=False))
+            self._files[table].write("\n")
+        self.rows[table] += 1
+
+
+    def write_rows(self, rows: Iterable[Tuple[str, dict]]) -> dict:
+        """Writes (table, row) pairs, returns the number of rows written per table"""
+        counts = { table: 0 for table in self.tables }
+        with self._lock:
+            for table, row in rows:
+                self._write(table, row)
+                counts[table] += 1
+        return counts
+
+
+    def _read_previous(self, table: str) -> Iterator[dict]:
+        with open(self.table_path(table), "r", encoding="utf-8", newline="") as table_file:
+            if self.format == "csv":
+                yield from csv.DictReader(table_file)
+            else:
+                for line in table_file:
+                    if line.strip():
+                        yield json.loads(line)
+
+
+    def copy_previous(self, paths: Set[str]) -> int:
+        """Copies the rows of the given files from the previous export, one row at a time"""
+        if not paths:
+            return 0
+
+        copied = 0
+        with self._lock:
+            for table in self.tables:
+                for row in self._read_previous(table):
+                    if row.get("file") in paths:
+                        self._write(table, row)
+                        copied += 1
+
+        logger.info(f"Copied {copied} rows of {len(paths)} unchanged files from the previous export")
+        return copied
+
+
+    def close(self):
+        """Replaces the previous export with the new files"""
+        for table, table_file in self._files.items():
+            table_file.close()
+            os.replace(f"{self.table_path(table)}.tmp", self.table_path(table))
+            logger.info(f"Writing {self.rows[table]} rows to: {self.table_path(table)}")
+        self._files.clear()
+        self._writers.clear()
+
+
+    def abort(self):
+        """Discards the new files and keeps the previous export"""
+        for table, table_file in self._files.items():
+            table_file.close()
+            os.remove(f"{self.table_path(table)}.tmp")
+        self._files.clear()
+        self._writers.clear()
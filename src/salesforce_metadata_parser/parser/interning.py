@@ -0,0 +1,84 @@
+# Standard Library imports
+import logging
+import sys
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class StringPool:
+    """Deduplicates the strings of parsed documents.
+
+    Short values (tag names, definitions, statuses, labels...) go through ``sys.intern``.
+    Longer values, such as prompt ``content`` blocks, are kept in a content-addressed store,
+    so every identical block parsed with the pool shares a single ``str`` instance.
+    Pools are thread-safe. The store holds its values for as long as the pool lives, so a pool
+    is meant for one run, such as the files of a parse-dir, and the store is bounded in size.
+    """
+
+    def __init__(self, intern_max_length: int = 64, max_held_bytes: int = 64 * 1024 * 1024):
+        self.intern_max_length = intern_max_length
+        """Values up to this length are interned, longer values go to the content store"""
+
+        self.max_held_bytes = max_held_bytes
+        """Size of the values the store holds at most. Once full, new values are returned as they are."""
+
+        self._store = {}
+        self._held_bytes = 0
+        self._lock = threading.Lock()
+
+        self.lookups = 0
+        """Number of values seen by the pool"""
+
+        self.duplicates = 0
+        """Number of values replaced by an instance already held by the pool"""
+
+        self.bytes_saved = 0
+        """Memory released by replacing duplicates with the pooled instance"""
+
+
+    def intern(self, value: str) -> str:
+        if len(value) <= self.intern_max_length:
+            pooled = sys.intern(value)
+            with self._lock:
+                self._count(value, pooled)
+            return pooled
+
+        # The dict is keyed by the content itself, identical blocks resolve to the same entry
+        with self._lock:
+            pooled = self._store.get(value, None)
+            if pooled is None:
+                pooled = value
+                size = sys.getsizeof(value)
+                if self._held_bytes + size <= self.max_held_bytes:
+                    self._store[value] = value
+                    self._held_bytes += size
+            self._count(value, pooled)
+        return pooled
+
+
+    def _count(self, value: str, pooled: str):
+        self.lookups += 1
+        if pooled is not value:
+            self.duplicates += 1
+            self.bytes_saved += sys.getsizeof(value)
+
+
+    def clear(self):
+        with self._lock:
+            self._store.clear()
+            self._held_bytes = 0
+            self.lookups = 0
+            self.duplicates = 0
+            self.bytes_saved = 0
+
+
+    def report(self) -> dict:
+        with self._lock:
+            return {
+                "lookups": self.lookups,
+                "duplicates": self.duplicates,
+                "bytes_saved": self.bytes_saved,
+                "held_values": len(self._store),
+                "held_bytes": self._held_bytes,
+            }
@@ -0,0 +1,88 @@
+# Standard Library imports
+import functools
+import logging
+import mmap
+import re
+import sys
+from typing import Any, FrozenSet, List, Tuple
+
+# Project imports
+from ..metadata.lazy import LazyText
+
+logger = logging.getLogger(__name__)
+
+lazy_marker = "\uf8ff"
+"""Private use character that starts the placeholder text of a lazy value, followed by its index"""
+
+markerPattern = re.compile(rb"\xef\xa3\xbf|&#(?:x0*[fF]8[fF][fF]|0*63743);")
+
+encodingPattern = re.compile(rb"<\?xml[^>]*encoding=[\"'](?P<encoding>[A-Za-z0-9._-]+)[\"']")
+
+# First byte of a text value that is not ASCII whitespace
+valuePattern = re.compile(rb"[^\t\n\r \x0b\x0c]")
+
+# Mappings otherwise keep a duplicate of the file descriptor open until they are closed
+mmap_options = { "trackfd": False } if sys.version_info >= (3, 13) else {}
+
+
+@functools.lru_cache(maxsize=64)
+def _value_pattern(tags: FrozenSet[str]) -> re.Pattern:
+    # Markup is matched too, so that tags inside CDATA sections, comments and processing instructions are skipped
+    names = b"|".join(re.escape(tag.encode("ascii")) for tag in sorted(tags))
+    return re.compile(
+        rb"<!\[CDATA\[.*?\]\]>|<!--.*?-->|<\?.*?\?>|<(?P<tag>" + names + rb")>(?P<text>[^<]*)</(?P=tag)>",
+        re.DOTALL,
+    )
+
+
+def cut_lazy_values(buffer: Any, tags: FrozenSet[str], min_size: int = 256) -> Tuple[bytes, List[LazyText]]:
+    """Replaces the large text values of the given tags by short placeholders.
+
+    Returns the document to parse, or None when it cannot be processed this way (other encodings,
+    document type declarations), and the values left in the buffer. The placeholder of a value is
+    lazy_marker followed by its index in the list. Only values without markup and with some text
+    other than whitespace are cut, so the parsed tree keeps the same shape.
+    """
+    head = buffer[ : 256]
+    if head.startswith((b"\xff\xfe", b"\xfe\xff")):
+        return None, []
+    m = encodingPattern.match(head.lstrip(b"\xef\xbb\xbf"))
+    if m and m.group("encoding").lower() not in (b"utf-8", b"utf8"):
+        return None, []
+    if buffer.find(b"<!DOCTYPE") != -1 or markerPattern.search(buffer):
+        return None, []
+
+    pieces = []
+    values = []
+    position = 0
+    for m in _value_pattern(tags).finditer(buffer):
+        if m.group("tag") is None:
+            continue
+        start, end = m.span("text")
+        if end - start < min_size:
+            continue
+        first = valuePattern.search(buffer, start, end)
+        if first is None or first.group()[0] >= 0x80 or first.group() == b"&":
+            # May be only whitespace once decoded
+            continue
+
+        pieces.append(buffer[position : start])
+        pieces.append(f"{lazy_marker}{len(values)}".encode("utf-8"))
+        values.append(LazyText(buffer, start, end))
+        position = end
+
+    pieces.append(buffer[position : ])
+    logger.debug(f"{len(values)} lazy text values")
+    return b"".join(pieces), values
+
+
+def read_buffer(xml_file_path: str, mode: str) -> Any:
+    """The contents of a file as bytes ("memory") or as a read-only mapping ("mmap")"""
+    with open(xml_file_path, "rb") as xml_file:
+        if mode == "mmap":
+            try:
+                return mmap.mmap(xml_file.fileno(), 0, access=mmap.ACCESS_READ, **mmap_options)
+            except ValueError:
+                # Empty files cannot be mapped
+                return b""
+        return xml_file.read()
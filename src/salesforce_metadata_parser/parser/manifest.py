@@ -0,0 +1,117 @@
+# Standard Library imports
+import hashlib
+import json
+import logging
+import os
+import subprocess
+from typing import Any, Set
+
+logger = logging.getLogger(__name__)
+
+
+def relative_path(file_path: str) -> str:
+    """Normalizes a path into the form used as key in manifests and results"""
+    return os.path.relpath(file_path).replace(os.sep, "/")
+
+
+def file_digest(file_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def git_changed_files(ref: str, source_dir: str) -> Set[str]:
+    """Lists the files of source_dir that differ from ref in the working tree, including untracked files"""
+    commands = [
+        [ "git", "diff", "--name-only", "--relative", ref, "--", source_dir ],
+        [ "git", "ls-files", "--others", "--exclude-standard", "--", source_dir ],
+    ]
+
+    changed_files = set()
+    for command in commands:
+        logger.debug(f"Running: {' '.join(command)}")
+        completed = subprocess.run(command, capture_output=True, text=True)
+        if completed.returncode != 0:
+            raise RuntimeError(f"{' '.join(command)} failed: {completed.stderr.strip()}")
+
+        for line in completed.stdout.splitlines():
+            if line and os.path.isfile(line):
+                changed_files.add(relative_path(line))
+
+    logger.info(f"{len(changed_files)} files changed since {ref}")
+    return changed_files
+
+
+def task_key(name: str, **options: Any) -> str:
+    """Identifies a command and the options its results depend on, such as prompt-template.split-dir(target_dir=out)"""
+    if not options:
+        return name
+    return f"{name}({', '.join(f'{key}={value}' for key, value in sorted(options.items()))})"
+
+
+class Manifest:
+    """Remembers the content digest, result and processing time of every file a command processed.
+
+    Entries are stored as JSON, grouped by task (see task_key) and keyed by relative path, so
+    the manifest of the previous run (for instance a CI cache) lets the next run skip the files
+    whose content did not change. Commands only read and write the entries of their own task,
+    several commands can share one manifest file.
+    """
+
+    version = 2
+
+    def __init__(self, file_path: str = None, task: str = None, tasks: dict = None):
+        self.file_path = file_path
+        self.task = task
+        self.tasks = tasks if tasks is not None else {}
+        """Entries of every task found in the file, kept when saving"""
+
+        self.entries = self.tasks.setdefault(task, {})
+        """Entries of this task"""
+
+
+    @staticmethod
+    def load(file_path: str, task: str = None) -> "Manifest":
+        if not os.path.isfile(file_path):
+            logger.info(f"Manifest not found, starting a new one: {file_path}")
+            return Manifest(file_path, task)
+
+        with open(file_path, "r", encoding="utf-8") as manifest_file:
+            content = json.load(manifest_file)
+
+        if content.get("version") != Manifest.version:
+            logger.warning(f"Ignoring manifest with unsupported version: {file_path}")
+            return Manifest(file_path, task)
+
+        tasks = content.get("tasks", {})
+        if task not in tasks:
+            logger.info(f"No entries for {task} in manifest {file_path}, tasks found: {', '.join(sorted(tasks)) or 'none'}")
+        return Manifest(file_path, task, tasks)
+
+
+    def save(self, file_path: str = None):
+        file_path = file_path or self.file_path
+        assert file_path is not None, "Manifest file not provided"
+
+        with open(file_path, "w", encoding="utf-8") as manifest_file:
+            logger.info(f"Writing Manifest to: {file_path}")
+            json.dump({ "version": Manifest.version, "tasks": self.tasks }, manifest_file, indent=2, sort_keys=True)
+
+
+    def clear(self):
+        """Forgets the entries of this task, so every file is processed again"""
+        self.entries.clear()
+
+
+    def get(self, path: str, digest: str = None) -> dict:
+        """Returns the entry of a file, or None if missing or recorded for different content"""
+        entry = self.entries.get(path, None)
+        if entry is None or (digest is not None and entry.get("digest") != digest):
+            return None
+        return entry
+
+
+    def put(self, path: str, digest: str, result: Any, elapsed: float):
+        self.entries[path] = { "digest": digest, "result": result, "elapsed": elapsed }
@@ -0,0 +1,217 @@
+# Standard Library imports
+import _thread
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+import gc
+import logging
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+# Project imports
+from ..metadata.base import XmlNode, XmlRoot
+from ..metadata.history import VersionHistory
+from ..metadata.lazy import LazyText
+
+logger = logging.getLogger(__name__)
+
+sizePattern = re.compile(r"^\s*(?P<value>\d+(\.\d+)?)\s*(?P<unit>[kmgt]?)i?b?\s*$", re.IGNORECASE)
+size_units = { "": 1, "k": 1024, "m": 1024 ** 2, "g": 1024 ** 3, "t": 1024 ** 4 }
+
+
+def parse_size(size: str) -> int:
+    """Converts sizes such as 512M, 1.5G or 1048576 into bytes"""
+    m = sizePattern.match(size)
+    if not m:
+        raise ValueError(f"Invalid size: {size}")
+    return int(float(m.group("value")) * size_units[m.group("unit").lower()])
+
+
+def tree_stats(metadata: Any) -> dict:
+    """Counts the nodes of a tree and the bytes held by its nodes, lists and strings"""
+    nodes = 0
+    size = 0
+    stack = [ metadata ]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, (XmlNode, XmlRoot)):
+            nodes += 1
+            size += sys.getsizeof(value) + sys.getsizeof(value.__dict__)
+            stack.extend(item for key, item in value.__dict__.items() if key[0] != "_")
+        elif isinstance(value, VersionHistory):
+            # What it stores, not the versions it can rebuild
+            size += sys.getsizeof(value)
+            stack.extend(value.stored_values())
+        elif isinstance(value, list):
+            size += sys.getsizeof(value)
+            stack.extend(value)
+        elif isinstance(value, (str, LazyText)):
+            # Lazy text only holds offsets, its buffer belongs to the file
+            size += sys.getsizeof(value)
+
+    return { "nodes": nodes, "bytes": size }
+
+
+def _object_counts() -> Counter:
+    return Counter(type(obj).__name__ for obj in gc.get_objects())
+
+
+@dataclass
+class MemoryRecord:
+    """Memory used by one measured section, such as a chained command"""
+
+    label: str
+    elapsed: float = 0.0
+    start_bytes: int = 0
+    end_bytes: int = 0
+    peak_bytes: int = 0
+    objects: Dict[str, int] = field(default_factory=dict)
+    """Change in the number of live objects by type name, largest first"""
+
+    trees: List[dict] = field(default_factory=list)
+    """Largest trees reachable from the section's roots: name, nodes and bytes, see tree_stats"""
+
+
+class MemoryLimitExceeded(Exception):
+    pass
+
+
+class MemoryTracker:
+    """Accounts the Python memory used by measured sections with tracemalloc.
+
+    tracemalloc is started by the first measure call and slows allocations down, so the tracker
+    is only meant to be used on demand. With max_memory, a watchdog thread interrupts the main
+    thread as soon as the traced memory exceeds the limit; measure turns the interruption into
+    MemoryLimitExceeded, with the allocation sites that hold the most memory.
+    """
+
+    def __init__(self, max_memory: int = None, top: int = 10, interval: float = 0.05):
+        self.max_memory = max_memory
+        self.top = top
+        self.interval = interval
+        self.records: List[MemoryRecord] = []
+
+        self.exceeded: Optional[str] = None
+        """Diagnostic of the watchdog, once the limit was exceeded"""
+
+        self._stack: List[MemoryRecord] = []
+        self._lock = threading.Lock()
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+
+    def configure(self, max_memory: int = None, top: int = None):
+        if max_memory is not None:
+            self.max_memory = max_memory
+        if top is not None:
+            self.top = top
+
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+        if self.max_memory and self._watchdog is None:
+            if threading.current_thread() is not threading.main_thread():
+                logger.warning("The memory limit is only enforced for commands running on the main thread")
+                return
+            self._stopped.clear()
+            self._watchdog = threading.Thread(target=self._watch, name="memory-watchdog", daemon=True)
+            self._watchdog.start()
+
+
+    def stop(self):
+        if self._watchdog is not None:
+            self._stopped.set()
+            self._watchdog.join()
+            self._watchdog = None
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+
+    def _watch(self):
+        while not self._stopped.wait(self.interval):
+            current, _ = tracemalloc.get_traced_memory()
+            if current <= self.max_memory:
+                continue
+
+            label = self._stack[-1].label if self._stack else "?"
+            self.exceeded = (
+                f"{label}: {current / 1024 ** 2:.1f} MiB traced, "
+                f"limit {self.max_memory / 1024 ** 2:.1f} MiB. Largest allocations:\n{self.top_allocations()}"
+            )
+            logger.error(f"Memory limit exceeded by {label}")
+            _thread.interrupt_main()
+            return
+
+
+    def top_allocations(self, limit: int = None) -> str:
+        if not tracemalloc.is_tracing():
+            return ""
+        statistics = tracemalloc.take_snapshot().statistics("lineno")[ : limit or self.top]
+        return "\n".join(f"  {statistic}" for statistic in statistics)
+
+
+    @contextmanager
+    def measure(self, label: str, roots: Callable[[], Iterable[Tuple[str, Any]]] = None):
+        """Records the peak memory, object counts and largest trees of the enclosed block.
+
+        roots returns the (name, tree) pairs to measure once the block completed.
+        """
+        self.start()
+
+        record = MemoryRecord(label)
+        counts = _object_counts()
+        start = time.perf_counter()
+
+        # tracemalloc has a single peak, parent sections keep the peak reached before this one
+        with self._lock:
+            _, peak = tracemalloc.get_traced_memory()
+            for parent in self._stack:
+                parent.peak_bytes = max(parent.peak_bytes, peak)
+            self._stack.append(record)
+            tracemalloc.reset_peak()
+            record.start_bytes, _ = tracemalloc.get_traced_memory()
+
+        try:
+            yield record
+        except KeyboardInterrupt:
+            if self.exceeded is not None:
+                raise MemoryLimitExceeded(self.exceeded) from None
+            raise
+        finally:
+            with self._lock:
+                record.end_bytes, peak = tracemalloc.get_traced_memory()
+                record.peak_bytes = max(record.peak_bytes, peak)
+                self._stack.remove(record)
+                for parent in self._stack:
+                    parent.peak_bytes = max(parent.peak_bytes, record.peak_bytes)
+
+            record.elapsed = time.perf_counter() - start
+            if self.exceeded is None:
+                delta = _object_counts()
+                delta.subtract(counts)
+                # Leave out the baseline counter itself
+                delta[type(counts).__name__] -= 1
+                record.objects = { name: count for name, count in delta.most_common(self.top) if count > 0 }
+                trees = [ dict(name=name, **tree_stats(root)) for name, root in (roots() if roots else []) ]
+                record.trees = sorted(trees, key=lambda stats: stats["bytes"], reverse=True)[ : self.top]
+
+            self.records.append(record)
+
+
+    def report(self) -> List[dict]:
+        return [ asdict(record) for record in self.records ]
+
+
+    def clear(self):
+        self.records.clear()
+        self.exceeded = None
+
+
+default_tracker = MemoryTracker()
+"""Process-wide tracker used by the CLI, see XmlParser.memory_report"""
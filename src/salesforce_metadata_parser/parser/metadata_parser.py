@@ -1,35 +1,155 @@
 # Standard Library imports
+from collections.abc import MutableSequence
+from concurrent.futures import ThreadPoolExecutor
 import dataclasses
+from enum import Enum
+import functools
 import json
 import logging
 import os
 import re
-from typing import Any
-import xml.dom.minidom
-import xml.etree.ElementTree as ET
+import tempfile
+from types import MappingProxyType
+from typing import Any, BinaryIO, Callable, Iterable, Iterator, Tuple
 from xml.etree.ElementTree import Element
 import xml.sax.saxutils
 
 # Project imports
-from ..metadata.base import XmlNode
+from ..metadata.base import NodeList, XmlNode, new_node
+from ..metadata.history import VersionHistory, history_fields
+from ..metadata.lazy import LazyText, lazy_field_names, lazy_fields
 from ..metadata.metadata import Metadata
+from ..metadata.registry import TypeRegistry, default_registry
+from .backends import EtreeBackend, XmlBackend, get_backend, xml_declaration_line
+from .interning import StringPool
+from .lazy import cut_lazy_values, lazy_marker, read_buffer
+from .plans import PlanWriter, plan_for
+from .memory import default_tracker
 
 logger = logging.getLogger(__name__)
 
-xml_entities = {
+# Module level tables are read-only, so they can be shared by parsers running on different threads
+xml_entities = MappingProxyType({
     '\"': "&quot;",
     "\'": "&apos;",
     "\xA0": " ",
-}
+})
 
-patterns = {
+lazy_text_modes = (None, "memory", "mmap")
+
+patterns = MappingProxyType({
     "tagPattern": re.compile(r"(P?<namespace>\{.*\})?(?P<tag>[a-z_]+)"),
     # "listPattern": re.compile(r"typing\.List\[(?P<type>(?P<module>[A-Za-z]+\.)*(?P<class>[A-Za-z]+))\]"),
     "entityDoublePatterm": re.compile(r"&amp;(?P<entity>[a-z]+);"),
-}
+    "suffixPattern": re.compile(r".*\.(?P<suffix>.*)-meta\.xml"),
+    "rootTagPattern": re.compile(rb"<(?![?!])(?:[\w.-]+:)?(?P<tag>[\w.-]+)"),
+})
+
+
+def _current_umask(directory: str) -> int:
+    """The file mode creation mask, read without changing it: os.umask can only be read by setting
+    it, which would also apply to the files other threads create meanwhile."""
+    try:
+        # Linux 4.7 and later
+        with open("/proc/self/status", "r", encoding="ascii") as status:
+            for line in status:
+                if line.startswith("Umask:"):
+                    return int(line.split()[1], 8)
+    except (OSError, ValueError):
+        pass
+
+    # Elsewhere, the permissions the system gives to a new file of the directory
+    probe_path = os.path.join(directory, f".umask-{os.getpid()}-{os.urandom(4).hex()}.tmp")
+    try:
+        probe_file = os.open(probe_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+    except OSError:
+        return 0o022
+    try:
+        return 0o666 & ~os.fstat(probe_file).st_mode
+    finally:
+        os.close(probe_file)
+        os.remove(probe_path)
+
+
+def _replace_file(temp_path: str, target_path: str):
+    """Moves a complete temporary file over target_path, with the permissions of the file it replaces"""
+    # NamedTemporaryFile creates files readable by the owner only, new files get the usual permissions
+    if os.path.exists(target_path):
+        os.chmod(temp_path, os.stat(target_path).st_mode & 0o7777)
+    else:
+        os.chmod(temp_path, 0o666 & ~_current_umask(os.path.dirname(target_path)))
+    os.replace(temp_path, target_path)
+
+
+class _StreamBuffer:
+    """Encodes text to UTF-8 and writes it to a binary stream in chunks of about buffer_size bytes"""
+
+    def __init__(self, stream: BinaryIO, buffer_size: int):
+        self.stream = stream
+        self.buffer_size = buffer_size
+        self.chunks = []
+        self.size = 0
+
+    def write(self, text: str):
+        data = text.encode("utf-8")
+        self.chunks.append(data)
+        self.size += len(data)
+        if self.size >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        if self.chunks:
+            self.stream.write(b"".join(self.chunks))
+            self.chunks.clear()
+            self.size = 0
 
 
 class XmlParser:
+    """Converts Salesforce Metadata XML documents into dataclass trees, and back.
+
+    An instance is configured once with its class registry and formatting options. It keeps
+    no per-document state, so a single instance can be shared by any number of threads.
+    The static ``from_xml_*`` / ``to_xml_*`` methods remain available and use a temporary instance.
+    """
+
+    def __init__(
+        self,
+        classes: dict = None,
+        indent: str = "    ",
+        string_pool: StringPool = None,
+        registry: TypeRegistry = default_registry,
+        backend: Any = None,
+        lazy_text: str = None,
+        lazy_text_min_size: int = 256,
+        compact_history: bool = False,
+    ):
+        self.classes = MappingProxyType(dict(classes or {}))
+        """Maps root tag names to the Metadata class to instantiate. Read-only after construction."""
+
+        self.registry = registry
+        """Types looked up, and imported on first use, for root tags missing from classes."""
+
+        self.indent = indent
+        """Indentation used when pretty-printing documents."""
+
+        self.backend: XmlBackend = get_backend(backend)
+        """XML library used to read and pretty-print documents. See backends.get_backend."""
+
+        self.string_pool = string_pool
+        """Optional pool used to deduplicate tag names and text values. See interning.StringPool."""
+
+        assert lazy_text in lazy_text_modes, f"Unknown lazy text mode: {lazy_text}"
+        self.lazy_text = lazy_text
+        """parse_file leaves large text values in the file contents, held in "memory" or mapped with "mmap".
+        Values are decoded when read and written back as they were when never read. See lazy.cut_lazy_values."""
+
+        self.lazy_text_min_size = lazy_text_min_size
+        """Size in bytes from which text values are left lazy"""
+
+        self.compact_history = compact_history
+        """Root fields declared as history, such as templateVersions, are stored as a VersionHistory:
+        the last item in full, the others as deltas. See history.VersionHistory."""
+
 
     @staticmethod
     def _getListItemTagName(metadata: Any) -> str:
@@ -47,7 +167,7 @@ class XmlParser:
 
     @staticmethod
     def _unescape_double_entities(xml_content: str) -> str:
-        return patterns["entityDoublePatterm"].sub(lambda m: f"&{m.group("entity")};", xml_content)
+        return patterns["entityDoublePatterm"].sub(lambda m: f"&{m.group('entity')};", xml_content)
 
 
     @staticmethod
@@ -71,16 +191,23 @@ class XmlParser:
         cls2 = sub_classes.get(field_name, None)
         if not cls2:
             logger.debug(f"No dataclass found for: {field_name}")
-            
+            return None
+
+        # Enum fields are listed too, only dataclasses can hold child elements
+        if not dataclasses.is_dataclass(cls2):
+            return None
+
         return cls2
 
 
     @staticmethod
     def _getTagName(element: Element) -> str:
-        if not isinstance(element, Element):
+        # Elements of any backend, comments and processing instructions have no str tag
+        if not isinstance(getattr(element, "tag", None), str):
             logger.error(f"Unexpected Type: {type(element)}")
             return None
 
+        tag = None
         m = patterns["tagPattern"].match(element.tag)
         if m:
             tag = m.group("tag")
@@ -96,7 +223,7 @@ class XmlParser:
 
 
     @staticmethod
-    def _parse_xml(parent: Element, metadata: XmlNode):
+    def _parse_xml(parent: Element, metadata: XmlNode, string_pool: StringPool = None, lazy_values: list = None):
         parent_tag = XmlParser._getTagName(parent)
 
         if not dataclasses.is_dataclass(metadata):
@@ -104,16 +231,33 @@ class XmlParser:
             return None
 
         namespaces = metadata.__dict__.get("namespaces", None)
+        node_dict = metadata.__dict__
+        # Tags in the order of their first element, the node fields are put back in this order
+        source_order = {}
 
         for child in parent.findall("./", namespaces=namespaces):
             child_tag = XmlParser._getTagName(child)
+            if string_pool is not None:
+                child_tag = string_pool.intern(child_tag)
+            source_order[child_tag] = None
             logger.debug(f'tagName: {parent_tag}.{child_tag}')
-            if child.text and not child.text.isspace():
-                if len(child.text) > 40:
-                    logger.debug(f'text: "{child.text[ : 40]}..."')
+            text = child.text
+            if lazy_values is not None and text and text[0] == lazy_marker:
+                value = lazy_values[int(text[1 : ])]
+                if child_tag in lazy_fields(type(metadata)):
+                    # Left in the source buffer, neither logged nor interned
+                    metadata.__dict__[child_tag] = value
+                    continue
+                text = str(value)
+            if text and not text.isspace():
+                if len(text) > 40:
+                    logger.debug(f'text: "{text[ : 40]}..."')
+                else:
+                    logger.debug(f'text: = "{text}"')
+                if string_pool is not None:
+                    metadata.__dict__[child_tag] = string_pool.intern(text)
                 else:
-                    logger.debug(f'text: = "{child.text}"')
-                metadata.__dict__[child_tag] = child.text
+                    metadata.__dict__[child_tag] = text
                 continue
 
             # Instantiate a sub-node
@@ -122,16 +266,38 @@ class XmlParser:
                 cls2 = XmlNode
 
             logger.debug(f"Instantiating Element {child_tag} into {cls2.__name__}")
-            metadata2 = cls2()
+            metadata2 = new_node(cls2)
 
-            if child_tag not in metadata.__dict__.keys():
-                metadata.__dict__[child_tag] = list()
+            # Typed nodes declare their fields, with None as default
+            if metadata.__dict__.get(child_tag, None) is None:
+                metadata.__dict__[child_tag] = NodeList()
 
             metadata.__dict__[child_tag].append(metadata2)
-            XmlParser._parse_xml(child, metadata2)
+            XmlParser._parse_xml(child, metadata2, string_pool, lazy_values)
+
+        XmlParser._keep_source_order(node_dict, source_order)
+
+
+    @staticmethod
+    def _keep_source_order(node_dict: dict, source_order: dict):
+        """Moves the fields found in the document before the others, in the order of their elements.
+
+        Typed nodes start with every declared field, so tags their class does not declare would
+        otherwise be written after all of them. Metadata API types are sequences, the order matters.
+        """
+        if not source_order:
+            return
+
+        if [ name for name in node_dict if name in source_order ] == list(source_order):
+            return
+
+        fields = { name: node_dict[name] for name in source_order }
+        fields.update(node_dict)
+        node_dict.clear()
+        node_dict.update(fields)
 
 
-    def _unparse_xml(parent_element: Element, key: str, value: Any):
+    def _unparse_xml(parent_element: Element, key: str, value: Any, sub_element: Callable = EtreeBackend().SubElement):
         logger.debug(f"Parent: {type(parent_element)} = {parent_element.tag}")
         logger.debug(f"key: {type(key)} = {key}")
         logger.debug(f"value: {type(value)} = {value}")
@@ -140,15 +306,18 @@ class XmlParser:
             logger.debug(f"Value not set for {key}")
             return
 
+        if isinstance(value, LazyText):
+            value = str(value)
+
         if isinstance(value, str) and not value.isspace():
-            element = ET.SubElement(parent_element, key)
+            element = sub_element(parent_element, key)
             element.text = XmlParser._escapeXmlEntities(value, xml_entities)
             logger.debug(f"Adding text node {parent_element.tag}.{key}")
             return
 
         if isinstance(value, XmlNode):
             logger.debug(f"{type(value)} = {value.__dict__}")
-            element = ET.SubElement(parent_element, key)
+            element = sub_element(parent_element, key)
             logger.debug(f"Adding object node {parent_element.tag}.{element.tag}")
 
             node_dict = XmlParser._get_visible_dict(value)
@@ -156,91 +325,72 @@ class XmlParser:
                 logger.debug(f"fields[{field_name}] = {field}")
                 key2 = field_name
                 value2 = value.__dict__[key2]
-                XmlParser._unparse_xml(element, key2, value2)
+                XmlParser._unparse_xml(element, key2, value2, sub_element)
 
             return
 
-        if isinstance(value, list):
+        if isinstance(value, MutableSequence):
             for item in value:
-                XmlParser._unparse_xml(parent_element, key, item)
+                XmlParser._unparse_xml(parent_element, key, item, sub_element)
+
+            return
 
+        if isinstance(value, Enum):
+            XmlParser._unparse_xml(parent_element, key, value.value, sub_element)
             return
         
         logger.error(f"Unexpected type {type(value)}: [{key}] = {value}")
 
-    @staticmethod
-    def _encode_string(pretty_string: bytes, xml_declaration: dict = {}):
-        logger.debug(f"Converting from Bytes to UTF-8 String")
-        if xml_declaration.get("encoding", None):
-            return str(pretty_string, encoding=xml_declaration["encoding"])
-        return str(pretty_string, encoding="utf-8")
+    def parse_string(self, xml_string: str) -> Metadata:
+        # Parse the XML string
 
+        root: Element = self.backend.fromstring(xml_string)
 
-    @staticmethod
-    def _to_pretty_string(root: ET.Element, xml_declaration: dict = {}, indent: str = "    ") -> str:
-        logger.debug(f"root: {root.tag}")
+        return self.parse_element(root)
 
-        rough_string = ET.tostring(
-            element=root,
-            encoding="unicode",
-            method="xml",
-            xml_declaration=True,
-            # default_namespace=root.namespace,
-            short_empty_elements=True,
-            # pretty_print=True
-        )
-    
-        # Pretty print the XML
-        logger.debug(f"begin: {rough_string[ : 200]}")
-        logger.debug(f"end: {rough_string[-200 : ]}")
-        reparsed = xml.dom.minidom.parseString(rough_string)
-
-        pretty_string = reparsed.toprettyxml(
-            indent=indent,
-            encoding=xml_declaration.get("encoding", None),
-            standalone=xml_declaration.get("standalone", None)
-        )
-
-        if isinstance(pretty_string, bytes):
-            pretty_string = XmlParser._encode_string(pretty_string, xml_declaration)
-
-        pretty_string = XmlParser._unescape_double_entities(pretty_string)
-        logger.debug(f"begin: {pretty_string[ : 200]}")
-        logger.debug(f"end: {pretty_string[-200 : ]}")
-
-        return pretty_string
 
-    @staticmethod
-    def from_xml_string(xml_string: str, classes: dict = {}) -> Metadata:
-        # Parse the XML string
+    def _root_class(self, tag: str) -> type:
+        cls = self.classes.get(tag, None)
+        if cls is None and self.registry is not None:
+            cls = self.registry.resolve(tag)
+        if cls is None:
+            cls = Metadata
+        return cls
+
 
-        root: Element = ET.fromstring(xml_string)
+    def parse_element(self, root: Element, lazy_values: list = None) -> Metadata:
         logger.debug(f"root: {root.tag}")
 
         tag = XmlParser._getTagName(root)
-        cls = classes.get(tag, Metadata)
-        if cls is None:
-            cls = Metadata
+        cls = self._root_class(tag)
 
         logger.debug(f"Instantiating Element {tag} into {cls.__name__}")
-        metadata = cls()
+        metadata = new_node(cls)
 
         metadata._TypeName = tag
 
-        XmlParser._parse_xml(root, metadata)
+        XmlParser._parse_xml(root, metadata, self.string_pool, lazy_values)
+
+        if self.compact_history:
+            for name in history_fields(cls):
+                value = metadata.__dict__.get(name, None)
+                if isinstance(value, list) and len(value) > 1:
+                    metadata.__dict__[name] = VersionHistory(value)
 
         # logger.debug(json.dumps(metadata.__repr__(), indent=2))            
         
         return metadata
 
 
-    @staticmethod
-    def from_xml_file(xml_file_path, classes: dict = {}) -> Metadata:
-        with open(xml_file_path, "r", encoding="utf-8") as xml_file:
-            logger.info(f"Reading Metadata from: {xml_file_path}")
-            content = xml_file.read()
+    def parse_file(self, xml_file_path) -> Metadata:
+        metadata = self._parse_lazy_file(xml_file_path) if self.lazy_text else None
+
+        if metadata is None:
+            with open(xml_file_path, "r", encoding="utf-8") as xml_file:
+                logger.debug(f"Reading Metadata from: {xml_file_path}")
+                content = xml_file.read()
 
-        metadata = XmlParser.from_xml_string(content, classes)
+            metadata = self.parse_string(content)
 
         xml_dir_path, xml_file_name = os.path.split(xml_file_path)
 
@@ -248,12 +398,185 @@ class XmlParser:
             metadata._Directory =  xml_dir_path
 
         if metadata._Suffix is None:
-            m = re.match(r".*\.(?P<suffix>.*)-meta\.xml", xml_file_name)
+            m = patterns["suffixPattern"].match(xml_file_name)
             if m:
                 metadata._Suffix = m.group("suffix")
 
         return metadata
 
+
+    def _parse_lazy_file(self, xml_file_path) -> Metadata:
+        logger.debug(f"Reading Metadata from: {xml_file_path} ({self.lazy_text})")
+        buffer = read_buffer(xml_file_path, self.lazy_text)
+
+        # Importing the class of the document declares its lazy fields
+        m = patterns["rootTagPattern"].search(buffer)
+        if m:
+            self._root_class(str(m.group("tag"), "utf-8"))
+
+        document, lazy_values = cut_lazy_values(buffer, frozenset(lazy_field_names), self.lazy_text_min_size)
+        if document is None:
+            return None
+
+        return self.parse_element(self.backend.fromstring(document), lazy_values)
+
+
+    def parse_files(self, xml_file_paths: Iterable[str], max_workers: int = None) -> Iterator[Tuple[str, Metadata]]:
+        """Parses several files on a thread pool. Yields (path, metadata) pairs in the input order."""
+        xml_file_paths = list(xml_file_paths)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            yield from zip(xml_file_paths, executor.map(self.parse_file, xml_file_paths))
+
+
+    def dump_string(self, metadata: Metadata) -> str:
+        """Serializes the document with the precompiled plan of each class, see plans.PlanWriter"""
+        assert metadata is not None, "Metadata not provided"
+
+        if logger.isEnabledFor(logging.DEBUG):
+            private_dict = XmlParser._get_invisible_dict(metadata)
+            logger.debug(f"Private: {json.dumps(private_dict, indent=2, default=repr)}")
+
+        opening, closing, empty = self._root_tags(metadata)
+        out = [ opening ]
+        PlanWriter(self.indent, _escape_value).write_children(out, metadata, 1)
+        if len(out) == 1:
+            return empty
+
+        out.append(closing)
+        return "".join(out)
+
+
+    def dump_tree_string(self, metadata: Metadata) -> str:
+        """Serializes the document through an element tree pretty-printed by the backend.
+
+        Slower reference implementation of dump_string, both produce the same output.
+        """
+        assert metadata is not None, "Metadata not provided"
+
+        root = self.backend.Element(metadata._TypeName, XmlParser._get_ns(metadata))
+
+        node_dict = XmlParser._get_visible_dict(metadata)
+        for key, value in node_dict.items():            
+            XmlParser._unparse_xml(root, key, value, self.backend.SubElement)
+
+        pretty_string = self.backend.to_pretty_string(root, metadata._xml_declaration, self.indent)
+        return XmlParser._unescape_double_entities(pretty_string)
+
+
+    def dump_file(self, metadata: Metadata, xml_file_name: str) -> None:
+        assert metadata is not None, "Metadata not provided"
+        assert xml_file_name is not None, f"xml_file_name is NULL"
+
+        logger.info(f"Writing Metadata to: {xml_file_name}")
+        if os.path.exists(xml_file_name) and not os.path.isfile(xml_file_name):
+            # Devices and pipes cannot be replaced
+            with open(xml_file_name, "wb") as xml_file:
+                self.dump_stream(metadata, xml_file)
+            return
+
+        # Lazy text values may be mapped from the file being replaced, so the new contents are
+        # written to a temporary file first. The mapping keeps the old contents until it is closed.
+        target_path = os.path.realpath(xml_file_name)
+        with tempfile.NamedTemporaryFile("wb", dir=os.path.dirname(target_path), suffix=".tmp", delete=False) as xml_file:
+            try:
+                self.dump_stream(metadata, xml_file)
+            except BaseException:
+                xml_file.close()
+                os.remove(xml_file.name)
+                raise
+
+        _replace_file(xml_file.name, target_path)
+
+
+    @staticmethod
+    def _escape_text(text: str) -> str:
+        """Escapes a text value exactly like the ElementTree and minidom round trip of dump_tree_string.
+
+        The round trip escapes values twice (xml_entities, then the serializer) and then undoes one
+        level with _unescape_double_entities, which nets out to a single escape of every special
+        character, non-breaking spaces replaced and line endings normalized by the XML parser.
+        """
+        if "&" in text:
+            text = text.replace("&", "&amp;")
+        if "<" in text:
+            text = text.replace("<", "&lt;")
+        if ">" in text:
+            text = text.replace(">", "&gt;")
+        if "\"" in text:
+            text = text.replace("\"", "&quot;")
+        if "\'" in text:
+            text = text.replace("\'", "&apos;")
+        if "\xA0" in text:
+            text = text.replace("\xA0", " ")
+        if "\r" in text:
+            text = text.replace("\r\n", "\n").replace("\r", "\n")
+        return text
+
+
+    def _root_tags(self, metadata: Metadata) -> Tuple[str, str, str]:
+        """Declaration and opening root tag, closing root tag, and the empty root tag"""
+        root_tag = metadata._TypeName
+        ns = XmlParser._get_ns(metadata)
+        if ns:
+            ns = ns.replace("&", "&amp;").replace("<", "&lt;").replace("\"", "&quot;").replace(">", "&gt;")
+            start = f'{xml_declaration_line(metadata._xml_declaration)}\n<{root_tag} xmlns="{ns}"'
+        else:
+            start = f"{xml_declaration_line(metadata._xml_declaration)}\n<{root_tag}"
+        return f"{start}>\n", f"</{root_tag}>\n", f"{start}/>\n"
+
+
+    def dump_stream(self, metadata: Metadata, stream: BinaryIO, buffer_size: int = 64 * 1024) -> None:
+        """Writes the document to a binary file-like object while walking the tree.
+
+        The output is identical to dump_string encoded as UTF-8, but only about buffer_size bytes
+        (or one child of the root, when larger) are held in memory instead of the whole document.
+        """
+        assert metadata is not None, "Metadata not provided"
+
+        buffer = _StreamBuffer(stream, buffer_size)
+        writer = PlanWriter(self.indent, _escape_value)
+        plan = plan_for(type(metadata))
+        opening, closing, empty = self._root_tags(metadata)
+
+        written = False
+        for name, value in metadata.__dict__.items():
+            if name[0] == "_" or value is None:
+                continue
+
+            field = plan.field(name)
+            is_list = isinstance(value, MutableSequence)
+            # Items of a list are written one at a time, so versions rebuilt by a history are not all held
+            for item in value if is_list else (value, ):
+                out = []
+                if is_list:
+                    writer.write_item(out, field, item, 1)
+                else:
+                    writer.write_value(out, field, item, 1)
+                if out and not written:
+                    buffer.write(opening)
+                    written = True
+                buffer.write("".join(out))
+
+        buffer.write(closing if written else empty)
+        buffer.flush()
+        stream.flush()
+
+
+    @staticmethod
+    def to_xml_stream(metadata: Metadata, stream: BinaryIO, buffer_size: int = 64 * 1024) -> None:
+        XmlParser().dump_stream(metadata, stream, buffer_size)
+
+
+    @staticmethod
+    def from_xml_string(xml_string: str, classes: dict = None, backend: Any = None) -> Metadata:
+        return XmlParser(classes, backend=backend).parse_string(xml_string)
+
+
+    @staticmethod
+    def from_xml_file(xml_file_path, classes: dict = None, backend: Any = None) -> Metadata:
+        return XmlParser(classes, backend=backend).parse_file(xml_file_path)
+
     @staticmethod
     def _get_ns(metadata: Metadata) -> str:
         namespaces = metadata._namespaces
@@ -266,33 +589,28 @@ class XmlParser:
 
 
     @staticmethod
-    def to_xml_string(metadata: Metadata) -> str:
-        assert metadata is not None, "Metadata not provided"
-
-        # Create the root Node
-        private_dict = XmlParser._get_invisible_dict(metadata)
-        logger.debug(f"Private: {json.dumps(private_dict, indent=2)}")
-        root = ET.Element(metadata._TypeName)
+    def memory_report() -> list:
+        """Memory records of the sections measured so far by memory.default_tracker, such as CLI commands"""
+        return default_tracker.report()
 
-        ns = XmlParser._get_ns(metadata)        
-        if ns:
-            root.set('xmlns', ns)
-        
-        node_dict = XmlParser._get_visible_dict(metadata)
-        for key, value in node_dict.items():            
-            XmlParser._unparse_xml(root, key, value)
 
-        return XmlParser._to_pretty_string(root, metadata._xml_declaration, "    ")
+    @staticmethod
+    def to_xml_string(metadata: Metadata) -> str:
+        return XmlParser().dump_string(metadata)
 
 
     @staticmethod
     def to_xml_file(metadata: Metadata, xml_file_name: str) -> None:
-        assert metadata is not None, "Metadata not provided"
+        XmlParser().dump_file(metadata, xml_file_name)
+
+
+@functools.lru_cache(maxsize=16 * 1024)
+def _escape_short_value(text: str) -> str:
+    return XmlParser._escape_text(text)
 
-        content = XmlParser.to_xml_string(metadata)
-        assert isinstance(content, str), f"Wrong type for content: {type(content)}"
-        assert xml_file_name is not None, f"xml_file_name is NULL"
 
-        with open(xml_file_name, "w", encoding="utf-8") as xml_file:
-            logger.info(f"Writing Metadata to: {xml_file_name}")
-            xml_file.write(content)
+def _escape_value(text: str) -> str:
+    """Escapes text values, memoizing the short ones that repeat across nodes and documents"""
+    if len(text) <= 64:
+        return _escape_short_value(text)
+    return XmlParser._escape_text(text)
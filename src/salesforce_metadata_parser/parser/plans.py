@@ -0,0 +1,228 @@
+# Standard Library imports
+from collections.abc import MutableSequence
+import dataclasses
+from enum import Enum
+import functools
+import logging
+import typing
+from typing import Any, Callable, Dict, List
+
+# Project imports
+from ..metadata.base import XmlNode
+from ..metadata.lazy import LazyText
+
+logger = logging.getLogger(__name__)
+
+TEXT = "text"
+ENUM = "enum"
+NODE = "node"
+LIST = "list"
+OTHER = "other"
+
+
+@dataclasses.dataclass(frozen=True)
+class FieldPlan:
+    """How one field is written: its declared kind and its tags, built once.
+
+    Tags are kept as text, the pieces are joined and encoded once per document or stream chunk.
+    """
+
+    name: str
+    kind: str = OTHER
+    """Declared kind, from the type hints. PlanWriter dispatches on it, values of another type
+    than declared (such as an empty element parsed as a node) fall back to their actual type."""
+
+    item_kind: str = OTHER
+    """Declared kind of the items of a list field"""
+
+    open: str = ""
+    close: str = ""
+    empty: str = ""
+
+
+def _field_plan(name: str, kind: str = OTHER, item_kind: str = OTHER) -> FieldPlan:
+    return FieldPlan(name, kind, item_kind, f"<{name}>", f"</{name}>\n", f"<{name}/>\n")
+
+
+def _unwrap_optional(hint: Any) -> Any:
+    if typing.get_origin(hint) is typing.Union:
+        args = [ arg for arg in typing.get_args(hint) if arg is not type(None) ]
+        hint = args[0] if len(args) == 1 else hint
+    return hint
+
+
+def _item_kind(hint: Any) -> str:
+    hint = _unwrap_optional(hint)
+    if typing.get_origin(hint) in (list, List):
+        args = typing.get_args(hint)
+        return _kind(args[0]) if args else OTHER
+    return OTHER
+
+
+def _kind(hint: Any) -> str:
+    hint = _unwrap_optional(hint)
+    if typing.get_origin(hint) in (list, List):
+        return LIST
+    if hint is str:
+        return TEXT
+    if isinstance(hint, type) and issubclass(hint, Enum):
+        return ENUM
+    if dataclasses.is_dataclass(hint):
+        return NODE
+    return OTHER
+
+
+class SerializationPlan:
+    """Ordered visible fields of a dataclass with their kinds and tags.
+
+    Parsed nodes may also hold tags their class does not declare; their plans are added on first use.
+    """
+
+    def __init__(self, cls: type):
+        self.cls = cls
+        self.fields: Dict[str, FieldPlan] = {}
+
+        if dataclasses.is_dataclass(cls):
+            try:
+                hints = typing.get_type_hints(cls)
+            except Exception:
+                hints = {}
+            for field in dataclasses.fields(cls):
+                if field.name[0] != "_":
+                    hint = hints.get(field.name, None)
+                    self.fields[field.name] = _field_plan(field.name, _kind(hint), _item_kind(hint))
+
+        logger.debug(f"Serialization plan of {cls.__name__}: {', '.join(self.fields)}")
+
+
+    def field(self, name: str) -> FieldPlan:
+        plan = self.fields.get(name, None)
+        if plan is None:
+            # Dictionary assignment is atomic, concurrent writers at worst build the same plan twice
+            plan = self.fields[name] = _field_plan(name)
+        return plan
+
+
+@functools.lru_cache(maxsize=None)
+def plan_for(cls: type) -> SerializationPlan:
+    return SerializationPlan(cls)
+
+
+class PlanWriter:
+    """Writes the children of a node as indented XML text, following the plan of each class.
+
+    Output pieces are appended to a list. Values follow the rules of the element tree round trip
+    of XmlParser.dump_tree_string: whitespace-only strings and values of other types are skipped,
+    empty strings and nodes without output are written as <tag/>, Enum members as their value.
+    Lazy text values are written without being stored on their node.
+    """
+
+    def __init__(self, indent: str, escape: Callable[[str], str]):
+        self.indent = indent
+        self.escape = escape
+        self._indents = [ "" ]
+
+
+    def _indent(self, depth: int) -> str:
+        while len(self._indents) <= depth:
+            self._indents.append(self._indents[-1] + self.indent)
+        return self._indents[depth]
+
+
+    def write_children(self, out: List[str], node: Any, depth: int):
+        plan = plan_for(type(node))
+        for name, value in node.__dict__.items():
+            if name[0] != "_" and value is not None:
+                self.write_value(out, plan.field(name), value, depth)
+
+
+    def write_value(self, out: List[str], field: FieldPlan, value: Any, depth: int):
+        self._write(out, field, value, depth, field.kind)
+
+
+    def write_item(self, out: List[str], field: FieldPlan, item: Any, depth: int):
+        """Writes one item of a list field"""
+        if item is not None:
+            self._write(out, field, item, depth, field.item_kind)
+
+
+    def _write(self, out: List[str], field: FieldPlan, value: Any, depth: int, kind: str):
+        # Declared kinds first, with a check of the actual type that costs no more than one isinstance
+        if kind is TEXT or kind is ENUM:
+            value_type = type(value)
+            if value_type is str:
+                self._write_text(out, field, value, depth)
+                return
+            if value_type is LazyText:
+                self._write_lazy(out, field, value, depth)
+                return
+        elif kind is NODE:
+            if isinstance(value, XmlNode):
+                self._write_node(out, field, value, depth)
+                return
+        elif kind is LIST:
+            if isinstance(value, MutableSequence):
+                item_kind = field.item_kind
+                for item in value:
+                    if item is not None:
+                        self._write(out, field, item, depth, item_kind)
+                return
+
+        self._write_any(out, field, value, depth)
+
+
+    def _write_text(self, out: List[str], field: FieldPlan, value: str, depth: int):
+        if value.isspace():
+            return
+        escaped = self.escape(value)
+        out.append(self._indent(depth))
+        out.append(f"{field.open}{escaped}{field.close}" if escaped else field.empty)
+
+
+    def _write_lazy(self, out: List[str], field: FieldPlan, value: LazyText, depth: int):
+        # Never read since parsing, the source text is written back when possible
+        out.append(self._indent(depth))
+        out.append(f"{field.open}{value.escaped(self.escape)}{field.close}")
+
+
+    def _write_node(self, out: List[str], field: FieldPlan, value: XmlNode, depth: int):
+        out.append(self._indent(depth))
+        start = len(out)
+        out.append(field.open)
+        out.append("\n")
+        self.write_children(out, value, depth + 1)
+        if len(out) == start + 2:
+            # Nothing was written for the children
+            del out[start : ]
+            out.append(field.empty)
+        else:
+            out.append(self._indent(depth))
+            out.append(field.close)
+
+
+    def _write_any(self, out: List[str], field: FieldPlan, value: Any, depth: int):
+        """Dispatches on the actual type: undeclared tags, and values of another type than declared"""
+        if type(value) is LazyText:
+            self._write_lazy(out, field, value, depth)
+            return
+
+        if isinstance(value, str):
+            self._write_text(out, field, value, depth)
+            return
+
+        if isinstance(value, XmlNode):
+            self._write_node(out, field, value, depth)
+            return
+
+        if isinstance(value, Enum):
+            self._write_any(out, field, value.value, depth)
+            return
+
+        if isinstance(value, MutableSequence):
+            # Lists, NodeLists and lists stored in another form, such as a VersionHistory
+            for item in value:
+                if item is not None:
+                    self._write_any(out, field, item, depth)
+            return
+
+        logger.error(f"Unexpected type {type(value)}: [{field.name}] = {value}")
@@ -0,0 +1,92 @@
+# Standard Library imports
+import hashlib
+import heapq
+import json
+import logging
+import os
+import re
+from typing import Dict, List, Tuple
+
+# Project imports
+from .manifest import relative_path
+
+logger = logging.getLogger(__name__)
+
+shardPattern = re.compile(r"^\s*(?P<index>\d+)\s*/\s*(?P<count>\d+)\s*$")
+
+
+def parse_shard(shard: str) -> Tuple[int, int]:
+    """Converts INDEX/COUNT, such as 2/4, into a (index, count) pair. Indexes start at 1."""
+    m = shardPattern.match(shard)
+    if not m:
+        raise ValueError(f"Invalid shard, expected INDEX/COUNT: {shard}")
+    index, count = int(m.group("index")), int(m.group("count"))
+    if count < 1 or not 1 <= index <= count:
+        raise ValueError(f"Invalid shard, INDEX must be between 1 and COUNT: {shard}")
+    return index, count
+
+
+def shard_of(path: str, count: int) -> int:
+    """Shard of a relative path, from a hash that does not change between runs, machines or Python versions"""
+    digest = hashlib.sha256(path.encode("utf-8")).digest()
+    return int.from_bytes(digest[ : 8], "big") % count + 1
+
+
+def load_timings(file_path: str, task: str = None) -> Dict[str, float]:
+    """Processing time of every file recorded in a manifest, or in a results document such as merge-results writes.
+
+    Manifests hold the times of every task that used them: those of task, when it has any, otherwise the longest time of each file.
+    """
+    with open(file_path, "r", encoding="utf-8") as timings_file:
+        content = json.load(timings_file)
+
+    if "tasks" in content:
+        tasks = content["tasks"]
+        timings = {}
+        for entries in ([ tasks[task] ] if task in tasks else tasks.values()):
+            for path, entry in entries.items():
+                if entry.get("elapsed") is not None:
+                    timings[path] = max(timings.get(path, 0.0), entry["elapsed"])
+        return timings
+    return dict(content.get("metrics", {}).get("timings", {}))
+
+
+def assign_shards(file_paths: List[str], count: int, timings: Dict[str, float] = None) -> Dict[str, int]:
+    """Maps every file to a shard.
+
+    Without timings, files are spread by shard_of. With timings, each file goes to the shard
+    with the least work so far, longest files first. Files missing from the timings are
+    estimated from their size, at the average time per byte of the timed files. Every node
+    must get the same file list and timings to compute the same assignment.
+    """
+    if not timings:
+        return { file_path: shard_of(relative_path(file_path), count) for file_path in file_paths }
+
+    sizes = { file_path: os.path.getsize(file_path) for file_path in file_paths }
+    timed = [ file_path for file_path in file_paths if relative_path(file_path) in timings ]
+    timed_size = sum(sizes[file_path] for file_path in timed)
+    per_byte = sum(timings[relative_path(file_path)] for file_path in timed) / timed_size if timed_size else 0.0
+
+    def cost(file_path: str) -> float:
+        return timings.get(relative_path(file_path), sizes[file_path] * per_byte)
+
+    # Ties are broken by path, so the order does not depend on the file system
+    ordered = sorted(file_paths, key=lambda file_path: (-cost(file_path), relative_path(file_path)))
+
+    loads = [ (0.0, shard) for shard in range(1, count + 1) ]
+    assignment = {}
+    for file_path in ordered:
+        load, shard = heapq.heappop(loads)
+        assignment[file_path] = shard
+        heapq.heappush(loads, (load + cost(file_path), shard))
+
+    logger.debug(f"Estimated shard times: {', '.join(f'{shard}: {load:.3f} s' for load, shard in sorted(loads, key=lambda item: item[1]))}")
+    return assignment
+
+
+def select_shard(file_paths: List[str], index: int, count: int, timings: Dict[str, float] = None) -> List[str]:
+    """The files of shard index out of count, in their original order"""
+    assignment = assign_shards(file_paths, count, timings)
+    selected = [ file_path for file_path in file_paths if assignment[file_path] == index ]
+    logger.info(f"Shard {index}/{count}: {len(selected)} of {len(file_paths)} files")
+    return selected
@@ -0,0 +1,109 @@
+# Standard Library imports
+import logging
+import os
+import tempfile
+from typing import Callable, List
+
+# Project imports
+from ..metadata.metadata import Metadata
+from .metadata_parser import XmlParser, _replace_file
+
+logger = logging.getLogger(__name__)
+
+
+def _split_closing_tag(content: str, type_name: str) -> tuple:
+    """Splits a serialized document into its body and its closing root tag"""
+    body, closing_tag, tail = content.rpartition(f"</{type_name}>")
+    return body, closing_tag + tail
+
+
+def split_xml_file(
+    xml_file_path: str,
+    split_tag: str,
+    target_path: Callable[[Metadata], str],
+    parser: XmlParser = None,
+) -> List[str]:
+    """Writes one document per split_tag child of the root, in a single pass over the source file.
+
+    Every document gets the other children of the root plus one split_tag element. Each
+    split_tag element is written as soon as it closes and then dropped, so peak memory is
+    bounded by the largest element instead of the whole file. Root children that come after
+    the first split_tag element (type, visibility...) are only known at the end: documents are
+    written to temporary files, completed with them, and then moved over their targets, so a
+    target is never seen half written and is left unchanged when the split fails.
+
+    target_path receives the Metadata of each document, may adjust it, and returns the file to write.
+    Two documents with the same target, such as versions sharing an identifier, raise a ValueError.
+    """
+    parser = parser or XmlParser()
+
+    root = None
+    depth = 0
+    leading = []
+    trailing = []
+    # Target path of every temporary file, in document order
+    pending = {}
+    targets = set()
+
+    logger.info(f"Splitting Metadata from: {xml_file_path}")
+    try:
+        for event, element in parser.backend.iterparse(xml_file_path, events=("start", "end")):
+            if event == "start":
+                depth += 1
+                if root is None:
+                    root = element
+                continue
+
+            if depth == 2:
+                # The reader parses ahead, the document is built from the collected children only
+                root.remove(element)
+
+                if XmlParser._getTagName(element) == split_tag:
+                    document_root = parser.backend.empty_copy(root)
+                    document_root.extend(leading)
+                    document_root.append(element)
+
+                    metadata = parser.parse_element(document_root)
+                    file_path = target_path(metadata)
+                    real_path = os.path.realpath(file_path)
+                    if real_path in targets:
+                        raise ValueError(f"Two {split_tag} elements of {xml_file_path} are written to {file_path}")
+                    targets.add(real_path)
+                    body, _ = _split_closing_tag(parser.dump_string(metadata), metadata._TypeName)
+
+                    with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=os.path.dirname(real_path), suffix=".tmp", delete=False) as xml_file:
+                        pending[xml_file.name] = file_path
+                        xml_file.write(body)
+                elif pending:
+                    trailing.append(element)
+                else:
+                    leading.append(element)
+
+            depth -= 1
+
+        # Complete every file with the children that followed the split elements
+        type_name = XmlParser._getTagName(root)
+        ending = f"</{type_name}>\n"
+        if trailing:
+            trailing_root = parser.backend.empty_copy(root)
+            trailing_root.extend(trailing)
+            body, ending = _split_closing_tag(parser.dump_string(parser.parse_element(trailing_root)), type_name)
+            # Keep the children only, without the XML declaration and the opening root tag
+            ending = body[body.index("\n", body.index(f"<{type_name}")) + 1 : ] + ending
+
+        for temp_path in pending:
+            with open(temp_path, "a", encoding="utf-8") as xml_file:
+                xml_file.write(ending)
+    except BaseException:
+        for temp_path in pending:
+            os.remove(temp_path)
+        raise
+
+    written = []
+    for temp_path, file_path in pending.items():
+        logger.info(f"Writing Metadata to: {file_path}")
+        _replace_file(temp_path, os.path.realpath(file_path))
+        written.append(file_path)
+
+    logger.info(f"Split {len(written)} documents from: {xml_file_path}")
+    return written
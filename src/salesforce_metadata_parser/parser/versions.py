@@ -0,0 +1,161 @@
+# Standard Library imports
+from array import array
+from collections import defaultdict
+import logging
+import re
+import sys
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# One identifier per line, "<base>=_<number>". Identifiers without a number keep number -1.
+identifierPattern = re.compile(r"^(?:(?P<base>.*)=_(?P<number>\d+)|(?P<other>.*))$", re.MULTILINE)
+
+
+class VersionColumns:
+    """Version identifiers of many templates, split into (base, number) columns.
+
+    Row i is the i-th version of template owners[i], in document order. Bases are interned strings
+    and numbers and owners are kept in arrays, so the columns of a whole repository stay small
+    and bulk operations (sort, gaps, duplicates, pruning) never re-parse an identifier.
+    """
+
+    def __init__(self, templates: List[str]):
+        self.templates = templates
+        """Template (file) of every owner index"""
+
+        self.active: List[Optional[str]] = [ None ] * len(templates)
+        self.owners = array("l")
+        self.positions = array("l")
+        self.numbers = array("q")
+        self.bases: List[str] = []
+
+
+    @staticmethod
+    def from_templates(templates: Dict[str, Tuple[List[str], Optional[str]]]) -> "VersionColumns":
+        """Builds the columns from { template: ([versionIdentifier, ...], activeVersionIdentifier) }"""
+        columns = VersionColumns(list(templates))
+
+        lines = []
+        for owner, (identifiers, active) in enumerate(templates.values()):
+            columns.active[owner] = active
+            columns.owners.extend([ owner ] * len(identifiers))
+            columns.positions.extend(range(len(identifiers)))
+            lines.extend(identifier or "" for identifier in identifiers)
+
+        # A single pass of the compiled pattern over every identifier
+        for m in identifierPattern.finditer("\n".join(lines)):
+            if m.start() == m.end() and len(columns.bases) == len(lines):
+                # The empty match at the very end of the text
+                break
+            if m.group("other") is not None:
+                columns.bases.append(sys.intern(m.group("other")))
+                columns.numbers.append(-1)
+            else:
+                columns.bases.append(sys.intern(m.group("base")))
+                columns.numbers.append(int(m.group("number")))
+
+        assert len(columns.bases) == len(lines), "Version identifiers must not contain line breaks"
+        logger.debug(f"Parsed {len(lines)} version identifiers of {len(columns.templates)} templates")
+        return columns
+
+
+    def __len__(self) -> int:
+        return len(self.bases)
+
+
+    def identifier(self, row: int) -> str:
+        number = self.numbers[row]
+        return self.bases[row] if number < 0 else f"{self.bases[row]}=_{number}"
+
+
+    def rows_by_owner(self) -> Dict[int, List[int]]:
+        rows = defaultdict(list)
+        for row, owner in enumerate(self.owners):
+            rows[owner].append(row)
+        return rows
+
+
+    def sort_order(self) -> List[int]:
+        """Row indices ordered by template, base and version number"""
+        return sorted(range(len(self)), key=lambda row: (self.owners[row], self.bases[row], self.numbers[row]))
+
+
+    def gaps(self) -> Dict[str, List[int]]:
+        """Version numbers missing from the =_N sequence of every template"""
+        numbers = defaultdict(set)
+        for row in range(len(self)):
+            if self.numbers[row] >= 0:
+                numbers[(self.owners[row], self.bases[row])].add(self.numbers[row])
+
+        gaps = defaultdict(list)
+        for (owner, base), found in numbers.items():
+            missing = sorted(set(range(1, max(found) + 1)) - found)
+            if missing:
+                gaps[self.templates[owner]].extend(missing)
+        return dict(gaps)
+
+
+    def duplicates(self) -> Dict[str, List[str]]:
+        """Version identifiers used by more than one version of the same template"""
+        seen = defaultdict(int)
+        for row in range(len(self)):
+            if self.numbers[row] < 0 and not self.bases[row]:
+                # Versions without identifier, such as new versions not deployed yet
+                continue
+            seen[(self.owners[row], self.bases[row], self.numbers[row])] += 1
+
+        duplicates = defaultdict(list)
+        for (owner, base, number), count in seen.items():
+            if count > 1:
+                duplicates[self.templates[owner]].append(base if number < 0 else f"{base}=_{number}")
+        return dict(duplicates)
+
+
+    def last_n(self, count: int, keep_active: bool = True) -> Dict[str, List[int]]:
+        """Positions of the versions to keep in every template that has more than count versions.
+
+        Like the last-n-versions command, the last versions in document order are kept. With
+        keep_active, the active version is kept too, so activeVersionIdentifier stays valid.
+        """
+        keep = {}
+        for owner, rows in self.rows_by_owner().items():
+            if len(rows) <= count:
+                continue
+
+            kept = set(rows[ -count : ]) if count > 0 else set()
+            active = self.active[owner]
+            if keep_active and active is not None:
+                kept.update(row for row in rows if self.identifier(row) == active)
+
+            if len(kept) < len(rows):
+                keep[self.templates[owner]] = sorted(self.positions[row] for row in kept)
+        return keep
+
+
+    def renumbered(self, order: List[int] = None) -> Dict[str, List[Tuple[int, str, str]]]:
+        """(position, versionIdentifier, new versionIdentifier) of every version of the templates to renumber.
+
+        Versions are taken in document order, or in the row order given, such as sort_order(), and
+        numbered =_1..=_N. Identifiers without a number are kept and take no number. Templates whose
+        versions keep their order and identifiers are left out.
+        """
+        rows_by_owner = defaultdict(list)
+        for row in (range(len(self)) if order is None else order):
+            rows_by_owner[self.owners[row]].append(row)
+
+        renames = {}
+        for owner, rows in rows_by_owner.items():
+            versions = []
+            changed = False
+            number = 0
+            for position, row in enumerate(rows):
+                identifier = new_identifier = self.identifier(row)
+                if self.numbers[row] >= 0:
+                    number += 1
+                    new_identifier = f"{self.bases[row]}=_{number}"
+                changed = changed or self.positions[row] != position or new_identifier != identifier
+                versions.append((self.positions[row], identifier, new_identifier))
+            if changed:
+                renames[self.templates[owner]] = versions
+        return renames
@@ -0,0 +1,100 @@
+# Standard Library imports
+from dataclasses import dataclass, field
+import logging
+import os
+import time
+from typing import Callable, Dict, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Update:
+    """A debounced burst of changes"""
+
+    changed: Set[str] = field(default_factory=set)
+    """Added or modified files"""
+
+    removed: Set[str] = field(default_factory=set)
+
+    detected: float = 0.0
+    """time.time() when the first change of the burst was seen"""
+
+    modified: float = 0.0
+    """Latest modification time of the changed files"""
+
+
+class DirectoryWatcher:
+    """Polls a directory for added, modified and removed metadata files.
+
+    A scan only stats the directory entries, so polling every few hundred milliseconds stays cheap
+    on large trees. Files are compared by modification time and size.
+    """
+
+    def __init__(self, source_dir: str, suffix: str = None, interval: float = 0.1, debounce: float = 0.15):
+        self.source_dir = source_dir
+        self.file_ending = f".{suffix}-meta.xml" if suffix else "-meta.xml"
+        self.interval = interval
+        self.debounce = debounce
+        self._state: Dict[str, Tuple[int, int]] = self.scan()
+
+
+    def scan(self) -> Dict[str, Tuple[int, int]]:
+        state = {}
+        for dir_path, dir_names, file_names in os.walk(self.source_dir):
+            for file_name in file_names:
+                if not file_name.endswith(self.file_ending):
+                    continue
+                file_path = os.path.join(dir_path, file_name)
+                try:
+                    stat = os.stat(file_path)
+                except FileNotFoundError:
+                    # Removed while scanning
+                    continue
+                state[file_path] = (stat.st_mtime_ns, stat.st_size)
+        return state
+
+
+    def poll(self) -> Tuple[Set[str], Set[str]]:
+        """Returns the files changed and removed since the previous poll"""
+        state = self.scan()
+        changed = { path for path, version in state.items() if self._state.get(path, None) != version }
+        removed = set(self._state) - set(state)
+        self._state = state
+        return changed, removed
+
+
+    def next_update(self, stop: Callable[[], bool] = lambda: False) -> Update:
+        """Waits for changes, then until no change was seen for debounce seconds.
+
+        Editors often write a file several times when saving; the burst is reported as one update.
+        Returns None when stop() becomes true while waiting for the first change.
+        """
+        update = None
+        quiet_since = None
+        while True:
+            changed, removed = self.poll()
+            now = time.time()
+
+            if changed or removed:
+                if update is None:
+                    update = Update(detected=now)
+                update.changed |= changed
+                update.changed -= removed
+                update.removed = (update.removed | removed) - changed
+                quiet_since = now
+            elif update is not None and now - quiet_since >= self.debounce:
+                break
+            elif update is None and stop():
+                return None
+
+            time.sleep(self.interval)
+
+        for path in update.changed:
+            try:
+                update.modified = max(update.modified, os.stat(path).st_mtime)
+            except FileNotFoundError:
+                pass
+
+        logger.debug(f"Update: {len(update.changed)} changed, {len(update.removed)} removed")
+        return update
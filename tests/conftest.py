@@ -0,0 +1,70 @@
+# Standard Library imports
+import os
+import sys
+
+# Third-party imports
+import pytest
+
+# The tests run against the source tree when the package is not installed
+src_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+if src_dir not in sys.path:
+    sys.path.insert(0, src_dir)
+
+templates_dir = os.path.join("force-app", "main", "default", "genAiPromptTemplates")
+
+
+def template_version_xml(name: str, number: int, status: str = "Published", lines: int = 5) -> str:
+    content = "\n".join(
+        f"Line {line} of {name} v{number} with &quot;quotes&quot; &amp; {{!$Input:Account.Name}} &lt;b&gt;"
+        for line in range(lines)
+    )
+    return f"""    <templateVersions>
+        <content>{content}</content>
+        <inputs>
+            <apiName>objectToSummarize</apiName>
+            <definition>SOBJECT://Account</definition>
+            <masterLabel>Object to Summarize</masterLabel>
+            <referenceName>Input:Account</referenceName>
+            <required>true</required>
+        </inputs>
+        <primaryModel>sfdc_ai__DefaultOpenAIGPT4OmniMini</primaryModel>
+        <status>{status}</status>
+        <versionIdentifier>{name}=_{number}</versionIdentifier>
+    </templateVersions>
+"""
+
+
+def template_xml(name: str, versions: int = 3, active: int = None, lines: int = 5) -> str:
+    """A GenAiPromptTemplate document, written the way XmlParser writes it"""
+    active = versions if active is None else active
+    body = "".join(
+        template_version_xml(name, number, "Published" if number <= active else "Draft", lines)
+        for number in range(1, versions + 1)
+    )
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+<GenAiPromptTemplate xmlns="http://soap.sforce.com/2006/04/metadata">
+    <activeVersionIdentifier>{name}=_{active}</activeVersionIdentifier>
+    <description>Summary template {name}</description>
+    <developerName>{name}</developerName>
+    <masterLabel>{name.replace("_", " ")}</masterLabel>
+{body}    <type>einstein_gpt__flex</type>
+    <visibility>Global</visibility>
+</GenAiPromptTemplate>
+"""
+
+
+def write_template(directory: str, name: str, **options) -> str:
+    path = os.path.join(directory, templates_dir, f"{name}.genAiPromptTemplate-meta.xml")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as xml_file:
+        xml_file.write(template_xml(name, **options))
+    return path
+
+
+@pytest.fixture
+def template_files(tmp_path) -> list:
+    """Templates of different sizes in a source tree layout"""
+    return [
+        write_template(str(tmp_path), f"Template_{index:04d}", versions=1 + index % 4, lines=3 + index)
+        for index in range(12)
+    ]
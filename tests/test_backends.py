@@ -0,0 +1,175 @@
+# Standard Library imports
+from collections.abc import MutableSequence
+from concurrent.futures import ThreadPoolExecutor
+from enum import Enum
+import io
+import os
+
+# Third-party imports
+import pytest
+
+# Project imports
+from salesforce_metadata_parser.metadata.base import XmlNode
+from salesforce_metadata_parser.parser.backends import LxmlBackend, backends, get_backend
+from salesforce_metadata_parser.parser.metadata_parser import XmlParser
+from salesforce_metadata_parser.parser.streaming import split_xml_file
+
+from .conftest import template_version_xml, template_xml
+
+installed_backends = [ name for name, backend in backends.items() if backend.available() ]
+
+requires_lxml = pytest.mark.skipif(not LxmlBackend.available(), reason="lxml is not installed")
+
+
+def _edge_cases_xml() -> str:
+    """Comments, processing instructions, empty and whitespace-only elements, references and undeclared tags"""
+    version = template_version_xml("Edge_Cases", 1).replace(
+        "<primaryModel>",
+        "<!-- model -->\n        <?review pending?>\n        <isStandard>false</isStandard>\n        <primaryModel>",
+    )
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+<!-- generated -->
+<GenAiPromptTemplate xmlns="http://soap.sforce.com/2006/04/metadata">
+    <activeVersion>1</activeVersion>
+    <activeVersionIdentifier>Edge_Cases=_1</activeVersionIdentifier>
+    <description>Café 日本 &apos;quoted&apos; &#160;nbsp&#13;
+second line</description>
+    <developerName>Edge_Cases</developerName>
+    <masterLabel></masterLabel>
+    <overrideSource/>
+    <relatedEntity>   </relatedEntity>
+    <relatedField>Account.Name</relatedField>
+{version}    <type>einstein_gpt__flex</type>
+    <unknownBlock>
+        <nested>
+            <value>deep</value>
+        </nested>
+        <empty/>
+    </unknownBlock>
+    <visibility>Global</visibility>
+</GenAiPromptTemplate>
+"""
+
+
+documents = {
+    "small": template_xml("Template_0001", versions=1, lines=1),
+    "history": template_xml("Template_0002", versions=6, active=4, lines=40),
+    "edge_cases": _edge_cases_xml(),
+    "untyped": _edge_cases_xml().replace("GenAiPromptTemplate", "Unregistered"),
+}
+
+
+def _tree(value):
+    """Types, field order and values of a parsed tree"""
+    if isinstance(value, XmlNode):
+        return (type(value).__name__, [ (name, _tree(item)) for name, item in vars(value).items() if name[0] != "_" ])
+    if isinstance(value, MutableSequence):
+        return [ _tree(item) for item in value ]
+    if isinstance(value, Enum):
+        return (type(value).__name__, value.value)
+    return None if value is None else str(value)
+
+
+def _outputs(parser: XmlParser, metadata) -> tuple:
+    stream = io.BytesIO()
+    parser.dump_stream(metadata, stream, buffer_size=100)
+    return parser.dump_string(metadata).encode("utf-8"), parser.dump_tree_string(metadata).encode("utf-8"), stream.getvalue()
+
+
+@pytest.fixture
+def document_files(tmp_path) -> dict:
+    files = {}
+    for name, xml in documents.items():
+        files[name] = str(tmp_path / f"{name}.genAiPromptTemplate-meta.xml")
+        with open(files[name], "w", encoding="utf-8") as xml_file:
+            xml_file.write(xml)
+    return files
+
+
+@pytest.mark.parametrize("document", list(documents))
+@pytest.mark.parametrize("lazy_text", [ None, "memory" ])
+def test_backends_build_the_same_trees_and_bytes(document_files, document, lazy_text):
+    results = {}
+    for backend in installed_backends:
+        parser = XmlParser(backend=backend, lazy_text=lazy_text, lazy_text_min_size=16)
+        metadata = parser.parse_file(document_files[document])
+        # Written before the tree is read, lazy values are copied as they are
+        outputs = _outputs(parser, metadata)
+        results[backend] = (metadata._TypeName, _tree(metadata), metadata._fingerprint(), outputs)
+
+        # Every writer of a backend produces the same bytes
+        assert len(set(outputs)) == 1, backend
+
+    reference = results[installed_backends[0]]
+    for backend, result in results.items():
+        assert result == reference, backend
+
+
+def test_backends_write_the_same_split_files(tmp_path, document_files):
+    outputs = {}
+    for backend in installed_backends:
+        target_dir = tmp_path / backend
+        os.makedirs(target_dir)
+
+        def target_path(metadata) -> str:
+            return str(target_dir / f"{metadata.templateVersions[0].versionIdentifier}.xml")
+
+        written = split_xml_file(document_files["history"], "templateVersions", target_path, XmlParser(backend=backend))
+        outputs[backend] = { os.path.basename(file_path): open(file_path, "rb").read() for file_path in written }
+
+    reference = outputs[installed_backends[0]]
+    assert len(reference) == 6
+    for backend, files in outputs.items():
+        assert files == reference, backend
+
+
+@requires_lxml
+def test_lxml_parsers_are_not_shared_between_threads():
+    backend = LxmlBackend()
+    parser = backend.parser
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        other = executor.submit(lambda: backend.parser).result()
+
+    assert backend.parser is parser
+    assert other is not parser
+
+
+@requires_lxml
+def test_lxml_keeps_the_parser_limits_unless_asked():
+    from lxml import etree
+
+    # Larger than the 10 MB text limit of libxml2
+    xml = template_xml("Large_Text").replace("<description>", "<description>" + "x" * 10_000_001)
+
+    with pytest.raises(etree.XMLSyntaxError):
+        XmlParser(backend="lxml").parse_string(xml)
+
+    metadata = XmlParser(backend=LxmlBackend(huge_tree=True)).parse_string(xml)
+    assert len(metadata.description) > 10_000_000
+
+
+@requires_lxml
+def test_lxml_does_not_read_external_entities(tmp_path):
+    secret_file = tmp_path / "secret.txt"
+    secret_file.write_text("secret", encoding="utf-8")
+    xml = template_xml("External_Entity").replace(
+        "<GenAiPromptTemplate ", f'<!DOCTYPE GenAiPromptTemplate [ <!ENTITY secret SYSTEM "{secret_file.as_uri()}"> ]>\n<GenAiPromptTemplate ', 1
+    ).replace("<description>", "<description>&secret;", 1)
+    xml_file = tmp_path / "External_Entity.genAiPromptTemplate-meta.xml"
+    xml_file.write_text(xml, encoding="utf-8")
+
+    with pytest.raises(ValueError, match="entities"):
+        XmlParser(backend="lxml").parse_file(str(xml_file))
+    with pytest.raises(ValueError, match="entities"):
+        split_xml_file(str(xml_file), "templateVersions", lambda metadata: str(tmp_path / "version.xml"), XmlParser(backend="lxml"))
+    assert not (tmp_path / "version.xml").exists()
+
+
+def test_named_backends_are_created_once():
+    for name in installed_backends:
+        assert get_backend(name) is get_backend(name)
+        assert XmlParser(backend=name).backend is XmlParser(backend=name).backend
+
+    backend = get_backend(installed_backends[0]).__class__()
+    assert XmlParser(backend=backend).backend is backend
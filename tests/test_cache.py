@@ -0,0 +1,115 @@
+# Standard Library imports
+import os
+
+# Third-party imports
+import pytest
+
+# Project imports
+from salesforce_metadata_parser.parser.cache import ParseCache, default_max_entries
+from salesforce_metadata_parser.parser.metadata_parser import XmlParser
+
+from .conftest import write_template
+
+
+@pytest.fixture
+def loads():
+    """Loader that records the files it parses"""
+    parsed = []
+
+    def loader(file_path):
+        parsed.append(os.path.basename(file_path))
+        return XmlParser().parse_file(file_path)
+
+    loader.parsed = parsed
+    return loader
+
+
+def test_a_disabled_cache_only_calls_the_loader(tmp_path, loads):
+    source_file = write_template(str(tmp_path), "Template_0001")
+    cache = ParseCache()
+
+    assert not cache.enabled
+    cache.load(source_file, loads)
+    cache.load(source_file, loads)
+
+    assert len(loads.parsed) == 2
+    assert cache.report() == { "entries": 0, "bytes": 0, "hits": 0, "misses": 0, "evictions": 0 }
+
+
+def test_hits_return_independent_copies(tmp_path, loads):
+    source_file = write_template(str(tmp_path), "Template_0001")
+    cache = ParseCache(max_entries=4, max_bytes=1024 * 1024)
+
+    first = cache.load(source_file, loads)
+    first.description = "changed"
+    second = cache.load(source_file, loads)
+
+    assert len(loads.parsed) == 1
+    assert second.description != "changed"
+    assert second is not cache.load(source_file, loads)
+    report = cache.report()
+    assert (report["hits"], report["misses"], report["entries"]) == (2, 1, 1)
+    assert report["bytes"] > 0
+
+
+def test_changed_files_and_other_options_are_parsed_again(tmp_path, loads):
+    source_file = write_template(str(tmp_path), "Template_0001")
+    cache = ParseCache(max_entries=4, max_bytes=1024 * 1024)
+
+    cache.load(source_file, loads)
+    cache.load(source_file, loads, options=(True, ))
+    write_template(str(tmp_path), "Template_0001", versions=2)
+    stat = os.stat(source_file)
+    os.utime(source_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert len(cache.load(source_file, loads).templateVersions) == 2
+
+    assert len(loads.parsed) == 3
+    report = cache.report()
+    assert (report["hits"], report["misses"], report["entries"]) == (0, 3, 2)
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, loads):
+    files = [ write_template(str(tmp_path), f"Template_{index:04d}") for index in range(3) ]
+    cache = ParseCache(max_entries=2, max_bytes=1024 * 1024)
+
+    cache.load(files[0], loads)
+    cache.load(files[1], loads)
+    cache.load(files[0], loads)
+    cache.load(files[2], loads)
+
+    assert cache.report()["evictions"] == 1
+    cache.load(files[0], loads)
+    cache.load(files[1], loads)
+    assert loads.parsed == [ os.path.basename(files[index]) for index in (0, 1, 2, 1) ]
+
+
+def test_size_limit_evicts_and_skips_large_documents(tmp_path, loads):
+    small = write_template(str(tmp_path), "Template_0001")
+    large = write_template(str(tmp_path), "Template_0002", versions=20, lines=200)
+    cache = ParseCache(max_entries=8, max_bytes=1024 * 1024)
+    cache.load(small, loads)
+    size = cache.report()["bytes"]
+
+    cache.configure(max_bytes=size * 2)
+    cache.load(large, loads)
+    cache.load(small, loads)
+    assert cache.report()["entries"] == 1
+    assert cache.report()["hits"] == 1
+
+    cache.configure(max_bytes=size - 1)
+    assert cache.report()["entries"] == 0
+    assert cache.report()["evictions"] == 1
+
+
+def test_enable_restores_the_previous_limits(tmp_path, loads):
+    source_file = write_template(str(tmp_path), "Template_0001")
+    cache = ParseCache()
+
+    with cache.enable(max_bytes=1024 * 1024):
+        assert cache.max_entries == default_max_entries
+        cache.load(source_file, loads)
+        cache.load(source_file, loads)
+
+    assert len(loads.parsed) == 1
+    assert not cache.enabled
+    assert cache.report()["entries"] == 0
@@ -0,0 +1,100 @@
+# Standard Library imports
+from xml.etree import ElementTree
+
+# Third-party imports
+from click.testing import CliRunner
+
+# Project imports
+from salesforce_metadata_parser.cli import genAiPromptTemplate as prompt_template_cli
+from salesforce_metadata_parser.cli.genAiPromptTemplate import PromptTemplateHelper
+from salesforce_metadata_parser.cli.main import cli
+from salesforce_metadata_parser.metadata.history import VersionHistory
+from salesforce_metadata_parser.parser.metadata_parser import XmlParser
+
+from .conftest import write_template
+
+
+def test_save_prompt_to_stdout_writes_only_the_document(tmp_path):
+    source_file = write_template(str(tmp_path), "Template_0001")
+
+    result = CliRunner().invoke(cli, [ "prompt-template", "load-prompt", "--source-file", source_file, "save-prompt", "--target-file", "-" ])
+
+    assert result.exit_code == 0, result.output
+    assert ElementTree.fromstring(result.stdout_bytes).tag.endswith("GenAiPromptTemplate")
+    assert result.stdout_bytes == XmlParser.to_xml_string(XmlParser.from_xml_file(source_file)).encode("utf-8")
+    assert "Parsing metadata file" in result.stderr
+
+
+def test_cached_templates_are_kept_apart_by_compact_history(tmp_path):
+    source_file = write_template(str(tmp_path), "Template_0001", versions=4)
+
+    with PromptTemplateHelper.cache.enable() as cache:
+        misses = cache.report()["misses"]
+        compact = PromptTemplateHelper.load_prompt_from_file(source_file, compact_history=True)
+        plain = PromptTemplateHelper.load_prompt_from_file(source_file)
+
+        assert type(compact.templateVersions) is VersionHistory
+        assert type(plain.templateVersions) is not VersionHistory
+        assert cache.report()["misses"] == misses + 2
+        assert type(PromptTemplateHelper.load_prompt_from_file(source_file, compact_history=True).templateVersions) is VersionHistory
+        assert cache.report()["entries"] == 2
+
+
+def test_one_shot_commands_do_not_cache(tmp_path):
+    source_file = write_template(str(tmp_path), "Template_0001")
+
+    result = CliRunner().invoke(cli, [ "prompt-template", "load-prompt", "--source-file", source_file, "save-prompt", "--target-file", "-" ])
+
+    assert result.exit_code == 0, result.output
+    assert not PromptTemplateHelper.cache.enabled
+    assert PromptTemplateHelper.cache.report()["entries"] == 0
+
+
+def test_batch_chains_keep_their_own_compact_history(tmp_path, monkeypatch):
+    parsed = []
+
+    class RecordingParser(XmlParser):
+        def parse_file(self, xml_file_path):
+            parsed.append((xml_file_path, self.compact_history))
+            return super().parse_file(xml_file_path)
+
+    monkeypatch.setattr(prompt_template_cli, "XmlParser", RecordingParser)
+
+    chains = []
+    expected = set()
+    for index in range(8):
+        source_file = write_template(str(tmp_path), f"Template_{index:04d}", versions=3)
+        compact = index % 2 == 0
+        chains.append(f"{'--compact-history ' if compact else ''}load-prompt --source-file {source_file}")
+        expected.add((source_file, compact))
+    script_file = tmp_path / "chains.txt"
+    script_file.write_text("\n".join(chains) + "\n", encoding="utf-8")
+
+    result = CliRunner().invoke(cli, [ "prompt-template", "batch", "--script", str(script_file), "--jobs", "4" ])
+    assert result.exit_code == 0, result.output
+    assert set(parsed) == expected
+
+    # Chains without the option inherit it from the outer command
+    parsed.clear()
+    result = CliRunner().invoke(cli, [ "prompt-template", "--compact-history", "batch", "--script", str(script_file), "--jobs", "4" ])
+    assert result.exit_code == 0, result.output
+    assert set(parsed) == { (source_file, True) for source_file, _ in expected }
+
+
+def test_failing_batch_chains_do_not_stop_the_others(tmp_path):
+    chains = []
+    for index in range(4):
+        source_file = write_template(str(tmp_path), f"Template_{index:04d}")
+        if index == 2:
+            source_file = str(tmp_path / "Missing.genAiPromptTemplate-meta.xml")
+        chains.append(f"load-prompt --source-file {source_file} save-prompt --target-file {tmp_path / f'out_{index}.xml'}")
+    script_file = tmp_path / "chains.txt"
+    script_file.write_text("\n".join(chains) + "\n", encoding="utf-8")
+
+    result = CliRunner().invoke(cli, [ "prompt-template", "batch", "--script", str(script_file), "--jobs", "2" ])
+
+    assert result.exit_code == 1
+    assert "[line 3] failed" in result.stderr
+    assert "4 chains: 3 ok, 1 failed" in result.stderr
+    assert "1 command chains failed" in result.stderr
+    assert sorted(path.name for path in tmp_path.glob("out_*.xml")) == [ "out_0.xml", "out_1.xml", "out_3.xml" ]
@@ -0,0 +1,90 @@
+# Standard Library imports
+import json
+import os
+
+# Third-party imports
+import pytest
+
+# Project imports
+from salesforce_metadata_parser.parser.directory import merge_results, process_files
+from salesforce_metadata_parser.parser.manifest import Manifest, relative_path, task_key
+from salesforce_metadata_parser.parser.shards import load_timings
+
+
+@pytest.fixture
+def in_tmp_path(tmp_path):
+    # Manifest and result keys are relative to the working directory
+    cwd = os.getcwd()
+    os.chdir(tmp_path)
+    yield tmp_path
+    os.chdir(cwd)
+
+
+def _count_lines(file_path: str) -> dict:
+    with open(file_path, "r", encoding="utf-8") as xml_file:
+        return { "lines": len(xml_file.readlines()) }
+
+
+def _list_tags(file_path: str) -> dict:
+    return { "tags": [] }
+
+
+def test_failed_files_are_recorded_and_the_others_kept(in_tmp_path, template_files):
+    broken = template_files[3]
+    manifest_file = str(in_tmp_path / "manifest.json")
+
+    def task(file_path: str) -> dict:
+        if file_path == broken:
+            raise ValueError("malformed")
+        return _count_lines(file_path)
+
+    document = process_files(template_files, task, max_workers=4, manifest=Manifest.load(manifest_file, "count"))
+
+    assert document["errors"] == { relative_path(broken): "ValueError: malformed" }
+    assert document["results"][relative_path(broken)] is None
+    assert document["metrics"]["failed"] == 1
+    assert all(document["results"][relative_path(file_path)] for file_path in template_files if file_path != broken)
+
+    # Every other result was saved, the failed file is processed again
+    document = process_files(template_files, _count_lines, manifest=Manifest.load(manifest_file, "count"))
+    assert document["metrics"]["processed"] == 1
+    assert document["errors"] == {}
+
+
+def test_manifest_entries_are_scoped_by_task(in_tmp_path, template_files):
+    manifest_file = str(in_tmp_path / "manifest.json")
+
+    first = process_files(template_files, _count_lines, manifest=Manifest.load(manifest_file, "count"))
+    other = process_files(template_files, _list_tags, manifest=Manifest.load(manifest_file, "tags"))
+
+    # Results of another task are never reused
+    assert other["metrics"]["processed"] == len(template_files)
+    assert all(result == { "tags": [] } for result in other["results"].values())
+
+    again = process_files(template_files, _count_lines, manifest=Manifest.load(manifest_file, "count"))
+    assert again["metrics"]["reused"] == len(template_files)
+    assert again["results"] == first["results"]
+
+    with open(manifest_file, "r", encoding="utf-8") as content:
+        assert sorted(json.load(content)["tasks"]) == [ "count", "tags" ]
+    assert set(load_timings(manifest_file, "tags")) == set(first["results"])
+
+
+def test_task_key_includes_options():
+    assert task_key("prompt-template.export") == "prompt-template.export"
+    assert task_key("prompt-template.export", target_dir="out", format="csv") == "prompt-template.export(format=csv, target_dir=out)"
+
+
+def test_merge_results_keeps_errors():
+    documents = [
+        { "results": { "a": 1 }, "errors": {}, "skipped": [ "c", "d" ], "metrics": { "processed": 1, "failed": 0, "elapsed": 1.0, "shard": "1/2" } },
+        { "results": { "b": None, "c": 2 }, "errors": { "b": "ValueError: malformed" }, "skipped": [ "d" ], "metrics": { "processed": 1, "failed": 1, "elapsed": 2.0, "shard": "2/2" } },
+    ]
+
+    merged = merge_results(documents)
+
+    assert merged["errors"] == { "b": "ValueError: malformed" }
+    # Skipped by one shard, processed by another
+    assert merged["skipped"] == [ "d" ]
+    assert merged["metrics"]["failed"] == 1
+    assert merged["metrics"]["elapsed"] == 2.0
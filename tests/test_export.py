@@ -0,0 +1,55 @@
+# Standard Library imports
+import json
+import subprocess
+
+# Third-party imports
+from click.testing import CliRunner
+import pytest
+
+# Project imports
+from salesforce_metadata_parser.cli.main import cli
+
+from .conftest import templates_dir, write_template
+
+
+@pytest.fixture
+def git_repo(tmp_path, monkeypatch):
+    """Four committed templates, in the working directory"""
+    monkeypatch.chdir(tmp_path)
+    for index in range(4):
+        write_template(str(tmp_path), f"Template_{index:04d}", versions=2)
+    for command in (
+        [ "git", "init", "-q" ],
+        [ "git", "add", "." ],
+        [ "git", "-c", "user.name=test", "-c", "user.email=test@example.com", "commit", "-q", "-m", "templates" ],
+    ):
+        subprocess.run(command, check=True)
+    return tmp_path
+
+
+def _export(*args) -> dict:
+    result = CliRunner().invoke(cli, [ "prompt-template", "export", "--source-dir", templates_dir, "--target-dir", "out", *args ])
+    assert result.exit_code == 0, result.output
+    with open("out/templates.jsonl", "r", encoding="utf-8") as table_file:
+        return { row["developerName"]: row for row in map(json.loads, table_file) }
+
+
+def test_changed_since_without_manifest_keeps_the_unchanged_rows(git_repo):
+    before = _export()
+    write_template(str(git_repo), "Template_0002", versions=3)
+
+    after = _export("--changed-since", "HEAD")
+
+    assert sorted(after) == sorted(before) == [ f"Template_{index:04d}" for index in range(4) ]
+    assert after["Template_0002"]["versionCount"] == 3
+    assert { name: row for name, row in after.items() if name != "Template_0002" } == {
+        name: row for name, row in before.items() if name != "Template_0002"
+    }
+
+
+def test_changed_since_without_previous_export_processes_every_file(git_repo):
+    write_template(str(git_repo), "Template_0002", versions=3)
+
+    rows = _export("--changed-since", "HEAD")
+
+    assert len(rows) == 4
@@ -0,0 +1,167 @@
+# Standard Library imports
+import copy
+import pickle
+
+# Third-party imports
+import pytest
+
+# Project imports
+from salesforce_metadata_parser.metadata.base import NodeList, copy_node, fingerprint
+from salesforce_metadata_parser.metadata.history import VersionHistory
+from salesforce_metadata_parser.parser.diff import diff
+from salesforce_metadata_parser.parser.metadata_parser import XmlParser
+
+from .conftest import template_xml
+
+
+def _uncached(metadata):
+    """Fingerprint computed from scratch: pickled copies leave the cache behind"""
+    return fingerprint(pickle.loads(pickle.dumps(metadata)))
+
+
+@pytest.fixture(params=[ False, True ], ids=[ "list", "history" ])
+def template(request):
+    metadata = XmlParser(compact_history=request.param).parse_string(template_xml("Template_0001", versions=4))
+    fingerprint(metadata)
+    return metadata
+
+
+def test_cached_digest_is_trusted(template):
+    assert "_fingerprint_cache" in template.__dict__
+    assert fingerprint(template) == _uncached(template)
+
+
+def test_assigning_a_nested_field_invalidates_ancestors(template):
+    before = fingerprint(template)
+    template.templateVersions[-1].inputs[0].apiName = "other"
+
+    assert fingerprint(template) != before
+    assert fingerprint(template) == _uncached(template)
+
+
+def test_changing_a_list_in_place_invalidates_its_node(template):
+    before = fingerprint(template)
+    inputs = template.templateVersions[-1].inputs
+    inputs.append(copy_node(inputs[0]))
+    assert fingerprint(template) != before
+    assert fingerprint(template) == _uncached(template)
+
+    inputs.pop()
+    assert fingerprint(template) == before
+
+
+def test_changing_the_versions_invalidates_the_root(template):
+    before = fingerprint(template)
+    versions = template.templateVersions
+    versions.append(copy_node(versions[-1]))
+    assert fingerprint(template) == _uncached(template) != before
+
+    del versions[0]
+    assert fingerprint(template) == _uncached(template)
+
+    older = versions[0]
+    older.status = "Draft"
+    versions[0] = older
+    assert fingerprint(template) == _uncached(template)
+
+
+def test_assigned_lists_are_tracked(template):
+    version = template.templateVersions[-1]
+    template.templateVersions = [ version ]
+    assert type(template.templateVersions) is NodeList
+    fingerprint(template)
+
+    version.status = "Draft"
+    assert fingerprint(template) == _uncached(template)
+
+
+def test_untracked_lists_are_hashed_every_time():
+    template = XmlParser().parse_string(template_xml("Template_0001"))
+    version = template.templateVersions[-1]
+    inputs = list(version.inputs)
+    version.__dict__["inputs"] = inputs
+    fingerprint(template)
+    assert "_fingerprint_cache" not in template.__dict__
+
+    inputs.append(copy_node(inputs[0]))
+    assert fingerprint(template) == _uncached(template)
+
+
+def test_shared_nodes_invalidate_every_tree(template):
+    other = copy.deepcopy(template)
+    shared = template.templateVersions[-1]
+    other.templateVersions[-1] = shared
+    assert fingerprint(other) == fingerprint(template)
+
+    shared.status = "Draft"
+    assert fingerprint(template) == _uncached(template)
+    assert fingerprint(other) == _uncached(other)
+    assert fingerprint(other) == fingerprint(template)
+
+
+@pytest.mark.parametrize("duplicate", [ copy.deepcopy, copy_node, lambda node: pickle.loads(pickle.dumps(node)) ])
+def test_copies_are_invalidated_independently(template, duplicate):
+    before = fingerprint(template)
+    other = duplicate(template)
+    assert fingerprint(other) == before
+
+    other.templateVersions[-1].status = "Draft"
+    assert fingerprint(template) == before
+    assert fingerprint(other) == _uncached(other) != before
+
+
+def test_diff_after_a_change(template):
+    other = copy.deepcopy(template)
+    fingerprint(other)
+    other.templateVersions[1].status = "Draft"
+
+    changes = diff(template, other)
+
+    assert [ (change.path, change.kind, change.new) for change in changes ] == [ ("templateVersions[1].status", "changed", "Draft") ]
+
+
+def test_changes_to_older_versions_are_kept(template):
+    before = fingerprint(template)
+    template.templateVersions[1].status = "Draft"
+    template.templateVersions[0].inputs[0].apiName = "other"
+    template.templateVersions[2].inputs.append(copy_node(template.templateVersions[3].inputs[0]))
+
+    assert fingerprint(template) != before
+    assert fingerprint(template) == _uncached(template)
+    versions = list(pickle.loads(pickle.dumps(template)).templateVersions)
+    assert versions[1].status == "Draft"
+    assert versions[0].inputs[0].apiName == "other"
+    assert len(versions[2].inputs) == 2
+
+
+def test_older_versions_are_the_same_nodes_while_referenced(template):
+    versions = template.templateVersions
+    version = versions[1]
+    assert versions[1] is version
+    assert list(versions)[1] is version
+
+    versions.insert(0, copy_node(versions[0]))
+    version.status = "Draft"
+    assert versions[2] is version
+    assert [ getattr(item.status, "value", item.status) for item in versions ].count("Draft") == 1
+
+    del versions[0]
+    version.status = "Published"
+    assert versions[1].status == "Published"
+    assert fingerprint(template) == _uncached(template)
+
+
+def test_diff_of_histories_rebuilds_only_the_changed_versions(monkeypatch):
+    old = XmlParser(compact_history=True).parse_string(template_xml("Template_0001", versions=30))
+    new = copy.deepcopy(old)
+    new.templateVersions[10].status = "Draft"
+    fingerprint(old)
+    fingerprint(new)
+
+    rebuilt = []
+    rebuild = VersionHistory._version
+    monkeypatch.setattr(VersionHistory, "_version", lambda self, index, values: rebuilt.append(index) or rebuild(self, index, values))
+    changes = diff(old, new)
+
+    assert [ (change.path, change.kind, change.new) for change in changes ] == [ ("templateVersions[10].status", "changed", "Draft") ]
+    assert rebuilt and set(rebuilt) == { 10 }
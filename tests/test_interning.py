@@ -0,0 +1,91 @@
+# Standard Library imports
+import sys
+
+# Third-party imports
+from click.testing import CliRunner
+
+# Project imports
+from salesforce_metadata_parser.cli import metadata as metadata_cli
+from salesforce_metadata_parser.cli.main import cli
+from salesforce_metadata_parser.parser.interning import StringPool
+from salesforce_metadata_parser.parser.metadata_parser import XmlParser
+
+from .conftest import template_xml, write_template
+
+
+def _copy(value: str) -> str:
+    """Same content in a new str instance"""
+    return "".join(list(value))
+
+
+def test_short_values_are_interned():
+    pool = StringPool(intern_max_length=8)
+    value = _copy("Draft")
+
+    assert pool.intern(value) is sys.intern("Draft")
+    assert pool.report()["held_values"] == 0
+
+
+def test_identical_large_values_share_one_instance():
+    pool = StringPool(intern_max_length=8)
+    first = _copy("x" * 100)
+    second = _copy("x" * 100)
+
+    assert pool.intern(first) is first
+    assert pool.intern(second) is first
+    assert pool.intern(_copy("y" * 100)) is not first
+
+    report = pool.report()
+    assert (report["lookups"], report["duplicates"], report["held_values"]) == (3, 1, 2)
+    assert report["bytes_saved"] == sys.getsizeof(second)
+    assert report["held_bytes"] == sys.getsizeof(first) * 2
+
+
+def test_a_full_store_returns_new_values_as_they_are():
+    value = _copy("x" * 100)
+    pool = StringPool(intern_max_length=8, max_held_bytes=sys.getsizeof(value))
+
+    assert pool.intern(value) is value
+    other = _copy("y" * 100)
+    assert pool.intern(other) is other
+    assert pool.intern(_copy("y" * 100)) is not other
+    assert pool.intern(_copy("x" * 100)) is value
+    assert pool.report()["held_values"] == 1
+
+    pool.clear()
+    assert pool.report() == { "lookups": 0, "duplicates": 0, "bytes_saved": 0, "held_values": 0, "held_bytes": 0 }
+
+
+def test_parsers_share_the_values_of_their_pool():
+    pool = StringPool()
+    xml = template_xml("Template_0001", lines=10)
+
+    first = XmlParser(string_pool=pool).parse_string(xml)
+    second = XmlParser(string_pool=pool).parse_string(xml)
+    plain = XmlParser().parse_string(xml)
+
+    assert second.templateVersions[0].content is first.templateVersions[0].content
+    assert plain.templateVersions[0].content is not first.templateVersions[0].content
+    assert plain.templateVersions[0].content == first.templateVersions[0].content
+
+
+def test_every_parse_dir_run_has_its_own_pool(tmp_path, monkeypatch):
+    pools = []
+
+    class RecordingPool(StringPool):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            pools.append(self)
+
+    monkeypatch.setattr(metadata_cli, "StringPool", RecordingPool)
+    for index in range(3):
+        write_template(str(tmp_path), f"Template_{index:04d}", lines=10)
+    args = [ "metadata", "parse-dir", "--source-dir", str(tmp_path) ]
+
+    for _ in range(2):
+        result = CliRunner().invoke(cli, args)
+        assert result.exit_code == 0, result.output
+        assert "pool holds 9 distinct large values" in result.stderr
+
+    assert len(pools) == 2
+    assert [ pool.report()["held_values"] for pool in pools ] == [ 9, 9 ]
@@ -0,0 +1,77 @@
+# Standard Library imports
+import time
+import tracemalloc
+
+# Third-party imports
+from click.testing import CliRunner
+import pytest
+
+# Project imports
+from salesforce_metadata_parser.cli.main import cli
+from salesforce_metadata_parser.parser.memory import MemoryLimitExceeded, MemoryTracker, parse_size
+
+from .conftest import write_template
+
+
+@pytest.mark.parametrize("size, expected", [
+    ("1048576", 1048576),
+    ("512M", 512 * 1024 ** 2),
+    ("1.5G", int(1.5 * 1024 ** 3)),
+    ("64 KiB", 64 * 1024),
+    ("2mb", 2 * 1024 ** 2),
+])
+def test_parse_size(size, expected):
+    assert parse_size(size) == expected
+
+
+@pytest.mark.parametrize("size", [ "", "M", "-1M", "12X", "1.5.2G" ])
+def test_parse_size_rejects_invalid_sizes(size):
+    with pytest.raises(ValueError, match="Invalid size"):
+        parse_size(size)
+
+
+def test_the_watchdog_aborts_the_section_over_the_limit():
+    tracker = MemoryTracker(max_memory=1024 ** 2, interval=0.01)
+    try:
+        with pytest.raises(MemoryLimitExceeded, match="large-section"):
+            with tracker.measure("large-section"):
+                held = [ bytearray(1024) for _ in range(4096) ]
+                deadline = time.monotonic() + 5
+                while time.monotonic() < deadline:
+                    time.sleep(0.01)
+        assert len(held) == 4096
+    finally:
+        tracker.stop()
+
+    assert "limit 1.0 MiB" in tracker.exceeded
+    assert [ record.label for record in tracker.records ] == [ "large-section" ]
+    assert not tracemalloc.is_tracing()
+
+
+def test_sections_under_the_limit_are_recorded():
+    tracker = MemoryTracker(max_memory=1024 ** 3, interval=0.01)
+    try:
+        with tracker.measure("outer"):
+            with tracker.measure("inner"):
+                held = [ bytearray(1024) for _ in range(1024) ]
+    finally:
+        tracker.stop()
+
+    assert tracker.exceeded is None
+    records = { record["label"]: record for record in tracker.report() }
+    assert records["inner"]["peak_bytes"] >= 1024 ** 2
+    assert records["outer"]["peak_bytes"] >= records["inner"]["peak_bytes"]
+    assert len(held) == 1024
+
+
+def test_max_memory_option(tmp_path):
+    source_file = write_template(str(tmp_path), "Template_0001")
+
+    result = CliRunner().invoke(cli, [ "prompt-template", "--max-memory", "lots", "load-prompt", "--source-file", source_file ])
+    assert result.exit_code == 2
+    assert "Invalid size: lots" in result.stderr
+
+    result = CliRunner().invoke(cli, [ "prompt-template", "--max-memory", "1G", "--memory-report", "load-prompt", "--source-file", source_file ])
+    assert result.exit_code == 0, result.output
+    assert "Memory [load-prompt]" in result.stderr
+    assert not tracemalloc.is_tracing()
@@ -0,0 +1,97 @@
+# Standard Library imports
+import os
+import stat
+
+# Third-party imports
+import pytest
+
+# Project imports
+from salesforce_metadata_parser.metadata.base import XmlNode
+from salesforce_metadata_parser.metadata.genaiprompttemplate import GenAiPromptTemplate, GenAiPromptTemplateStatus, GenAiPromptTemplateType
+from salesforce_metadata_parser.parser import metadata_parser
+from salesforce_metadata_parser.parser.metadata_parser import XmlParser
+from salesforce_metadata_parser.parser.plans import ENUM, LIST, NODE, TEXT, plan_for
+
+from .conftest import template_xml
+
+
+def _with_undeclared_tags(xml: str) -> str:
+    """Adds elements the dataclasses do not declare, between declared ones"""
+    xml = xml.replace("<activeVersionIdentifier>", "<activeVersion>3</activeVersion>\n    <activeVersionIdentifier>")
+    xml = xml.replace("        <primaryModel>", "        <isStandard>false</isStandard>\n        <primaryModel>")
+    return xml.replace("        <status>", "        <versionNumber>1</versionNumber>\n        <status>")
+
+
+def test_undeclared_elements_keep_their_position():
+    xml = _with_undeclared_tags(template_xml("Template_0001"))
+    parser = XmlParser()
+
+    metadata = parser.parse_string(xml)
+
+    assert parser.dump_string(metadata) == xml
+    assert XmlParser.to_xml_string(metadata) == xml
+    version = metadata.templateVersions[0]
+    # Fields missing from the document follow the ones that were found
+    assert [ name for name in vars(version) if name[0] != "_" ][ : 7] == [
+        "content", "inputs", "isStandard", "primaryModel", "versionNumber", "status", "versionIdentifier",
+    ]
+
+
+def test_untyped_documents_keep_their_order():
+    xml = _with_undeclared_tags(template_xml("Template_0001")).replace("GenAiPromptTemplate", "Unregistered")
+
+    metadata = XmlParser().parse_string(xml)
+
+    assert type(metadata.templateVersions[0]) is XmlNode
+    assert XmlParser().dump_string(metadata) == xml
+
+
+@pytest.fixture
+def umask_027():
+    previous = os.umask(0o027)
+    yield 0o027
+    os.umask(previous)
+
+
+def test_new_files_get_the_usual_permissions(tmp_path, umask_027):
+    parser = XmlParser()
+    metadata = parser.parse_string(template_xml("Template_0001"))
+    existing = tmp_path / "existing.xml"
+    existing.write_text("")
+    os.chmod(existing, 0o604)
+
+    parser.dump_file(metadata, str(tmp_path / "new.xml"))
+    parser.dump_file(metadata, str(existing))
+
+    assert stat.S_IMODE(os.stat(tmp_path / "new.xml").st_mode) == 0o640
+    assert stat.S_IMODE(os.stat(existing).st_mode) == 0o604
+
+
+def test_umask_is_read_without_proc(tmp_path, monkeypatch, umask_027):
+    def no_proc(path, *args, **kwargs):
+        raise FileNotFoundError(path)
+
+    monkeypatch.setattr(metadata_parser, "open", no_proc, raising=False)
+
+    # A probe file only shows the read and write bits
+    assert metadata_parser._current_umask(str(tmp_path)) == 0o027 & 0o666
+    assert os.listdir(tmp_path) == []
+
+
+def test_plans_declare_the_kinds_of_fields_and_items():
+    fields = plan_for(GenAiPromptTemplate).fields
+
+    assert (fields["description"].kind, fields["type"].kind) == (TEXT, ENUM)
+    assert (fields["templateVersions"].kind, fields["templateVersions"].item_kind) == (LIST, NODE)
+
+
+def test_values_of_another_type_than_declared_are_written():
+    parser = XmlParser()
+    xml = template_xml("Template_0001").replace("<description>Summary template Template_0001</description>", "<description/>")
+    metadata = parser.parse_string(xml)
+    assert isinstance(metadata.description, list)
+
+    metadata.type = GenAiPromptTemplateType.FLEX
+    metadata.templateVersions[0].status = GenAiPromptTemplateStatus.PUBLISHED
+
+    assert parser.dump_string(metadata) == parser.dump_tree_string(metadata) == xml
@@ -0,0 +1,58 @@
+# Standard Library imports
+import os
+import re
+import subprocess
+import sys
+
+# Project imports
+from salesforce_metadata_parser.metadata.registry import TypeRegistry
+from salesforce_metadata_parser.parser.metadata_parser import XmlParser
+
+from .conftest import src_dir, template_xml
+
+# Cumulative import time of the CLI, click included. Registered types must not add to it.
+import_budget_ms = 1000
+
+
+def _import_time_ms(module: str) -> float:
+    """Cumulative time reported by python -X importtime for a module imported in a new interpreter"""
+    completed = subprocess.run(
+        [ sys.executable, "-X", "importtime", "-c", f"import {module}" ],
+        env={ **os.environ, "PYTHONPATH": src_dir },
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    m = re.search(rf"^import time:\s+\d+ \|\s+(\d+) \| {re.escape(module)}$", completed.stderr, re.MULTILINE)
+    assert m, completed.stderr
+    return int(m.group(1)) / 1000
+
+
+def test_cli_import_time_is_within_budget():
+    # Best of a few runs, a single slow start of the interpreter is not a regression
+    elapsed = min(_import_time_ms("salesforce_metadata_parser.cli.main") for _ in range(3))
+
+    assert elapsed < import_budget_ms
+
+
+def test_parser_does_not_import_registered_types():
+    completed = subprocess.run(
+        [ sys.executable, "-c", "import sys, salesforce_metadata_parser.parser.metadata_parser; print(sorted(sys.modules))" ],
+        env={ **os.environ, "PYTHONPATH": src_dir },
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    assert "salesforce_metadata_parser.metadata.genaiprompttemplate" not in completed.stdout
+
+
+def test_types_are_imported_on_first_document():
+    registry = TypeRegistry()
+    registry.register("GenAiPromptTemplate", "genAiPromptTemplate", ".genaiprompttemplate:GenAiPromptTemplate")
+    assert registry.loaded() == []
+
+    metadata = XmlParser(registry=registry).parse_string(template_xml("Template_0001"))
+
+    assert type(metadata).__name__ == "GenAiPromptTemplate"
+    assert registry.loaded() == [ "GenAiPromptTemplate" ]
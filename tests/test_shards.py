@@ -0,0 +1,83 @@
+# Standard Library imports
+import os
+
+# Third-party imports
+import pytest
+
+# Project imports
+from salesforce_metadata_parser.parser.manifest import relative_path
+from salesforce_metadata_parser.parser.shards import assign_shards, parse_shard, select_shard, shard_of
+
+
+@pytest.fixture
+def in_tmp_path(tmp_path):
+    # Timings are keyed by paths relative to the working directory
+    cwd = os.getcwd()
+    os.chdir(tmp_path)
+    yield tmp_path
+    os.chdir(cwd)
+
+
+def _loads(assignment: dict, costs: dict, count: int) -> list:
+    loads = [ 0.0 ] * count
+    for file_path, shard in assignment.items():
+        loads[shard - 1] += costs[file_path]
+    return loads
+
+
+def test_parse_shard():
+    assert parse_shard("2/4") == (2, 4)
+    assert parse_shard(" 1 / 1 ") == (1, 1)
+    for shard in [ "0/4", "5/4", "1/0", "2", "a/b" ]:
+        with pytest.raises(ValueError, match="Invalid shard"):
+            parse_shard(shard)
+
+
+def test_shard_of_does_not_change_between_runs():
+    path = "force-app/main/default/genAiPromptTemplates/Template_0001.genAiPromptTemplate-meta.xml"
+
+    # Pinned: a change of hash would move files between the shards of nodes running different versions
+    assert (shard_of(path, 4), shard_of(path, 7)) == (1, 4)
+    assert { shard_of(f"Template_{index:04d}", 4) for index in range(100) } == { 1, 2, 3, 4 }
+
+
+@pytest.mark.parametrize("timed", [ False, True ])
+def test_shards_select_every_file_once(in_tmp_path, template_files, timed):
+    timings = { relative_path(file_path): 1.0 + index for index, file_path in enumerate(template_files) } if timed else None
+
+    shards = [ select_shard(template_files, index, 3, timings) for index in range(1, 4) ]
+
+    assert sorted(file_path for shard in shards for file_path in shard) == sorted(template_files)
+    for shard in shards:
+        assert shard
+        # In their original order
+        assert shard == [ file_path for file_path in template_files if file_path in shard ]
+
+
+def test_timed_shards_are_balanced(in_tmp_path, template_files):
+    costs = { file_path: 1.0 + index for index, file_path in enumerate(template_files) }
+    timings = { relative_path(file_path): cost for file_path, cost in costs.items() }
+
+    assignment = assign_shards(template_files, 3, timings)
+    loads = _loads(assignment, costs, 3)
+
+    # 78 s of work, the longest file first to the shard with the least work
+    assert sum(loads) == 78.0
+    assert max(loads) - min(loads) <= 1.0
+    # Every node computes the same assignment, whatever the order of the files
+    assert assign_shards(list(reversed(template_files)), 3, timings) == assignment
+
+
+def test_untimed_files_are_estimated_from_their_size(in_tmp_path, template_files):
+    sizes = { file_path: os.path.getsize(file_path) for file_path in template_files }
+    # Two seconds per KiB, a new file is missing from the timings
+    timings = { relative_path(file_path): size * 2 / 1024 for file_path, size in sizes.items() }
+    new_file = max(template_files, key=sizes.get)
+    del timings[relative_path(new_file)]
+
+    assignment = assign_shards(template_files, 3, timings)
+
+    estimated = dict(timings, **{ relative_path(new_file): sizes[new_file] * 2 / 1024 })
+    assert assignment == assign_shards(template_files, 3, estimated)
+    # The largest file goes first, alone on its shard
+    assert [ file_path for file_path, shard in assignment.items() if shard == assignment[new_file] ][ : 1] == [ new_file ]
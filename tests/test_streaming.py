@@ -0,0 +1,68 @@
+# Standard Library imports
+import os
+from xml.etree import ElementTree
+
+# Third-party imports
+import pytest
+
+# Project imports
+from salesforce_metadata_parser.cli.genAiPromptTemplate import PromptTemplateHelper
+from salesforce_metadata_parser.parser.metadata_parser import XmlParser
+from salesforce_metadata_parser.parser.streaming import split_xml_file
+
+from .conftest import write_template
+
+
+def _target_path(target_dir):
+    def target_path(metadata) -> str:
+        return os.path.join(target_dir, f"{metadata.templateVersions[0].versionIdentifier}.xml")
+    return target_path
+
+
+def test_split_files_match_the_loaded_template(tmp_path):
+    source_file = write_template(str(tmp_path), "Template_0001", versions=3)
+    target_dir = str(tmp_path / "out")
+
+    written = PromptTemplateHelper.stream_split_prompts(source_file, target_dir)
+
+    template = XmlParser().parse_file(source_file)
+    assert [ os.path.basename(file_path) for file_path in written ] == [ f"Template_0001-v{n}.genAiPromptTemplate-meta.xml" for n in (1, 2, 3) ]
+    for version, file_path in zip(template.templateVersions, written):
+        document = XmlParser().parse_file(file_path)
+        assert [ item.versionIdentifier for item in document.templateVersions ] == [ version.versionIdentifier ]
+        assert document.activeVersionIdentifier == version.versionIdentifier
+        assert (document.type, document.visibility) == (template.type, template.visibility)
+    # Nothing else is left in the directory
+    assert sorted(os.listdir(target_dir)) == sorted(os.path.basename(file_path) for file_path in written)
+
+
+def test_duplicate_targets_fail_without_writing(tmp_path):
+    source_file = write_template(str(tmp_path), "Template_0001", versions=3)
+    with open(source_file, "r", encoding="utf-8") as xml_file:
+        content = xml_file.read()
+    with open(source_file, "w", encoding="utf-8") as xml_file:
+        xml_file.write(content.replace("Template_0001=_3<", "Template_0001=_2<"))
+    target_dir = tmp_path / "out"
+    target_dir.mkdir()
+    existing = target_dir / "Template_0001=_1.xml"
+    existing.write_text("previous")
+
+    with pytest.raises(ValueError, match="written to"):
+        split_xml_file(source_file, "templateVersions", _target_path(str(target_dir)), XmlParser())
+
+    assert os.listdir(target_dir) == [ existing.name ]
+    assert existing.read_text() == "previous"
+
+
+def test_split_files_are_complete_documents(tmp_path):
+    source_file = write_template(str(tmp_path), "Template_0001", versions=4)
+    target_dir = tmp_path / "out"
+    target_dir.mkdir()
+    (target_dir / "Template_0001=_2.xml").write_text("previous contents, longer than the new ones " * 1000)
+
+    written = split_xml_file(source_file, "templateVersions", _target_path(str(target_dir)), XmlParser())
+
+    assert len(written) == 4
+    for file_path in written:
+        root = ElementTree.parse(file_path).getroot()
+        assert [ child.tag.rpartition("}")[2] for child in root ][-2 : ] == [ "type", "visibility" ]
@@ -0,0 +1,59 @@
+# Standard Library imports
+from concurrent.futures import ThreadPoolExecutor
+import threading
+
+# Third-party imports
+import pytest
+
+# Project imports
+from salesforce_metadata_parser.parser.backends import backends
+from salesforce_metadata_parser.parser.interning import StringPool
+from salesforce_metadata_parser.parser.metadata_parser import XmlParser
+
+installed_backends = [ name for name, backend in backends.items() if backend.available() ]
+
+threads = 8
+rounds = 5
+
+
+def _serial_results(parser: XmlParser, file_paths: list) -> dict:
+    results = {}
+    for file_path in file_paths:
+        metadata = parser.parse_file(file_path)
+        results[file_path] = (metadata._fingerprint(), parser.dump_string(metadata))
+    return results
+
+
+@pytest.mark.parametrize("backend", installed_backends)
+@pytest.mark.parametrize("string_pool", [ False, True ])
+def test_shared_parser_matches_serial_run(template_files, backend, string_pool):
+    parser = XmlParser(backend=backend, string_pool=StringPool() if string_pool else None)
+    expected = _serial_results(XmlParser(backend=backend), template_files)
+
+    barrier = threading.Barrier(threads)
+
+    def work(offset: int) -> dict:
+        barrier.wait()
+        results = {}
+        # Every thread walks the files from a different position, so the same parser is used on different documents at once
+        for index in range(rounds * len(template_files)):
+            file_path = template_files[(offset + index) % len(template_files)]
+            metadata = parser.parse_file(file_path)
+            result = (metadata._fingerprint(), parser.dump_string(metadata))
+            assert results.setdefault(file_path, result) == result
+        return results
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        for results in executor.map(work, range(threads)):
+            assert results == expected
+
+
+@pytest.mark.parametrize("backend", installed_backends)
+def test_parse_files_keeps_input_order(template_files, backend):
+    parser = XmlParser(backend=backend)
+    expected = _serial_results(parser, template_files)
+
+    parsed = list(parser.parse_files(template_files, max_workers=threads))
+
+    assert [ file_path for file_path, _ in parsed ] == template_files
+    assert { file_path: (metadata._fingerprint(), parser.dump_string(metadata)) for file_path, metadata in parsed } == expected
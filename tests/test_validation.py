@@ -0,0 +1,45 @@
+# Standard Library imports
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+# Project imports
+from salesforce_metadata_parser.metadata.genaiprompttemplate import GenAiPromptTemplate
+from salesforce_metadata_parser.metadata.metadata import Metadata
+from salesforce_metadata_parser.metadata.validation import compile_rules, validate
+from salesforce_metadata_parser.parser.metadata_parser import XmlParser
+
+from .conftest import template_xml
+
+
+@dataclass
+class Declared(Metadata):
+
+    names: List[str] = field(default_factory=list, metadata={"required": True})
+    """Required. Declared in the field metadata"""
+
+    label: Optional[str] = None
+    """Required. Documented only, so not checked"""
+
+    note: Optional[str] = field(default=None, metadata={"required": False})
+
+
+def test_required_fields_of_the_prompt_templates():
+    required = { rule.name for rule in compile_rules(GenAiPromptTemplate) if rule.required }
+
+    assert required == { "masterLabel", "templateVersions", "type" }
+
+
+def test_only_field_metadata_declares_rules():
+    rules = { rule.name: rule.required for rule in compile_rules(Declared) }
+
+    assert rules == { "names": True, "label": False, "note": False }
+
+
+def test_missing_versions_are_reported():
+    metadata = XmlParser().parse_string(template_xml("Template_0001"))
+    assert validate(metadata) == []
+
+    metadata.templateVersions = []
+    metadata.activeVersionIdentifier = None
+
+    assert [ (issue.path, issue.rule) for issue in validate(metadata) ] == [ ("templateVersions", "required") ]
@@ -0,0 +1,150 @@
+# Standard Library imports
+import os
+
+# Third-party imports
+from click.testing import CliRunner
+import pytest
+
+# Project imports
+from salesforce_metadata_parser.cli import genAiPromptTemplate as prompt_template_cli
+from salesforce_metadata_parser.cli.main import cli
+from salesforce_metadata_parser.parser.metadata_parser import XmlParser
+from salesforce_metadata_parser.parser.versions import VersionColumns
+
+from .conftest import templates_dir, write_template
+
+
+@pytest.fixture
+def in_tmp_path(tmp_path, monkeypatch):
+    # Result keys are relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def _replace(file_path: str, *replacements):
+    with open(file_path, "r", encoding="utf-8") as xml_file:
+        content = xml_file.read()
+    for old, new in replacements:
+        assert old in content
+        content = content.replace(old, new)
+    with open(file_path, "w", encoding="utf-8") as xml_file:
+        xml_file.write(content)
+
+
+def _swap_identifiers(file_path: str, name: str, first: int, second: int):
+    """Swaps the identifiers of two versions, their contents stay in place"""
+    _replace(
+        file_path,
+        (f"<versionIdentifier>{name}=_{first}<", "<versionIdentifier>swapped<"),
+        (f"<versionIdentifier>{name}=_{second}<", f"<versionIdentifier>{name}=_{first}<"),
+        ("<versionIdentifier>swapped<", f"<versionIdentifier>{name}=_{second}<"),
+    )
+
+
+def _invoke(*args):
+    result = CliRunner().invoke(cli, [ "prompt-template", *args, "--source-dir", templates_dir ])
+    assert result.exit_code == 0, result.output
+    return result
+
+
+def test_renumbered_columns():
+    columns = VersionColumns.from_templates({
+        "a": ([ "A=_1", "A=_3", "A=_2" ], "A=_3"),
+        "b": ([ "B=_1", "B=_2" ], None),
+        "c": ([ "C=_2", None, "C=_2" ], None),
+    })
+
+    assert columns.renumbered() == {
+        "a": [ (0, "A=_1", "A=_1"), (1, "A=_3", "A=_2"), (2, "A=_2", "A=_3") ],
+        "c": [ (0, "C=_2", "C=_1"), (1, "", ""), (2, "C=_2", "C=_2") ],
+    }
+    assert columns.renumbered(columns.sort_order())["a"] == [ (0, "A=_1", "A=_1"), (2, "A=_2", "A=_2"), (1, "A=_3", "A=_3") ]
+
+
+@pytest.mark.parametrize("active, expected", [ (2, "Template_0001=_4"), (4, "Template_0001=_4") ])
+def test_prune_without_keep_active_moves_the_active_version(in_tmp_path, active, expected):
+    # Versions 1 to 4 are published, 5 is a draft
+    file_path = write_template(str(in_tmp_path), "Template_0001", versions=5, active=4)
+    _replace(file_path, ("<activeVersionIdentifier>Template_0001=_4<", f"<activeVersionIdentifier>Template_0001=_{active}<"))
+
+    _invoke("prune-dir", "--count", "3", "--no-keep-active")
+
+    metadata = XmlParser().parse_file(file_path)
+    assert [ version.versionIdentifier for version in metadata.templateVersions ] == [ f"Template_0001=_{n}" for n in (3, 4, 5) ]
+    assert metadata.activeVersionIdentifier == expected
+
+
+def test_prune_clears_the_active_version_without_published_versions(in_tmp_path):
+    file_path = write_template(str(in_tmp_path), "Template_0001", versions=5, active=3)
+
+    _invoke("prune-dir", "--count", "2", "--no-keep-active")
+
+    metadata = XmlParser().parse_file(file_path)
+    assert len(metadata.templateVersions) == 2
+    assert metadata.activeVersionIdentifier is None
+    assert "activeVersionIdentifier" not in XmlParser().dump_string(metadata)
+
+
+def test_renumber_follows_the_document_order(in_tmp_path):
+    file_path = write_template(str(in_tmp_path), "Template_0001", versions=3, active=3)
+    unchanged = write_template(str(in_tmp_path), "Template_0002", versions=3)
+    with open(unchanged, "rb") as xml_file:
+        before = xml_file.read()
+    _swap_identifiers(file_path, "Template_0001", 2, 3)
+
+    result = _invoke("renumber-dir")
+
+    assert "Template_0001=_3 -> Template_0001=_2, Template_0001=_2 -> Template_0001=_3" in result.stdout
+    metadata = XmlParser().parse_file(file_path)
+    assert [ version.versionIdentifier for version in metadata.templateVersions ] == [ f"Template_0001=_{n}" for n in (1, 2, 3) ]
+    assert "of Template_0001 v2" in metadata.templateVersions[1].content
+    # The active version is the same version, under its new identifier
+    assert metadata.activeVersionIdentifier == "Template_0001=_2"
+    with open(unchanged, "rb") as xml_file:
+        assert xml_file.read() == before
+
+
+def test_renumber_with_sort_reorders_the_versions(in_tmp_path):
+    file_path = write_template(str(in_tmp_path), "Template_0001", versions=3, active=3)
+    _swap_identifiers(file_path, "Template_0001", 2, 3)
+
+    _invoke("renumber-dir", "--sort")
+
+    metadata = XmlParser().parse_file(file_path)
+    assert [ version.versionIdentifier for version in metadata.templateVersions ] == [ f"Template_0001=_{n}" for n in (1, 2, 3) ]
+    assert "of Template_0001 v3" in metadata.templateVersions[1].content
+    assert metadata.activeVersionIdentifier == "Template_0001=_3"
+
+
+def test_renumber_dry_run_writes_nothing(in_tmp_path):
+    file_path = write_template(str(in_tmp_path), "Template_0001", versions=3)
+    _swap_identifiers(file_path, "Template_0001", 1, 2)
+    with open(file_path, "rb") as xml_file:
+        before = xml_file.read()
+
+    result = _invoke("renumber-dir", "--dry-run")
+
+    assert "Would renumber 1 of 1 templates" in result.stdout
+    with open(file_path, "rb") as xml_file:
+        assert xml_file.read() == before
+
+
+@pytest.mark.parametrize("command", [ ("prune-dir", "--count", "2"), ("renumber-dir", "--sort") ])
+def test_directory_commands_parse_every_file_once(in_tmp_path, monkeypatch, command):
+    parsed = []
+
+    class RecordingParser(XmlParser):
+        def parse_file(self, xml_file_path):
+            parsed.append(xml_file_path)
+            return super().parse_file(xml_file_path)
+
+    monkeypatch.setattr(prompt_template_cli, "XmlParser", RecordingParser)
+    file_paths = []
+    for index in range(4):
+        file_paths.append(write_template(str(in_tmp_path), f"Template_{index:04d}", versions=4))
+        _swap_identifiers(file_paths[-1], f"Template_{index:04d}", 1, 2)
+
+    result = _invoke(*command, "--jobs", "2")
+
+    assert sorted(os.path.abspath(file_path) for file_path in parsed) == sorted(file_paths)
+    assert "4 of 4 templates" in result.stdout
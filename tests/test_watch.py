@@ -0,0 +1,99 @@
+# Standard Library imports
+import os
+import threading
+import time
+
+# Project imports
+from salesforce_metadata_parser.parser.watch import DirectoryWatcher
+
+from .conftest import write_template
+
+
+def _touch(file_path: str, mtime: float):
+    os.utime(file_path, (mtime, mtime))
+
+
+def test_poll_reports_added_modified_and_removed_files(tmp_path):
+    os.makedirs(tmp_path / "nested")
+    kept = write_template(str(tmp_path), "Template_0001")
+    modified = write_template(str(tmp_path / "nested"), "Template_0002")
+    removed = write_template(str(tmp_path), "Template_0003")
+    watcher = DirectoryWatcher(str(tmp_path), "genAiPromptTemplate")
+
+    assert watcher.poll() == (set(), set())
+
+    _touch(modified, os.stat(modified).st_mtime + 10)
+    os.remove(removed)
+    added = write_template(str(tmp_path / "nested"), "Template_0004")
+    (tmp_path / "notes.txt").write_text("ignored", encoding="utf-8")
+    (tmp_path / "Other.flow-meta.xml").write_text("ignored", encoding="utf-8")
+
+    assert watcher.poll() == ({ modified, added }, { removed })
+    assert watcher.poll() == (set(), set())
+    assert kept in watcher.scan()
+
+
+def test_files_rewritten_with_another_size_are_changed(tmp_path):
+    source_file = write_template(str(tmp_path), "Template_0001")
+    mtime = os.stat(source_file).st_mtime
+    watcher = DirectoryWatcher(str(tmp_path), "genAiPromptTemplate")
+
+    write_template(str(tmp_path), "Template_0001", versions=2)
+    # Same modification time, as on file systems with a coarse resolution
+    _touch(source_file, mtime)
+
+    assert watcher.poll() == ({ source_file }, set())
+
+
+def test_next_update_stops_while_waiting_for_changes(tmp_path):
+    write_template(str(tmp_path), "Template_0001")
+    watcher = DirectoryWatcher(str(tmp_path), "genAiPromptTemplate", interval=0.01)
+
+    assert watcher.next_update(stop=lambda: True) is None
+
+
+def test_a_burst_of_changes_is_one_update(tmp_path):
+    source_file = write_template(str(tmp_path), "Template_0001")
+    watcher = DirectoryWatcher(str(tmp_path), "genAiPromptTemplate", interval=0.01, debounce=0.3)
+
+    written = []
+
+    def edit():
+        # Saved several times, as editors do, then two more files
+        for versions in range(2, 5):
+            written.append(write_template(str(tmp_path), "Template_0001", versions=versions))
+            time.sleep(0.02)
+        written.append(write_template(str(tmp_path), "Template_0002"))
+        time.sleep(0.02)
+        written.append(write_template(str(tmp_path), "Template_0003"))
+
+    editor = threading.Thread(target=edit)
+    start = time.time()
+    editor.start()
+    update = watcher.next_update()
+    editor.join()
+
+    assert update.changed == set(written)
+    assert len(update.changed) == 3 and source_file in update.changed
+    assert update.removed == set()
+    assert start <= update.detected <= update.modified + 1
+    assert time.time() - update.detected >= 0.3
+    assert watcher.poll() == (set(), set())
+
+
+def test_files_removed_during_a_burst_are_only_removed(tmp_path):
+    removed = write_template(str(tmp_path), "Template_0001")
+    watcher = DirectoryWatcher(str(tmp_path), "genAiPromptTemplate", interval=0.01, debounce=0.3)
+
+    def edit():
+        _touch(removed, os.stat(removed).st_mtime + 10)
+        time.sleep(0.05)
+        os.remove(removed)
+
+    editor = threading.Thread(target=edit)
+    editor.start()
+    update = watcher.next_update()
+    editor.join()
+
+    assert update.changed == set()
+    assert update.removed == { removed }